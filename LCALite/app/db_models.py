@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, Numeric, Text, func
 from .db import Base
 
 
@@ -10,6 +10,8 @@ class IngredientFactor(Base):
     co2_kg_per_kg = Column(Numeric(10, 4), nullable=False)
     water_l_per_kg = Column(Numeric(10, 4), nullable=False)
     energy_mj_per_kg = Column(Numeric(10, 4), nullable=False)
+    # écart-type géométrique (loi log-normale, médiane = facteur) ; NULL : valeur par défaut de la catégorie
+    uncertainty_gsd = Column(Numeric(6, 3), nullable=True)
 
 
 class PackagingFactor(Base):
@@ -20,6 +22,8 @@ class PackagingFactor(Base):
     co2_kg_per_kg = Column(Numeric(10, 4), nullable=False)
     water_l_per_kg = Column(Numeric(10, 4), nullable=False)
     energy_mj_per_kg = Column(Numeric(10, 4), nullable=False)
+    # comme IngredientFactor.uncertainty_gsd
+    uncertainty_gsd = Column(Numeric(6, 3), nullable=True)
 
 
 class TransportFactor(Base):
@@ -30,3 +34,29 @@ class TransportFactor(Base):
     co2_kg_per_tkm = Column(Numeric(10, 4), nullable=False)
     water_l_per_tkm = Column(Numeric(10, 4), nullable=False)
     energy_mj_per_tkm = Column(Numeric(10, 4), nullable=False)
+    # comme IngredientFactor.uncertainty_gsd
+    uncertainty_gsd = Column(Numeric(6, 3), nullable=True)
+
+
+class FactorsVersion(Base):
+    """Compteur (ligne id=1) incrémenté par trigger à chaque modification des facteurs (factor_store)."""
+    __tablename__ = "lca_factors_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=1)
+
+
+class LCAResult(Base):
+    """
+    Résultats mémorisés de /lca/calc (result_store) : empreinte de la requête
+    + version des facteurs -> réponse JSON (ACV + score).
+    """
+    __tablename__ = "lca_results"
+
+    key = Column(String(64), primary_key=True)
+    product_id = Column(Text, nullable=False, index=True)
+    factors_version = Column(String(64), nullable=False, index=True)
+    result = Column(Text, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,251 @@
+# factor_store.py
+"""
+Facteurs ACV en mémoire, partagés par toutes les requêtes du processus.
+
+- les trois tables lca_*_factors sont lues une fois et rangées en tableaux
+  compacts : une matrice numpy (n lignes x 3 colonnes co2 / eau / énergie) par
+  table, et un dict code -> ligne ; plus de parcours de table ni de conversion
+  Decimal -> float par requête
+- invalidation : un compteur lca_factors_version (une ligne) est incrémenté
+  par des triggers PostgreSQL sur les trois tables (INSERT / UPDATE / DELETE /
+  TRUNCATE) ; il est relu au plus une fois par LCA_FACTORS_CHECK_S secondes et
+  les facteurs sont rechargés s'il a bougé. Hors PostgreSQL (SQLite en dev),
+  l'empreinte du contenu (factors_version) tient lieu de compteur
+- POST /lca/factors/reload force le rechargement ; l'âge du cache est renvoyé
+  avec chaque calcul (champ factors de /lca/calc)
+- un instantané (FactorSnapshot) est remplacé d'un bloc : un calcul en cours
+  garde des facteurs cohérents entre eux
+- chaque ligne porte aussi son incertitude (uncertainty_gsd, écart-type
+  géométrique ; défaut de la catégorie si NULL) pour le calcul Monte Carlo
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ecolabel_common.telemetry import fields, get_logger
+
+from .config import (
+    LCA_FACTORS_CHECK_S,
+    LCA_UNCERTAINTY_GSD_INGREDIENT,
+    LCA_UNCERTAINTY_GSD_PACKAGING,
+    LCA_UNCERTAINTY_GSD_TRANSPORT,
+)
+from .db_models import FactorsVersion
+from .factors_version import factors_version
+
+log = get_logger("factor_store")
+
+# colonnes des matrices de facteurs
+CO2, WATER, ENERGY = 0, 1, 2
+
+_INGREDIENT_SQL = text("""
+    SELECT code, co2_kg_per_kg, water_l_per_kg, energy_mj_per_kg, uncertainty_gsd
+    FROM lca_ingredient_factors
+""")
+_PACKAGING_SQL = text("""
+    SELECT material, co2_kg_per_kg, water_l_per_kg, energy_mj_per_kg, uncertainty_gsd
+    FROM lca_packaging_factors
+""")
+_TRANSPORT_SQL = text("""
+    SELECT mode, co2_kg_per_tkm, water_l_per_tkm, energy_mj_per_tkm, uncertainty_gsd
+    FROM lca_transport_factors
+""")
+
+# Triggers qui incrémentent le compteur à chaque modification des facteurs
+# (un par instruction : un import de 10 000 lignes = +1)
+_TRIGGER_DDL = [
+    "INSERT INTO lca_factors_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING",
+    """
+    CREATE OR REPLACE FUNCTION lca_bump_factors_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE lca_factors_version SET version = version + 1 WHERE id = 1;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+]
+_FACTOR_TABLES = ("lca_ingredient_factors", "lca_packaging_factors", "lca_transport_factors")
+for _table in _FACTOR_TABLES:
+    _TRIGGER_DDL += [
+        f"DROP TRIGGER IF EXISTS {_table}_version ON {_table}",
+        f"CREATE TRIGGER {_table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {_table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION lca_bump_factors_version()",
+    ]
+
+
+def install_version_triggers(engine: Engine) -> None:
+    """Crée les triggers du compteur (PostgreSQL uniquement ; idempotent, sûr avec plusieurs workers)."""
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            # plusieurs workers démarrent en même temps : un seul pose les triggers à la fois
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('lca_factors_version'))"))
+            for ddl in _TRIGGER_DDL:
+                conn.execute(text(ddl))
+    except SQLAlchemyError as e:
+        log.warning(f"Triggers du compteur de facteurs non installés : {e.__class__.__name__}")
+
+
+def add_uncertainty_columns(engine: Engine) -> None:
+    """Ajoute uncertainty_gsd aux tables de facteurs existantes (create_all ne modifie pas une table)."""
+    existing = inspect(engine)
+    missing = [
+        table for table in _FACTOR_TABLES
+        if existing.has_table(table)
+        and "uncertainty_gsd" not in {c["name"] for c in existing.get_columns(table)}
+    ]
+    if not missing:
+        return
+    # IF NOT EXISTS : plusieurs workers peuvent arriver ici en même temps (PostgreSQL)
+    if_not_exists = "IF NOT EXISTS " if engine.dialect.name == "postgresql" else ""
+    with engine.begin() as conn:
+        for table in missing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {if_not_exists}uncertainty_gsd NUMERIC(6, 3)"))
+    log.info("Colonne uncertainty_gsd ajoutée", extra=fields(tables=missing))
+
+
+class FactorTable:
+    """Facteurs d'une table : matrice (n x 3), écarts-types géométriques et index code -> ligne."""
+
+    __slots__ = ("index", "matrix", "gsd", "_rows", "_gsd")
+
+    def __init__(self, rows: List[Tuple[str, Any, Any, Any, Any]], default_gsd: float = 1.0):
+        self.index: Dict[str, int] = {}
+        values = []
+        gsd = []
+        for row in rows:
+            self.index[row[0]] = len(values)
+            values.append((float(row[1]), float(row[2]), float(row[3])))
+            gsd.append(float(row[4]) if row[4] is not None else default_gsd)
+        self.matrix = np.array(values, dtype=np.float64).reshape(len(values), 3)
+        self.gsd = np.array(gsd, dtype=np.float64)
+        # mêmes valeurs en tuples Python : accès unitaire plus rapide que la matrice
+        self._rows = values
+        self._gsd = gsd
+
+    def get(self, code: str) -> Optional[Tuple[float, float, float]]:
+        """(co2, eau, énergie) par unité, ou None si le code est inconnu."""
+        i = self.index.get(code)
+        return self._rows[i] if i is not None else None
+
+    def gsd_of(self, code: str) -> Optional[float]:
+        """Écart-type géométrique du facteur, ou None si le code est inconnu."""
+        i = self.index.get(code)
+        return self._gsd[i] if i is not None else None
+
+    def codes(self) -> List[str]:
+        return list(self.index)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class FactorSnapshot:
+    __slots__ = ("ingredients", "packaging", "transport", "version", "loaded_at", "load_ms")
+
+    def __init__(self, ingredients: FactorTable, packaging: FactorTable, transport: FactorTable,
+                 version: Optional[str], load_ms: float):
+        self.ingredients = ingredients
+        self.packaging = packaging
+        self.transport = transport
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.load_ms = load_ms
+
+    def age_s(self) -> float:
+        return round(time.monotonic() - self.loaded_at, 1)
+
+    def info(self) -> Dict[str, Any]:
+        """Renvoyé avec chaque calcul : version et âge des facteurs utilisés."""
+        return {"version": self.version, "age_s": self.age_s()}
+
+
+def _current_version(db: Session) -> Optional[str]:
+    if db.get_bind().dialect.name == "postgresql":
+        value = db.scalar(select(FactorsVersion.version).where(FactorsVersion.id == 1))
+        if value is not None:
+            return f"v{value}"
+    # pas de compteur (SQLite, triggers absents) : empreinte du contenu
+    return factors_version(db)["version"]
+
+
+class FactorStore:
+    def __init__(self, check_s: float = LCA_FACTORS_CHECK_S):
+        self.check_s = check_s
+        self._snapshot: Optional[FactorSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"loads": 0, "checks": 0, "check_errors": 0}
+
+    def snapshot(self, db: Session) -> FactorSnapshot:
+        """Facteurs courants ; ne touche la base qu'une fois par LCA_FACTORS_CHECK_S."""
+        current = self._snapshot
+        if current is not None and time.monotonic() - self._checked_at < self.check_s:
+            return current
+        # un seul thread vérifie ; les autres continuent avec l'instantané courant
+        if not self._lock.acquire(blocking=current is None):
+            return current
+        try:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_s:
+                return self._snapshot
+            self._stats["checks"] += 1
+            version = _current_version(db)
+            if self._snapshot is None or version != self._snapshot.version:
+                self._load(db, version)
+            self._checked_at = time.monotonic()
+        except SQLAlchemyError as e:
+            if self._snapshot is None:
+                raise
+            # base indisponible : on garde les facteurs courants, nouvel essai au prochain intervalle
+            db.rollback()
+            self._checked_at = time.monotonic()
+            self._stats["check_errors"] += 1
+            log.warning(f"Vérification des facteurs impossible : {e.__class__.__name__}")
+        finally:
+            self._lock.release()
+        return self._snapshot
+
+    def reload(self, db: Session) -> FactorSnapshot:
+        with self._lock:
+            self._load(db, _current_version(db))
+            self._checked_at = time.monotonic()
+        return self._snapshot
+
+    def _load(self, db: Session, version: Optional[str]) -> None:
+        t0 = time.perf_counter()
+        ingredients = FactorTable(db.execute(_INGREDIENT_SQL).all(), LCA_UNCERTAINTY_GSD_INGREDIENT)
+        packaging = FactorTable(db.execute(_PACKAGING_SQL).all(), LCA_UNCERTAINTY_GSD_PACKAGING)
+        transport = FactorTable(db.execute(_TRANSPORT_SQL).all(), LCA_UNCERTAINTY_GSD_TRANSPORT)
+        load_ms = round((time.perf_counter() - t0) * 1000, 2)
+        self._snapshot = FactorSnapshot(ingredients, packaging, transport, version, load_ms)
+        self._stats["loads"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        current = self._snapshot
+        return {
+            "loaded": current is not None,
+            "version": current.version if current else None,
+            "age_s": current.age_s() if current else None,
+            "entries": {
+                "ingredients": len(current.ingredients),
+                "packaging": len(current.packaging),
+                "transport": len(current.transport),
+            } if current else {},
+            "last_load_ms": current.load_ms if current else None,
+            "check_s": self.check_s,
+            **self._stats,
+        }
+
+
+_store = FactorStore()
+
+
+def get_factor_store() -> FactorStore:
+    return _store
@@ -0,0 +1,47 @@
+# factors_version.py
+"""
+Version des facteurs ACV : empreinte du contenu des trois tables de facteurs.
+
+Les appelants qui gardent des résultats calculés avec ces facteurs (cache de
+résultats de NLPIngrédients) l'incluent dans leurs clés : toute modification
+d'un facteur (ajout, suppression, valeur) change la version. Les tables sont
+petites : l'empreinte est recalculée à chaque appel.
+"""
+import hashlib
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .db_models import IngredientFactor, PackagingFactor, TransportFactor
+
+_TABLES = (
+    (IngredientFactor, IngredientFactor.code,
+     (IngredientFactor.co2_kg_per_kg, IngredientFactor.water_l_per_kg, IngredientFactor.energy_mj_per_kg,
+      IngredientFactor.uncertainty_gsd)),
+    (PackagingFactor, PackagingFactor.material,
+     (PackagingFactor.co2_kg_per_kg, PackagingFactor.water_l_per_kg, PackagingFactor.energy_mj_per_kg,
+      PackagingFactor.uncertainty_gsd)),
+    (TransportFactor, TransportFactor.mode,
+     (TransportFactor.co2_kg_per_tkm, TransportFactor.water_l_per_tkm, TransportFactor.energy_mj_per_tkm,
+      TransportFactor.uncertainty_gsd)),
+)
+
+
+def factors_version(db: Session) -> Dict[str, Any]:
+    digest = hashlib.sha256()
+    counts = {}
+    for table, key, values in _TABLES:
+        rows = db.execute(select(key, *values).order_by(key)).all()
+        digest.update(table.__tablename__.encode())
+        for row in rows:
+            # Numeric -> Decimal : str() exact, stable d'un appel à l'autre
+            digest.update("\x1f".join(str(v) for v in row).encode())
+            digest.update(b"\x1e")
+        counts[table.__tablename__] = len(rows)
+    return {"version": digest.hexdigest()[:16], "counts": counts}
+
+
+def ingredient_codes(db: Session) -> List[str]:
+    """Codes de lca_ingredient_factors : NLPIngrédients en compile sa table de résolution."""
+    return list(db.execute(select(IngredientFactor.code).order_by(IngredientFactor.code)).scalars())
@@ -1,156 +1,343 @@
-from typing import Tuple, Dict, Any
+import math
+from typing import Tuple, Dict, Any, List, Optional, Sequence
+
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 
-from .models import LCARequest
+from ecolabel_common.telemetry import fields, get_logger
+
+from .config import LCA_UNCERTAINTY_GSD_TRANSPORT, LCA_UNCERTAINTY_PERCENTILES
+from .factor_store import CO2, WATER, ENERGY, FactorSnapshot, FactorTable, get_factor_store
+from .models import IngredientItem, LCARequest, LCAScenario, PackagingItem, TransportLeg
+
+log = get_logger("lca_calculator")
+
+# modes de transport absents de la base déjà signalés (un avertissement par mode)
+_warned_modes = set()
 
 
 class LCACalculator:
 
     def __init__(self, db: Session):
         self.db = db
+        # facteurs utilisés par le dernier calcul (version / âge renvoyés au client)
+        self.snapshot: Optional[FactorSnapshot] = None
+
+    # ---------- Calcul ACV ----------
+    # facteurs : instantané en mémoire (factor_store), la base n'est touchée que
+    # pour relire le compteur de version, au plus une fois par LCA_FACTORS_CHECK_S
+
+    def compute_lca(self, req: LCARequest) -> Tuple[Dict[str, float], Dict[str, Any]]:
+        self.snapshot = factors = get_factor_store().snapshot(self.db)
+        ing = _ingredient_sums(factors.ingredients, req.ingredients)
+        pack = _packaging_sums(factors.packaging, req.packaging)
+        tr = _transport_sums(factors.transport, req.transport)
+
+        log.debug("ACV calculée", extra=fields(
+            product_id=req.product_id,
+            ingredients=len(req.ingredients),
+            packaging=len(req.packaging),
+            transport_legs=len(req.transport),
+        ))
 
-    # ---------- Chargement des facteurs depuis la BDD ----------
+        return _result(ing, pack, tr)
 
-    def _load_ingredient_factors(self) -> Dict[str, Dict[str, float]]:
+    def compute_lca_batch(self, reqs: Sequence[LCARequest]) -> List[Tuple[Dict[str, float], Dict[str, Any]]]:
         """
-        Retourne un dict:
-        {
-          "MILK_COW": {"co2_kg_per_kg": 1.2, "water_l_per_kg": 10.0, "energy_mj_per_kg": 5.0},
-          ...
-        }
+        Même résultat que compute_lca pour chaque requête, calculé par catégorie
+        sur tout le lot : les lignes (produit, facteur, masse) du lot sont
+        rangées en tableaux, les contributions masse x facteur calculées en une
+        opération et sommées par produit (np.bincount). Les additions se font
+        dans le même ordre que la boucle de compute_lca : valeurs identiques.
         """
-        sql = text("""
-            SELECT code, co2_kg_per_kg, water_l_per_kg, energy_mj_per_kg
-            FROM lca_ingredient_factors
-        """)
-        rows = self.db.execute(sql).mappings().all()
-        return {
-            row["code"]: {
-                "co2_kg_per_kg": float(row["co2_kg_per_kg"]),
-                "water_l_per_kg": float(row["water_l_per_kg"]),
-                "energy_mj_per_kg": float(row["energy_mj_per_kg"]),
-            }
-            for row in rows
-        }
-
-    def _load_packaging_factors(self) -> Dict[str, Dict[str, float]]:
-        sql = text("""
-            SELECT material, co2_kg_per_kg, water_l_per_kg, energy_mj_per_kg
-            FROM lca_packaging_factors
-        """)
-        rows = self.db.execute(sql).mappings().all()
-        return {
-            row["material"]: {
-                "co2_kg_per_kg": float(row["co2_kg_per_kg"]),
-                "water_l_per_kg": float(row["water_l_per_kg"]),
-                "energy_mj_per_kg": float(row["energy_mj_per_kg"]),
-            }
-            for row in rows
-        }
-
-    def _load_transport_factors(self) -> Dict[str, Dict[str, float]]:
-        sql = text("""
-            SELECT mode, co2_kg_per_tkm, water_l_per_tkm, energy_mj_per_tkm
-            FROM lca_transport_factors
-        """)
-        rows = self.db.execute(sql).mappings().all()
-        return {
-            row["mode"]: {
-                "co2_kg_per_tkm": float(row["co2_kg_per_tkm"]),
-                "water_l_per_tkm": float(row["water_l_per_tkm"]),
-                "energy_mj_per_tkm": float(row["energy_mj_per_tkm"]),
-            }
-            for row in rows
-        }
+        self.snapshot = factors = get_factor_store().snapshot(self.db)
+        ing_index = factors.ingredients.index
+        pack_index = factors.packaging.index
 
-    # ---------- Calcul ACV ----------
+        # une colonne par attribut, toutes lignes du lot confondues
+        ing = _category_sums(
+            factors.ingredients.matrix,
+            [len(req.ingredients) for req in reqs],
+            [ing_index.get(x.code, -1) for req in reqs for x in req.ingredients],
+            np.array([x.mass_g for req in reqs for x in req.ingredients], dtype=np.float64) / 1000.0,
+        )
+        pack = _category_sums(
+            factors.packaging.matrix,
+            [len(req.packaging) for req in reqs],
+            [pack_index.get(x.material, -1) for req in reqs for x in req.packaging],
+            np.array([x.mass_g for req in reqs for x in req.packaging], dtype=np.float64) / 1000.0,
+        )
 
-    def compute_lca(self, req: LCARequest) -> Tuple[Dict[str, float], Dict[str, Any]]:
-        ing_factors = self._load_ingredient_factors()
-        pack_factors = self._load_packaging_factors()
-        tr_factors = self._load_transport_factors()
-
-        # --- Ingrédients ---
-        co2_ing = water_ing = energy_ing = 0.0
-        for ing in req.ingredients:
-            f = ing_factors.get(ing.code)
-            if not f:
-                # tu peux logger les codes non trouvés si tu veux
-                continue
-
-            mass_kg = ing.mass_g / 1000.0
-            co2_ing += mass_kg * f["co2_kg_per_kg"]
-            water_ing += mass_kg * f["water_l_per_kg"]
-            energy_ing += mass_kg * f["energy_mj_per_kg"]
-
-        # --- Packaging ---
-        co2_pack = water_pack = energy_pack = 0.0
-        for p in req.packaging:
-            f = pack_factors.get(p.material)
-            if not f:
-                continue
-
-            mass_kg = p.mass_g / 1000.0
-            co2_pack += mass_kg * f["co2_kg_per_kg"]
-            water_pack += mass_kg * f["water_l_per_kg"]
-            energy_pack += mass_kg * f["energy_mj_per_kg"]
-
-        # --- Transport ---
-        co2_tr = water_tr = energy_tr = 0.0
-        print(f"DEBUG LCA Calculator: Nombre de legs de transport: {len(req.transport)}")
+        # transport : facteur résolu une fois par mode distinct (repli ROAD / valeurs par défaut)
+        modes: Dict[str, int] = {}
+        mode_rows = [modes.setdefault(t.mode, len(modes)) for req in reqs for t in req.transport]
+        mode_matrix = np.array(
+            [_transport_factor(factors.transport, mode) for mode in modes], dtype=np.float64
+        ).reshape(len(modes), 3)
+        distance_km = np.array([t.distance_km for req in reqs for t in req.transport], dtype=np.float64)
+        mass_kg = np.array([t.mass_kg for req in reqs for t in req.transport], dtype=np.float64)
+        tr = _category_sums(
+            mode_matrix,
+            [len(req.transport) for req in reqs],
+            mode_rows,
+            distance_km * (mass_kg / 1000.0),  # tonne.km
+        )
+
+        # totaux puis arrondis sur tout le lot (mêmes opérations que _result)
+        rounded = _round4(np.hstack([ing, pack, tr, ing + pack + tr])).tolist()
+        return [
+            (
+                dict(zip(_KEYS, r[9:12])),
+                {
+                    "ingredients": dict(zip(_KEYS, r[0:3])),
+                    "packaging": dict(zip(_KEYS, r[3:6])),
+                    "transport": dict(zip(_KEYS, r[6:9])),
+                },
+            )
+            for r in rounded
+        ]
+
+
+    def compute_scenarios(
+        self, base: LCARequest, scenarios: Sequence[LCAScenario]
+    ) -> Tuple[Tuple[Dict[str, float], Dict[str, Any]], List[Tuple[Tuple[Dict[str, float], Dict[str, Any]], List[str]]]]:
+        """
+        Variantes d'un produit : les sommes de chaque composant du produit de
+        base sont calculées une fois ; un scénario ne recalcule que les
+        composants qu'il remplace. Chaque résultat est celui de compute_lca sur
+        la requête modifiée. Renvoie (base, [(résultat, composants recalculés)]).
+        """
+        self.snapshot = factors = get_factor_store().snapshot(self.db)
+        components = (
+            ("ingredients", _ingredient_sums, factors.ingredients),
+            ("packaging", _packaging_sums, factors.packaging),
+            ("transport", _transport_sums, factors.transport),
+        )
+        base_sums = {name: sums(table, getattr(base, name)) for name, sums, table in components}
+
+        results = []
+        for scenario in scenarios:
+            current = dict(base_sums)
+            recomputed = []
+            for name, sums, table in components:
+                items = getattr(scenario, name)
+                if items is not None:
+                    current[name] = sums(table, items)
+                    recomputed.append(name)
+            results.append((_result(current["ingredients"], current["packaging"], current["transport"]), recomputed))
+
+        return _result(base_sums["ingredients"], base_sums["packaging"], base_sums["transport"]), results
+
+    def compute_uncertainty(self, req: LCARequest, samples: int, seed: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Propagation Monte Carlo de l'incertitude des facteurs.
+
+        Chaque facteur suit une loi log-normale de médiane la valeur ponctuelle
+        et d'écart-type géométrique uncertainty_gsd. Un tirage par facteur
+        distinct (deux lignes d'un même code varient ensemble, co2 / eau /
+        énergie d'une ligne aussi) ; toutes les lignes du produit sont tirées
+        en une passe : multiplicateurs (tirages x facteurs) @ contributions
+        (facteurs x 3). Renvoie moyenne, écart-type et percentiles par indicateur
+        (samples >= 1).
+        """
+        if self.snapshot is None:
+            self.snapshot = get_factor_store().snapshot(self.db)
+        factors = self.snapshot
+
+        # (catégorie, code) -> colonne ; contributions ponctuelles cumulées par facteur
+        columns: Dict[Tuple[str, str], int] = {}
+        contributions: List[List[float]] = []
+        log_gsd: List[float] = []
+
+        def add(key: Tuple[str, str], quantity: float, f: Sequence[float], gsd: float) -> None:
+            col = columns.get(key)
+            if col is None:
+                col = columns[key] = len(log_gsd)
+                contributions.append([0.0, 0.0, 0.0])
+                log_gsd.append(math.log(max(gsd, 1.0)))
+            c = contributions[col]
+            c[CO2] += quantity * f[CO2]
+            c[WATER] += quantity * f[WATER]
+            c[ENERGY] += quantity * f[ENERGY]
+
+        for table, category, items in (
+            (factors.ingredients, "ingredients", [(x.code, x.mass_g) for x in req.ingredients]),
+            (factors.packaging, "packaging", [(x.material, x.mass_g) for x in req.packaging]),
+        ):
+            for code, mass_g in items:
+                f = table.get(code)
+                if f:
+                    add((category, code), mass_g / 1000.0, f, table.gsd_of(code))
+
+        tr_factors = factors.transport
         for t in req.transport:
-            print(f"DEBUG LCA Calculator: Traitement transport - mode={t.mode}, distance={t.distance_km} km, mass={t.mass_kg} kg")
-            f = tr_factors.get(t.mode)
-            if not f:
-                # Fallback : si le mode n'existe pas, essayer ROAD ou utiliser des valeurs par défaut
-                # Log pour debug (vous pouvez utiliser logging si vous voulez)
-                print(f"WARNING: Transport mode '{t.mode}' not found in database. Available modes: {list(tr_factors.keys())}")
-                
-                # Essayer ROAD comme fallback
-                f = tr_factors.get("ROAD")
-                if not f:
-                    # Si même ROAD n'existe pas, utiliser des valeurs par défaut réalistes
-                    # (basées sur des moyennes de transport maritime/routier)
-                    if "SEA" in t.mode.upper() or "MARITIME" in t.mode.upper():
-                        # Transport maritime : ~0.015 kg CO2/tkm
-                        f = {"co2_kg_per_tkm": 0.015, "water_l_per_tkm": 0.1, "energy_mj_per_tkm": 0.05}
-                    else:
-                        # Transport routier : ~0.1 kg CO2/tkm
-                        f = {"co2_kg_per_tkm": 0.1, "water_l_per_tkm": 0.5, "energy_mj_per_tkm": 0.3}
-                
-            # tonne.km = distance_km × masse(tonnes)
-            tkm = t.distance_km * (t.mass_kg / 1000.0)
-            co2_tr += tkm * f["co2_kg_per_tkm"]
-            water_tr += tkm * f["water_l_per_tkm"]
-            energy_tr += tkm * f["energy_mj_per_tkm"]
-
-        co2_total = co2_ing + co2_pack + co2_tr
-        water_total = water_ing + water_pack + water_tr
-        energy_total = energy_ing + energy_pack + energy_tr
-
-        breakdown = {
-            "ingredients": {
-                "co2_kg": round(co2_ing, 4),
-                "water_l": round(water_ing, 4),
-                "energy_mj": round(energy_ing, 4),
-            },
-            "packaging": {
-                "co2_kg": round(co2_pack, 4),
-                "water_l": round(water_pack, 4),
-                "energy_mj": round(energy_pack, 4),
-            },
-            "transport": {
-                "co2_kg": round(co2_tr, 4),
-                "water_l": round(water_tr, 4),
-                "energy_mj": round(energy_tr, 4),
-            },
-        }
-
-        totals = {
-            "co2_kg": round(co2_total, 4),
-            "water_l": round(water_total, 4),
-            "energy_mj": round(energy_total, 4),
-        }
-
-        return totals, breakdown
+            gsd = tr_factors.gsd_of(t.mode) or tr_factors.gsd_of("ROAD") or LCA_UNCERTAINTY_GSD_TRANSPORT
+            add(("transport", t.mode), t.distance_km * (t.mass_kg / 1000.0), _transport_factor(tr_factors, t.mode), gsd)
+
+        totals = np.zeros((samples, 3), dtype=np.float64)
+        if log_gsd:
+            rng = np.random.default_rng(seed)
+            sigma = np.array(log_gsd, dtype=np.float64)
+            point = np.array(contributions, dtype=np.float64)
+            # par blocs : mémoire bornée (tirages x facteurs) même pour beaucoup de tirages
+            for start in range(0, samples, _UNCERTAINTY_CHUNK):
+                n = min(_UNCERTAINTY_CHUNK, samples - start)
+                multipliers = np.exp(rng.standard_normal((n, len(log_gsd))) * sigma)
+                totals[start:start + n] = multipliers @ point
+
+        percentiles = np.percentile(totals, LCA_UNCERTAINTY_PERCENTILES, axis=0)
+        mean = totals.mean(axis=0)
+        std = totals.std(axis=0)
+        out: Dict[str, Any] = {"samples": samples, "factors_sampled": len(log_gsd)}
+        for col, key in enumerate(_KEYS):
+            stats = {"mean": round(float(mean[col]), 4), "std": round(float(std[col]), 4)}
+            for p, value in zip(LCA_UNCERTAINTY_PERCENTILES, percentiles[:, col]):
+                stats[f"p{p:g}"] = round(float(value), 4)
+            out[key] = stats
+        return out
+
+
+# tirages par bloc dans compute_uncertainty
+_UNCERTAINTY_CHUNK = 10000
+
+_KEYS = ("co2_kg", "water_l", "energy_mj")
+
+
+# ---------- sommes par composant (co2, eau, énergie) ----------
+
+def _ingredient_sums(ing_factors: FactorTable, ingredients: Sequence[IngredientItem]) -> Tuple[float, float, float]:
+    co2_ing = water_ing = energy_ing = 0.0
+    for ing in ingredients:
+        f = ing_factors.get(ing.code)
+        if not f:
+            # tu peux logger les codes non trouvés si tu veux
+            continue
+
+        mass_kg = ing.mass_g / 1000.0
+        co2_ing += mass_kg * f[CO2]
+        water_ing += mass_kg * f[WATER]
+        energy_ing += mass_kg * f[ENERGY]
+    return co2_ing, water_ing, energy_ing
+
+
+def _packaging_sums(pack_factors: FactorTable, packaging: Sequence[PackagingItem]) -> Tuple[float, float, float]:
+    co2_pack = water_pack = energy_pack = 0.0
+    for p in packaging:
+        f = pack_factors.get(p.material)
+        if not f:
+            continue
+
+        mass_kg = p.mass_g / 1000.0
+        co2_pack += mass_kg * f[CO2]
+        water_pack += mass_kg * f[WATER]
+        energy_pack += mass_kg * f[ENERGY]
+    return co2_pack, water_pack, energy_pack
+
+
+def _transport_sums(tr_factors: FactorTable, transport: Sequence[TransportLeg]) -> Tuple[float, float, float]:
+    co2_tr = water_tr = energy_tr = 0.0
+    for t in transport:
+        f = _transport_factor(tr_factors, t.mode)
+        # tonne.km = distance_km × masse(tonnes)
+        tkm = t.distance_km * (t.mass_kg / 1000.0)
+        co2_tr += tkm * f[CO2]
+        water_tr += tkm * f[WATER]
+        energy_tr += tkm * f[ENERGY]
+    return co2_tr, water_tr, energy_tr
+
+
+
+def _transport_factor(tr_factors: FactorTable, mode: str) -> Tuple[float, float, float]:
+    f = tr_factors.get(mode)
+    if not f:
+        # Fallback : si le mode n'existe pas, essayer ROAD ou utiliser des valeurs par défaut
+        if mode not in _warned_modes:
+            _warned_modes.add(mode)
+            log.warning(
+                f"Mode de transport '{mode}' absent de la base",
+                extra=fields(available_modes=sorted(tr_factors.codes())),
+            )
+
+        # Essayer ROAD comme fallback
+        f = tr_factors.get("ROAD")
+        if not f:
+            # Si même ROAD n'existe pas, utiliser des valeurs par défaut réalistes
+            # (basées sur des moyennes de transport maritime/routier)
+            if "SEA" in mode.upper() or "MARITIME" in mode.upper():
+                # Transport maritime : ~0.015 kg CO2/tkm
+                f = (0.015, 0.1, 0.05)  # co2 kg, eau l, énergie MJ par tkm
+            else:
+                # Transport routier : ~0.1 kg CO2/tkm
+                f = (0.1, 0.5, 0.3)
+    return f
+
+
+def _category_sums(matrix: np.ndarray, counts: List[int], rows: List[int], quantity: np.ndarray) -> np.ndarray:
+    """
+    Sommes (n x 3) co2 / eau / énergie par produit pour une catégorie.
+    counts : nombre de lignes de chaque produit ; rows : ligne de facteur de
+    chaque ligne (-1 : code inconnu, ignoré) ; quantity : kg ou tonne.km.
+    """
+    n = len(counts)
+    sums = np.zeros((n, 3), dtype=np.float64)
+    if not rows:
+        return sums
+    product = np.repeat(np.arange(n), counts)
+    row = np.array(rows, dtype=np.intp)
+    known = row >= 0
+    contributions = quantity[known, None] * matrix[row[known]]
+    for col in (CO2, WATER, ENERGY):
+        sums[:, col] = np.bincount(product[known], weights=contributions[:, col], minlength=n)
+    return sums
+
+
+def _round4(values: np.ndarray) -> np.ndarray:
+    """
+    round(x, 4) de Python sur un tableau. np.round (x * 1e4 arrondi, / 1e4) peut
+    trancher autrement quand x * 1e4 tombe presque sur .5 ou est très grand :
+    ces valeurs-là repassent par round() pour garantir le même résultat.
+    """
+    scaled = values * 1e4
+    out = np.rint(scaled) / 1e4
+    with np.errstate(invalid="ignore"):
+        doubtful = ~(np.abs(scaled) < 1e9) | (np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6)
+    for i in np.flatnonzero(doubtful):
+        out.flat[i] = round(float(values.flat[i]), 4)
+    return out
+
+
+def _result(ing: Sequence[float], pack: Sequence[float], tr: Sequence[float]) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """(totaux, détail) arrondis, à partir des sommes co2 / eau / énergie de chaque catégorie."""
+    co2_ing, water_ing, energy_ing = ing
+    co2_pack, water_pack, energy_pack = pack
+    co2_tr, water_tr, energy_tr = tr
+
+    co2_total = co2_ing + co2_pack + co2_tr
+    water_total = water_ing + water_pack + water_tr
+    energy_total = energy_ing + energy_pack + energy_tr
+
+    breakdown = {
+        "ingredients": {
+            "co2_kg": round(co2_ing, 4),
+            "water_l": round(water_ing, 4),
+            "energy_mj": round(energy_ing, 4),
+        },
+        "packaging": {
+            "co2_kg": round(co2_pack, 4),
+            "water_l": round(water_pack, 4),
+            "energy_mj": round(energy_pack, 4),
+        },
+        "transport": {
+            "co2_kg": round(co2_tr, 4),
+            "water_l": round(water_tr, 4),
+            "energy_mj": round(energy_tr, 4),
+        },
+    }
+
+    totals = {
+        "co2_kg": round(co2_total, 4),
+        "water_l": round(water_total, 4),
+        "energy_mj": round(energy_total, 4),
+    }
+
+    return totals, breakdown
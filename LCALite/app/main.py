@@ -1,12 +1,30 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Response
 from sqlalchemy.orm import Session
+from typing import List, Optional
 import re  # 👈 pour extraire la partie numérique du product_id
 
+from ecolabel_common.service_client import clients_stats, close_clients
+from ecolabel_common.telemetry import TraceMiddleware, annotate, setup_logging, stage, stage_stats
+
 from .db import Base, engine, get_db
 from . import db_models  # pour que les tables soient connues
-from .models import LCARequest, LCAResponse
+from .config import LCA_BATCH_MAX_ITEMS, LCA_SCENARIOS_MAX, LCA_UNCERTAINTY_MAX_SAMPLES, SCORING_TRANSPORT
+from .models import (
+    LCABatchResponse,
+    LCARequest,
+    LCAResponse,
+    LCAScenarioResult,
+    LCAScenariosRequest,
+    LCAScenariosResponse,
+)
 from .lca_calculator import LCACalculator  # ⬅️ on importe la CLASSE
 from .scoring_client import send_to_scoring  # ⬅️ NOUVEAU : client vers MS4
+from .scoring_inprocess import get_score_writer, load_scoring_module
+from .factors_version import factors_version, ingredient_codes
+from .result_store import cache_key, clear_results, lookup, result_store_stats, store
+from .factor_store import add_uncertainty_columns, get_factor_store, install_version_triggers
+
+setup_logging("lca")
 
 
 app = FastAPI(
@@ -14,9 +32,28 @@ app = FastAPI(
     description="Analyse du cycle de vie simplifiée pour EcoLabel-MS",
     version="1.0.0",
 )
+app.add_middleware(TraceMiddleware)
 
 # 👉 création AUTOMATIQUE des tables dans eco_lca au démarrage
 Base.metadata.create_all(bind=engine)
+# colonne d'incertitude sur les tables de facteurs créées avant elle
+add_uncertainty_columns(engine)
+# compteur de version des facteurs (PostgreSQL) : invalide le cache en mémoire
+install_version_triggers(engine)
+
+
+@app.on_event("startup")
+async def on_startup():
+    if SCORING_TRANSPORT == "inprocess":
+        # erreur au démarrage plutôt qu'au premier calcul si le Scoring est introuvable
+        load_scoring_module()
+        await get_score_writer().start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await get_score_writer().stop()
+    await close_clients()
 
 
 @app.get("/")
@@ -24,17 +61,91 @@ def root():
     return {"message": "LCALite OK"}
 
 
+@app.get("/metrics/clients")
+def get_client_metrics():
+    return clients_stats()
+
+
+@app.get("/metrics/stages")
+def get_stage_metrics():
+    return stage_stats()
+
+
+@app.get("/metrics/scoring")
+def get_scoring_metrics():
+    stats = {"transport": SCORING_TRANSPORT}
+    if SCORING_TRANSPORT == "inprocess":
+        stats["writer"] = get_score_writer().stats()
+    return stats
+
+
+@app.get("/metrics/result-cache")
+def get_result_cache_metrics():
+    return result_store_stats()
+
+
+@app.post("/result-cache/clear")
+def clear_result_cache(db: Session = Depends(get_db)):
+    """Vide le LRU de ce worker et la table lca_results."""
+    return clear_results(db)
+
+
+@app.get("/metrics/factors")
+def get_factor_metrics():
+    return get_factor_store().stats()
+
+
+@app.post("/lca/factors/reload")
+def reload_factors(db: Session = Depends(get_db)):
+    """Recharge les facteurs en mémoire sans attendre le prochain contrôle de version."""
+    get_factor_store().reload(db)
+    return get_factor_store().stats()
+
+
+@app.get("/lca/factors/version")
+def get_factors_version(db: Session = Depends(get_db)):
+    """Empreinte des facteurs : change dès qu'un facteur est ajouté, supprimé ou modifié."""
+    return factors_version(db)
+
+
+@app.get("/lca/factors/ingredients")
+def get_ingredient_codes(db: Session = Depends(get_db)):
+    """Codes des facteurs ingrédients, avec la version des facteurs qu'ils accompagnent."""
+    return {"version": factors_version(db)["version"], "codes": ingredient_codes(db)}
+
+
 @app.post("/lca/calc", response_model=LCAResponse)
 def calculate_lca(
     payload: LCARequest,
+    response: Response,
+    samples: int = Query(0, ge=0, le=LCA_UNCERTAINTY_MAX_SAMPLES, description="Tirages Monte Carlo (0 : pas d'incertitude)"),
+    seed: Optional[int] = Query(None, description="Graine des tirages (résultat reproductible)"),
     db: Session = Depends(get_db)
 ):
     try:
+        # 0) Résultat déjà calculé (même requête, mêmes facteurs) : ni calcul ni Scoring
+        annotate(product_id=payload.product_id)
+        factors = get_factor_store().snapshot(db)
+        key = cache_key(payload, factors.version, samples, seed)
+        found = lookup(db, key) if key is not None else None
+        if found is not None:
+            result, origin = found
+            response.headers["X-Result-Cache"] = origin
+            annotate(result_cache=origin)
+            return LCAResponse(**result, factors=factors.info())
+
         # 1) Calcul ACV (ta logique existante)
-        calculator = LCACalculator(db)
-        totals, breakdown = calculator.compute_lca(payload)
+        with stage("lca"):
+            calculator = LCACalculator(db)
+            totals, breakdown = calculator.compute_lca(payload)
         # totals = {"co2_kg": ..., "water_l": ..., "energy_mj": ...}
 
+        # 1 bis) Incertitude (optionnelle) : mêmes facteurs que le calcul ponctuel
+        uncertainty = None
+        if samples:
+            with stage("uncertainty"):
+                uncertainty = calculator.compute_uncertainty(payload, samples, seed)
+
         # 2) Déterminer le type d'emballage principal pour le Scoring
         packaging_type = "unknown"
         if payload.packaging and len(payload.packaging) > 0:
@@ -58,23 +169,118 @@ def calculate_lca(
             numeric_product_id = 0  # fallback générique
 
         # 4) Appeler le microservice Scoring (MS4)
-        score = send_to_scoring(
-            product_id=numeric_product_id,
-            co2_kg=totals["co2_kg"],
-            water_l=totals["water_l"],
-            energy_mj=totals["energy_mj"],
-            packaging_type=packaging_type,
-            data_completeness=1.0
-        )
+        with stage("score"):
+            score = send_to_scoring(
+                product_id=numeric_product_id,
+                co2_kg=totals["co2_kg"],
+                water_l=totals["water_l"],
+                energy_mj=totals["energy_mj"],
+                packaging_type=packaging_type,
+                data_completeness=1.0
+            )
 
         # 5) Retourner la réponse ACV + score
-        return LCAResponse(
+        out = LCAResponse(
             product_id=payload.product_id,
             co2_kg=totals["co2_kg"],
             water_l=totals["water_l"],
             energy_mj=totals["energy_mj"],
             breakdown=breakdown,
-            score=score  # 👈 NOUVEAU
+            score=score,  # 👈 NOUVEAU
+            factors=calculator.snapshot.info(),
+            uncertainty=uncertainty,
+        )
+
+        # 6) Mémoriser, sous la version des facteurs réellement utilisés
+        if key is not None:
+            version = calculator.snapshot.version
+            if version != factors.version:
+                key = cache_key(payload, version, samples, seed)
+            store(db, key, payload.product_id, version, out.dict(exclude={"factors"}))
+        origin = "miss" if key is not None else "bypass"
+        response.headers["X-Result-Cache"] = origin
+        annotate(result_cache=origin)
+        return out
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur LCA: {e}")
+
+
+@app.post("/lca/calc-batch", response_model=LCABatchResponse)
+def calculate_lca_batch(
+    payload: List[LCARequest],
+    db: Session = Depends(get_db)
+):
+    """
+    ACV d'un lot de produits en un appel (calcul vectorisé, mêmes totaux et
+    détail que /lca/calc). Pas d'appel au Scoring : score vide.
+    """
+    if len(payload) > LCA_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lot trop grand : {len(payload)} produits (max {LCA_BATCH_MAX_ITEMS})",
+        )
+    try:
+        annotate(batch_size=len(payload))
+        with stage("lca_batch"):
+            calculator = LCACalculator(db)
+            computed = calculator.compute_lca_batch(payload)
+
+        results = [
+            LCAResponse(
+                product_id=req.product_id,
+                co2_kg=totals["co2_kg"],
+                water_l=totals["water_l"],
+                energy_mj=totals["energy_mj"],
+                breakdown=breakdown,
+            )
+            for req, (totals, breakdown) in zip(payload, computed)
+        ]
+        return LCABatchResponse(count=len(results), factors=calculator.snapshot.info(), results=results)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur LCA: {e}")
+
+
+@app.post("/lca/scenarios", response_model=LCAScenariosResponse)
+def calculate_lca_scenarios(
+    payload: LCAScenariosRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Comparaison de variantes (verre / PET, SEA / ROAD, flacon plus léger...) :
+    un produit de base et des scénarios qui remplacent ses ingrédients, ses
+    emballages et / ou ses trajets. Seuls les composants remplacés sont
+    recalculés. Ni Scoring ni mémorisation : rien n'est enregistré.
+    """
+    if len(payload.scenarios) > LCA_SCENARIOS_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Trop de scénarios : {len(payload.scenarios)} (max {LCA_SCENARIOS_MAX})",
+        )
+    try:
+        annotate(product_id=payload.base.product_id, scenarios=len(payload.scenarios))
+        with stage("scenarios"):
+            calculator = LCACalculator(db)
+            (base_totals, base_breakdown), computed = calculator.compute_scenarios(payload.base, payload.scenarios)
+
+        def scenario_result(name, totals, breakdown, recomputed):
+            return LCAScenarioResult(
+                name=name,
+                **totals,
+                breakdown=breakdown,
+                delta={k: round(totals[k] - base_totals[k], 4) for k in totals},
+                recomputed=recomputed,
+            )
+
+        return LCAScenariosResponse(
+            product_id=payload.base.product_id,
+            base=scenario_result("base", base_totals, base_breakdown, []),
+            scenarios=[
+                scenario_result(scenario.name, totals, breakdown, recomputed)
+                for scenario, ((totals, breakdown), recomputed) in zip(payload.scenarios, computed)
+            ],
+            factors=calculator.snapshot.info(),
         )
 
     except Exception as e:
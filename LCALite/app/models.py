@@ -36,3 +36,47 @@ class LCAResponse(BaseModel):
     breakdown: Dict[str, Any]
     # 👇 NOUVEAU : le score renvoyé par le MS4
     score: Optional[Dict[str, Any]] = None
+    # version et âge (s) des facteurs en mémoire utilisés pour le calcul
+    factors: Optional[Dict[str, Any]] = None
+    # /lca/calc?samples=N : moyenne, écart-type et percentiles Monte Carlo par indicateur
+    uncertainty: Optional[Dict[str, Any]] = None
+
+
+class LCABatchResponse(BaseModel):
+    count: int
+    # facteurs utilisés pour tout le lot (un seul instantané)
+    factors: Optional[Dict[str, Any]] = None
+    # mêmes valeurs que /lca/calc, dans l'ordre des requêtes, sans score
+    results: List[LCAResponse]
+
+
+class LCAScenario(BaseModel):
+    """Variante du produit de base : chaque liste donnée remplace celle de la base."""
+    name: str
+    ingredients: Optional[List[IngredientItem]] = None
+    packaging: Optional[List[PackagingItem]] = None
+    transport: Optional[List[TransportLeg]] = None
+
+
+class LCAScenariosRequest(BaseModel):
+    base: LCARequest
+    scenarios: List[LCAScenario] = []
+
+
+class LCAScenarioResult(BaseModel):
+    name: str
+    co2_kg: float
+    water_l: float
+    energy_mj: float
+    breakdown: Dict[str, Any]
+    # écart au produit de base (scénario - base), par indicateur
+    delta: Dict[str, float]
+    # composants recalculés (les autres reprennent ceux de la base)
+    recomputed: List[str]
+
+
+class LCAScenariosResponse(BaseModel):
+    product_id: str
+    base: LCAScenarioResult
+    scenarios: List[LCAScenarioResult]
+    factors: Optional[Dict[str, Any]] = None
@@ -0,0 +1,185 @@
+# result_store.py
+"""
+Résultats mémorisés de /lca/calc (ACV + score).
+
+- clé = SHA-256 de la requête canonique (JSON, clés triées, valeurs telles
+  que validées par pydantic : 100 et 100.0 donnent la même clé ; l'ordre des
+  listes compte, il fixe l'ordre des additions) + version des facteurs en
+  mémoire (factor_store) + paramètres d'incertitude : une modification des
+  facteurs change la clé, les anciennes lignes ne sont plus lues
+- LRU en mémoire (LCA_RESULT_CACHE_MAX_ENTRIES, un par worker) devant la
+  table lca_results (partagée par tous les workers / instances)
+- un résultat retrouvé évite le calcul et l'appel au Scoring (pas de nouvelle
+  ligne scores) : la réponse renvoyée est celle du premier calcul, seul le
+  champ factors (âge des facteurs) est celui du moment
+- incertitude sans graine (tirages non reproductibles) : pas de mémorisation
+- éviction de la table toutes les _EVICT_EVERY écritures : lignes d'une
+  ancienne version des facteurs, puis les moins récemment servies au-delà de
+  LCA_RESULTS_MAX_ROWS (last_used_at n'est mis à jour que sur lecture en table)
+- base indisponible : le calcul se fait normalement, sans mémorisation
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ecolabel_common.telemetry import get_logger
+
+from .config import LCA_RESULT_CACHE_ENABLED, LCA_RESULT_CACHE_MAX_ENTRIES, LCA_RESULTS_MAX_ROWS
+from .db_models import LCAResult
+from .models import LCARequest
+
+log = get_logger("result_store")
+
+# éviction de la table : une fois tous les N enregistrements (COUNT(*) coûteux)
+_EVICT_EVERY = 100
+
+
+def result_key(req: LCARequest, factors_version: str, samples: int = 0, seed: Optional[int] = None) -> str:
+    canonical = json.dumps(req.dict(), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.sha256()
+    for part in (canonical, factors_version, str(samples), str(seed)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LocalResults:
+    """LRU borné en nombre d'entrées (réponses gardées en JSON sérialisé)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+            return blob
+
+    def put(self, key: str, blob: str) -> None:
+        with self._lock:
+            self._entries[key] = blob
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "evictions": self.evictions}
+
+
+_local = LocalResults(LCA_RESULT_CACHE_MAX_ENTRIES)
+_counters = {"hits": 0, "stored_hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "store_errors": 0}
+_counters_lock = threading.Lock()
+
+
+def _incr(name: str) -> int:
+    with _counters_lock:
+        _counters[name] += 1
+        return _counters[name]
+
+
+def cache_key(req: LCARequest, factors_version: Optional[str], samples: int, seed: Optional[int]) -> Optional[str]:
+    """Clé du résultat, ou None s'il ne doit pas être mémorisé."""
+    if not LCA_RESULT_CACHE_ENABLED or factors_version is None or (samples and seed is None):
+        _incr("bypassed")
+        return None
+    return result_key(req, factors_version, samples, seed)
+
+
+def lookup(db: Session, key: str) -> Optional[Tuple[Dict[str, Any], str]]:
+    """(réponse, origine "hit" | "stored_hit") ou None ; une erreur de base = absent."""
+    blob = _local.get(key)
+    if blob is not None:
+        _incr("hits")
+        return json.loads(blob), "hit"
+
+    try:
+        blob = db.scalar(select(LCAResult.result).where(LCAResult.key == key))
+        if blob is not None:
+            db.execute(
+                update(LCAResult)
+                .where(LCAResult.key == key)
+                .values(hits=LCAResult.hits + 1, last_used_at=func.now())
+            )
+            db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        _incr("store_errors")
+        log.warning(f"lca_results illisible : {e.__class__.__name__}")
+        return None
+    if blob is None:
+        _incr("misses")
+        return None
+    _local.put(key, blob)
+    _incr("stored_hits")
+    return json.loads(blob), "stored_hit"
+
+
+def store(db: Session, key: str, product_id: str, factors_version: str, result: Dict[str, Any]) -> None:
+    blob = json.dumps(result, ensure_ascii=False)
+    _local.put(key, blob)
+    try:
+        db.add(LCAResult(key=key, product_id=product_id, factors_version=factors_version, result=blob, hits=0))
+        db.commit()
+    except IntegrityError:
+        # même requête calculée en même temps par un autre worker : sa ligne suffit
+        db.rollback()
+        return
+    except SQLAlchemyError as e:
+        db.rollback()
+        _incr("store_errors")
+        log.warning(f"lca_results non mis à jour : {e.__class__.__name__}")
+        return
+    if _incr("stores") % _EVICT_EVERY == 0:
+        _evict(db, factors_version)
+
+
+def _evict(db: Session, factors_version: str) -> None:
+    try:
+        db.execute(delete(LCAResult).where(LCAResult.factors_version != factors_version))
+        count = db.scalar(select(func.count()).select_from(LCAResult)) or 0
+        excess = count - LCA_RESULTS_MAX_ROWS
+        if excess > 0:
+            oldest = select(LCAResult.key).order_by(LCAResult.last_used_at.asc()).limit(excess)
+            db.execute(delete(LCAResult).where(LCAResult.key.in_(oldest.scalar_subquery())))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        _incr("store_errors")
+        log.warning(f"Éviction de lca_results impossible : {e.__class__.__name__}")
+
+
+def clear_results(db: Session) -> Dict[str, Any]:
+    _local.clear()
+    db.execute(delete(LCAResult))
+    db.commit()
+    return result_store_stats()
+
+
+def result_store_stats() -> Dict[str, Any]:
+    with _counters_lock:
+        counters = dict(_counters)
+    lookups = counters["hits"] + counters["stored_hits"] + counters["misses"]
+    served = counters["hits"] + counters["stored_hits"]
+    return {
+        "enabled": LCA_RESULT_CACHE_ENABLED,
+        **counters,
+        "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+        "local": _local.stats(),
+        "max_rows": LCA_RESULTS_MAX_ROWS,
+    }
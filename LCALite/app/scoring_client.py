@@ -1,5 +1,23 @@
-import httpx
-from .config import SCORING_SERVICE_URL
+from ecolabel_common.service_client import get_client
+
+from .config import SCORING_SERVICE_URL, SCORING_TRANSPORT
+from .scoring_inprocess import score_inprocess
+
+# Pool de connexions gardé pendant la vie de l'application
+_client = get_client("scoring", timeout=5.0)
+
+
+def _score_http(payload: dict):
+    return _client.post_json_sync(SCORING_SERVICE_URL, payload)
+
+
+# SCORING_TRANSPORT : "http" (services séparés) ou "inprocess" (même conteneur)
+_TRANSPORTS = {
+    "http": _score_http,
+    "inprocess": score_inprocess,
+}
+if SCORING_TRANSPORT not in _TRANSPORTS:
+    raise ValueError(f"SCORING_TRANSPORT inconnu : {SCORING_TRANSPORT!r} (attendu : {', '.join(_TRANSPORTS)})")
 
 
 def send_to_scoring(
@@ -11,7 +29,7 @@ def send_to_scoring(
     data_completeness: float = 1.0
 ):
     """
-    Client HTTP vers le microservice MS4 Scoring.
+    Client vers le microservice MS4 Scoring.
     Envoie les indicateurs ACV et récupère le score (A–E, numeric_score, etc.).
     """
     payload = {
@@ -23,6 +41,4 @@ def send_to_scoring(
         "data_completeness": data_completeness
     }
 
-    response = httpx.post(SCORING_SERVICE_URL, json=payload, timeout=5.0)
-    response.raise_for_status()
-    return response.json()
+    return _TRANSPORTS[SCORING_TRANSPORT](payload)
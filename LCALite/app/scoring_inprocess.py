@@ -0,0 +1,224 @@
+# scoring_inprocess.py
+"""
+Transport "inprocess" vers le Scoring (SCORING_TRANSPORT=inprocess), pour le
+déploiement en conteneur unique (supervisord.conf) où LCALite et Scoring
+partagent la machine.
+
+- le score est calculé dans le processus LCALite par la fonction du service
+  Scoring (Scoring/app/scoring_service.py, chargé depuis SCORING_SERVICE_DIR) :
+  pas d'aller-retour HTTP / JSON, pas de thread bloqué sur le réseau
+- la ligne de la table scores (base du Scoring) n'est pas écrite pendant la
+  requête : ScoreWriter la dépose dans une file et une tâche asyncio l'écrit
+  par lots (un INSERT multi-lignes par SCORING_WRITER_BATCH lignes ou toutes
+  les SCORING_WRITER_FLUSH_MS ms), par un moteur async (asyncpg)
+- file pleine (SCORING_WRITER_QUEUE) ou base indisponible : le score est
+  quand même renvoyé, la ligne est perdue et comptée (GET /metrics/scoring)
+- arrêt du service : la file est vidée avant la fermeture du moteur
+"""
+import asyncio
+import importlib.util
+import os
+import time
+from datetime import datetime, timezone
+from types import ModuleType
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import JSON, Column, DateTime, Float, Integer, MetaData, String, Table, func, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from ecolabel_common.telemetry import fields, get_logger
+
+from .config import (
+    SCORING_ASYNC_DATABASE_URL,
+    SCORING_SERVICE_DIR,
+    SCORING_WRITER_BATCH,
+    SCORING_WRITER_FLUSH_MS,
+    SCORING_WRITER_QUEUE,
+)
+
+log = get_logger("scoring_inprocess")
+
+# Même table que Scoring/app/models.py (Score) : à garder alignées
+_metadata = MetaData()
+scores = Table(
+    "scores",
+    _metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("product_id", Integer, index=True, nullable=False),
+    Column("numeric_score", Float, nullable=False),
+    Column("grade", String(1), nullable=False),
+    Column("confidence", Float, nullable=False),
+    Column("details", JSON, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+_scoring_module: Optional[ModuleType] = None
+
+
+def load_scoring_module() -> ModuleType:
+    """
+    Charge Scoring/app/scoring_service.py par son chemin : les deux services ont
+    un paquet nommé "app", un import classique prendrait celui de LCALite.
+    """
+    global _scoring_module
+    if _scoring_module is None:
+        path = os.path.join(SCORING_SERVICE_DIR, "app", "scoring_service.py")
+        spec = importlib.util.spec_from_file_location("ecolabel_scoring_service", path)
+        if spec is None or not os.path.isfile(path):
+            raise RuntimeError(f"Service Scoring introuvable : {path} (SCORING_SERVICE_DIR)")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _scoring_module = module
+    return _scoring_module
+
+
+class ScoreWriter:
+    """File de lignes scores écrite par lots par une tâche de la boucle asyncio."""
+
+    def __init__(
+        self,
+        url: str = SCORING_ASYNC_DATABASE_URL,
+        batch: int = SCORING_WRITER_BATCH,
+        flush_ms: float = SCORING_WRITER_FLUSH_MS,
+        maxsize: int = SCORING_WRITER_QUEUE,
+    ):
+        self.url = url
+        self.batch = batch
+        self.flush_s = flush_ms / 1000
+        self.maxsize = maxsize
+        self._engine: Optional[AsyncEngine] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"submitted": 0, "written": 0, "batches": 0, "dropped": 0, "failed": 0, "last_batch_ms": 0.0}
+
+    async def start(self) -> None:
+        self._engine = create_async_engine(self.url, pool_pre_ping=True)
+        # même création de table que le service Scoring à son démarrage
+        async with self._engine.begin() as conn:
+            await conn.run_sync(_metadata.create_all)
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, row: Dict[str, Any]) -> None:
+        """Depuis n'importe quel thread (endpoint synchrone) : ne bloque jamais."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self._drop("writer non démarré")
+            return
+        loop.call_soon_threadsafe(self._put, row)
+
+    def _put(self, row: Dict[str, Any]) -> None:
+        if self._queue is None:
+            self._drop("writer arrêté")
+            return
+        try:
+            self._queue.put_nowait(row)
+            self._stats["submitted"] += 1
+        except asyncio.QueueFull:
+            self._drop("file pleine")
+
+    def _drop(self, reason: str) -> None:
+        self._stats["dropped"] += 1
+        # un avertissement au premier abandon puis tous les 1000
+        if self._stats["dropped"] % 1000 == 1:
+            log.warning(f"Score non enregistré : {reason}", extra=fields(dropped=self._stats["dropped"]))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is None:
+                break
+            rows = [row]
+            deadline = loop.time() + self.flush_s
+            while len(rows) < self.batch:
+                try:
+                    row = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        row = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if row is None:
+                    stopping = True
+                    break
+                rows.append(row)
+            await self._write(rows)
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> None:
+        t0 = time.perf_counter()
+        try:
+            async with self._engine.begin() as conn:
+                await conn.execute(insert(scores), rows)
+        except Exception as e:
+            # SQLAlchemyError, mais aussi OSError du pilote (db-scoring injoignable) :
+            # une exception ici arrêterait _run et plus aucun score ne serait écrit
+            self._stats["failed"] += len(rows)
+            log.warning(f"Écriture des scores impossible : {e.__class__.__name__}", extra=fields(rows=len(rows)))
+            return
+        self._stats["written"] += len(rows)
+        self._stats["batches"] += 1
+        self._stats["last_batch_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+
+    async def stop(self) -> None:
+        """Écrit ce qui reste dans la file puis ferme le moteur."""
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+        self._queue = None
+        self._loop = None
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batch": self.batch,
+            "flush_ms": self.flush_s * 1000,
+            **self._stats,
+        }
+
+
+_writer = ScoreWriter()
+
+
+def get_score_writer() -> ScoreWriter:
+    return _writer
+
+
+def score_inprocess(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Même réponse que POST /score/compute du Scoring ; la ligne scores est écrite plus tard."""
+    # mêmes bornes que ScoreRequest (Scoring/app/schemas.py)
+    for name in ("co2_kg", "water_l", "energy_mj"):
+        if payload[name] < 0:
+            raise ValueError(f"{name} doit être >= 0")
+    if not 0 <= payload["data_completeness"] <= 1:
+        raise ValueError("data_completeness doit être entre 0 et 1")
+
+    result = load_scoring_module().compute_score(
+        co2_kg=payload["co2_kg"],
+        water_l=payload["water_l"],
+        energy_mj=payload["energy_mj"],
+        packaging_type=payload["packaging_type"],
+        data_completeness=payload["data_completeness"],
+    )
+    created_at = datetime.now(timezone.utc)
+    row = {
+        "product_id": payload["product_id"],
+        "numeric_score": result["numeric_score"],
+        "grade": result["grade"],
+        "confidence": result["confidence"],
+        "details": result["details"],
+        "created_at": created_at,
+    }
+    _writer.submit(row)
+    return {**row, "created_at": created_at.isoformat()}
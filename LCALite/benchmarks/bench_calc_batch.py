@@ -0,0 +1,114 @@
+# benchmarks/bench_calc_batch.py
+"""
+Débit (produits / s) de /lca/calc-batch contre la boucle actuelle, produit par
+produit :
+- calcul seul : LCACalculator.compute_lca_batch contre compute_lca en boucle
+- HTTP (TestClient, en processus) : un POST /lca/calc-batch contre un
+  POST /lca/calc par produit ; appel au Scoring remplacé par None
+
+Produits synthétiques de taille variable, avec quelques codes inconnus et un
+mode de transport absent de la base (repli ROAD) ; vérifie que les deux
+chemins renvoient exactement les mêmes totaux et détails.
+
+Usage (depuis LCALite/) :
+    python benchmarks/bench_calc_batch.py [--products 5000] [--http-products 1000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+_DB = os.path.join(tempfile.mkdtemp(), "bench_batch.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # ecolabel_common
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import main as service  # noqa: E402
+from app.db import SessionLocal  # noqa: E402
+from app.lca_calculator import LCACalculator  # noqa: E402
+from app.models import LCARequest  # noqa: E402
+from bench_factor_store import populate  # noqa: E402
+
+MODES = ("ROAD", "SEA", "SEA_ROAD", "AIR", "RAIL", "BARGE")  # BARGE : absent de la base
+
+
+def product(i: int, rnd: random.Random, n_ingredients: int) -> LCARequest:
+    def code() -> str:
+        # ~3 % de codes inconnus, ignorés par le calcul
+        return f"ING_{rnd.randrange(n_ingredients)}" if rnd.random() > 0.03 else "UNKNOWN"
+
+    return LCARequest(
+        product_id=f"P-{i}",
+        category="bench",
+        ingredients=[{"code": code(), "mass_g": rnd.uniform(1, 200)} for _ in range(rnd.randint(0, 15))],
+        packaging=[{"material": f"MAT_{rnd.randrange(50)}", "mass_g": rnd.uniform(5, 80)}
+                   for _ in range(rnd.randint(0, 3))],
+        transport=[{"mode": rnd.choice(MODES), "distance_km": rnd.uniform(10, 9000), "mass_kg": rnd.uniform(0.1, 2)}
+                   for _ in range(rnd.randint(0, 3))],
+    )
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--http-products", type=int, default=1000)
+    parser.add_argument("--ingredients", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    populate(args.ingredients, rnd)
+    products = [product(i, rnd, args.ingredients) for i in range(args.products)]
+    db = SessionLocal()
+    calculator = LCACalculator(db)
+
+    looped = [calculator.compute_lca(req) for req in products]  # chargement des facteurs hors mesure
+    batched = calculator.compute_lca_batch(products)
+    mismatches = sum(a != b for a, b in zip(looped, batched))
+
+    loop_s = best_of(args.repeat, lambda: [calculator.compute_lca(req) for req in products])
+    batch_s = best_of(args.repeat, lambda: calculator.compute_lca_batch(products))
+
+    lines = sum(len(p.ingredients) + len(p.packaging) + len(p.transport) for p in products)
+    print(f"{len(products)} produits ({lines} lignes), {args.ingredients} facteurs ingrédients")
+    print(f"  boucle compute_lca : {len(products) / loop_s:10.0f} produits/s")
+    print(f"  compute_lca_batch  : {len(products) / batch_s:10.0f} produits/s  (x{loop_s / batch_s:.1f})")
+    print(f"  résultats différents : {mismatches}")
+    db.close()
+
+    service.send_to_scoring = lambda **_: None
+    client = TestClient(service.app)
+    payloads = [p.dict() for p in products[:args.http_products]]
+    t0 = time.perf_counter()
+    single = [client.post("/lca/calc", json=p).json() for p in payloads]
+    loop_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batch = client.post("/lca/calc-batch", json=payloads).json()["results"]
+    batch_s = time.perf_counter() - t0
+    fields = ("co2_kg", "water_l", "energy_mj", "breakdown")
+    mismatches += sum(any(a[k] != b[k] for k in fields) for a, b in zip(single, batch))
+
+    print(f"HTTP, {len(payloads)} produits")
+    print(f"  POST /lca/calc x{len(payloads):<6}: {len(payloads) / loop_s:10.0f} produits/s")
+    print(f"  POST /lca/calc-batch : {len(payloads) / batch_s:10.0f} produits/s  (x{loop_s / batch_s:.0f})")
+    print(f"  résultats différents (total) : {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_factor_store.py
+"""
+Coût de LCACalculator.compute_lca : facteurs relus en base à chaque calcul
+(ancien comportement : trois SELECT complets + conversion Decimal -> float)
+contre instantané en mémoire (factor_store).
+
+Base SQLite temporaire remplie de facteurs synthétiques : la base réelle
+(PostgreSQL, réseau) ne fait qu'accentuer l'écart.
+
+Usage (depuis LCALite/) :
+    python benchmarks/bench_factor_store.py [--ingredients 2000] [--requests 500]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+_DB = os.path.join(tempfile.mkdtemp(), "bench_factors.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # ecolabel_common
+
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.db_models import IngredientFactor, PackagingFactor, TransportFactor  # noqa: E402
+from app.factor_store import _INGREDIENT_SQL, _PACKAGING_SQL, _TRANSPORT_SQL, FactorTable  # noqa: E402
+from app.lca_calculator import LCACalculator  # noqa: E402
+from app.models import LCARequest  # noqa: E402
+
+
+def populate(n_ingredients: int, rnd: random.Random) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    factor = lambda: round(rnd.uniform(0.01, 20), 4)  # noqa: E731
+    db.add_all(IngredientFactor(code=f"ING_{i}", co2_kg_per_kg=factor(), water_l_per_kg=factor(),
+                                energy_mj_per_kg=factor()) for i in range(n_ingredients))
+    db.add_all(PackagingFactor(material=f"MAT_{i}", co2_kg_per_kg=factor(), water_l_per_kg=factor(),
+                               energy_mj_per_kg=factor()) for i in range(50))
+    db.add_all(TransportFactor(mode=mode, co2_kg_per_tkm=factor(), water_l_per_tkm=factor(),
+                               energy_mj_per_tkm=factor()) for mode in ("ROAD", "SEA", "SEA_ROAD", "AIR", "RAIL"))
+    db.commit()
+    db.close()
+
+
+def request(rnd: random.Random, n_ingredients: int) -> LCARequest:
+    return LCARequest(
+        product_id="P-1",
+        category="bench",
+        ingredients=[{"code": f"ING_{rnd.randrange(n_ingredients)}", "mass_g": rnd.uniform(1, 200)} for _ in range(8)],
+        packaging=[{"material": f"MAT_{rnd.randrange(50)}", "mass_g": 25}],
+        transport=[{"mode": "ROAD", "distance_km": 800, "mass_kg": 0.5}],
+    )
+
+
+def reload_every_call(db) -> None:
+    """Ancien chargement par requête (mêmes requêtes SQL, mêmes conversions)."""
+    for sql in (_INGREDIENT_SQL, _PACKAGING_SQL, _TRANSPORT_SQL):
+        FactorTable(db.execute(sql).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredients", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    populate(args.ingredients, rnd)
+    requests = [request(rnd, args.ingredients) for _ in range(args.requests)]
+    db = SessionLocal()
+    calculator = LCACalculator(db)
+    calculator.compute_lca(requests[0])  # premier chargement hors mesure
+
+    t0 = time.perf_counter()
+    for req in requests:
+        reload_every_call(db)
+        calculator.compute_lca(req)
+    per_call_ms = (time.perf_counter() - t0) * 1000 / len(requests)
+
+    t0 = time.perf_counter()
+    for req in requests:
+        calculator.compute_lca(req)
+    store_ms = (time.perf_counter() - t0) * 1000 / len(requests)
+
+    print(f"{args.ingredients} facteurs ingrédients, {len(requests)} calculs")
+    print(f"  relecture à chaque calcul : {per_call_ms:8.3f} ms/calcul")
+    print(f"  facteurs en mémoire       : {store_ms:8.3f} ms/calcul  (x{per_call_ms / store_ms:.0f})")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
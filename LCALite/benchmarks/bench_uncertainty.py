@@ -0,0 +1,82 @@
+# benchmarks/bench_uncertainty.py
+"""
+Durée de LCACalculator.compute_uncertainty (Monte Carlo) pour un produit
+type : 10 ingrédients, 2 emballages, 2 trajets. Objectif : < 50 ms pour
+10 000 tirages.
+
+Affiche aussi les statistiques des tirages à côté du calcul ponctuel (loi
+log-normale de médiane le facteur : moyenne et médiane de la somme sont
+un peu au-dessus de la valeur ponctuelle).
+
+Usage (depuis LCALite/) :
+    python benchmarks/bench_uncertainty.py [--samples 10000] [--runs 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+_DB = os.path.join(tempfile.mkdtemp(), "bench_uncertainty.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB}"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # ecolabel_common
+
+from app.db import SessionLocal  # noqa: E402
+from app.lca_calculator import LCACalculator  # noqa: E402
+from app.models import LCARequest  # noqa: E402
+from bench_factor_store import populate  # noqa: E402
+
+BUDGET_MS = 50.0
+
+
+def typical_product(rnd: random.Random, n_ingredients: int) -> LCARequest:
+    return LCARequest(
+        product_id="P-1",
+        category="bench",
+        ingredients=[{"code": f"ING_{rnd.randrange(n_ingredients)}", "mass_g": rnd.uniform(1, 200)} for _ in range(10)],
+        packaging=[{"material": f"MAT_{rnd.randrange(50)}", "mass_g": rnd.uniform(5, 80)} for _ in range(2)],
+        transport=[{"mode": "SEA", "distance_km": 9000, "mass_kg": 0.5}, {"mode": "ROAD", "distance_km": 800, "mass_kg": 0.5}],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--ingredients", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    populate(args.ingredients, rnd)
+    products = [typical_product(rnd, args.ingredients) for _ in range(args.runs)]
+    db = SessionLocal()
+    calculator = LCACalculator(db)
+    totals, _ = calculator.compute_lca(products[0])  # chargement des facteurs hors mesure
+    result = calculator.compute_uncertainty(products[0], args.samples, seed=args.seed)
+
+    durations = []
+    for req in products:
+        t0 = time.perf_counter()
+        calculator.compute_uncertainty(req, args.samples)
+        durations.append((time.perf_counter() - t0) * 1000)
+    durations.sort()
+    p95 = durations[int(len(durations) * 0.95) - 1]
+
+    print(f"{args.samples} tirages, {result['factors_sampled']} facteurs, {args.runs} produits")
+    print(f"  p50 {statistics.median(durations):6.2f} ms  p95 {p95:6.2f} ms  max {durations[-1]:6.2f} ms"
+          f"  (objectif < {BUDGET_MS:.0f} ms)")
+    for key in ("co2_kg", "water_l", "energy_mj"):
+        stats = result[key]
+        print(f"  {key:<10} ponctuel {totals[key]:10.4f}  "
+              + "  ".join(f"{name} {value:10.4f}" for name, value in stats.items()))
+    db.close()
+    if p95 >= BUDGET_MS:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
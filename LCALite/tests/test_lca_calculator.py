@@ -0,0 +1,20 @@
+import random
+
+import numpy as np
+
+from app.lca_calculator import _round4
+
+
+def test_round4_matches_builtin_round():
+    rnd = random.Random(0)
+    values = [rnd.uniform(-1000, 1000) for _ in range(2000)]
+    # valeurs dont x * 1e4 tombe (presque) sur .5
+    values += [0.00005, 0.00015, 1.00025, 2.675, 1234.56785, -0.00005]
+    assert _round4(np.array(values)).tolist() == [round(v, 4) for v in values]
+
+
+def test_round4_large_values_and_shape():
+    values = np.array([[1e12 + 0.123456, 0.0], [-3.14159265, 7.5]])
+    out = _round4(values)
+    assert out.shape == values.shape
+    assert out.tolist() == [[round(v, 4) for v in row] for row in values.tolist()]
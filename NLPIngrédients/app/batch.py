@@ -0,0 +1,187 @@
+# batch.py
+"""
+/nlp/extract-batch : extraction + normalisation d'un lot de textes, réponse NDJSON.
+
+- entrée : tableau JSON de RawTextRequest, ou NDJSON (une RawTextRequest par
+  ligne, Content-Type application/x-ndjson) lu au fil de l'eau : pour de très
+  gros lots, seul l'NDJSON garde la mémoire constante côté entrée
+- les textes sont traités par paquets de NLP_BATCH_CHUNK : extraction répartie
+  sur un pool de processus (NLP_BATCH_WORKERS), puis une seule passe de
+  normalisation par paquet (services.normalize_many)
+- le paquet suivant est extrait pendant que le précédent est normalisé et envoyé ;
+  au plus deux paquets en mémoire
+- une ligne de sortie par texte, dans l'ordre : {"index": i, ...NLPResponse}
+  ou {"index": i, "error": "..."} si l'entrée est invalide
+"""
+import asyncio
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from .config import NLP_BATCH_CHUNK, NLP_BATCH_WORKERS, NLP_BATCH_MIN_PARALLEL
+from .db import SessionLocal
+from .nlp_pipeline import extract_raw_batch, keywords_version, set_taxonomy_keywords, taxonomy_keywords
+from .schemas import NLPResponse, RawTextRequest
+from .services import normalize_many
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonlines")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_keywords_version = -1
+_stats = {"batches": 0, "items": 0, "errors": 0}
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Pool créé à la demande ("spawn" : pas de fork d'un process uvicorn multi-thread).
+    Les workers reçoivent les mots-clés des taxonomies à leur démarrage : le pool
+    est recréé quand l'index des taxonomies les a changés.
+    """
+    global _pool, _pool_keywords_version
+    version = keywords_version()
+    if _pool is not None and _pool_keywords_version != version:
+        _pool.shutdown(wait=False)  # les paquets en cours se terminent
+        _pool = None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=NLP_BATCH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=set_taxonomy_keywords,
+            initargs=(taxonomy_keywords(),),
+        )
+        _pool_keywords_version = version
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def batch_stats() -> Dict[str, Any]:
+    return {"workers": NLP_BATCH_WORKERS, "chunk": NLP_BATCH_CHUNK, "pool_started": _pool is not None, **_stats}
+
+
+def _parse_item(obj: Any) -> Tuple[Optional[RawTextRequest], Optional[str]]:
+    try:
+        return RawTextRequest(**obj), None
+    except (TypeError, ValidationError) as e:
+        return None, f"Requête invalide : {str(e).splitlines()[0]}"
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Objets JSON d'un flux NDJSON (lignes vides ignorées)."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _loads(line)
+    if buffer.strip():
+        yield _loads(buffer)
+
+
+def _loads(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return _InvalidLine(str(e))
+
+
+class _InvalidLine:
+    def __init__(self, error: str):
+        self.error = f"JSON invalide : {error}"
+
+
+class BatchStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse sans tâche d'écoute de déconnexion : en NDJSON le corps de la
+    requête est lu pendant l'envoi de la réponse, et cette tâche consommerait les
+    messages http.request. Une déconnexion du client fait échouer l'envoi.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_items(items: List[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+async def _chunks(objects: AsyncIterator[Any]) -> AsyncIterator[List[Tuple[int, Optional[RawTextRequest], Optional[str]]]]:
+    chunk = []
+    index = 0
+    async for obj in objects:
+        if isinstance(obj, _InvalidLine):
+            chunk.append((index, None, obj.error))
+        else:
+            chunk.append((index, *_parse_item(obj)))
+        index += 1
+        if len(chunk) >= NLP_BATCH_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _extract(texts: List[str]) -> List[Dict[str, List[str]]]:
+    if NLP_BATCH_WORKERS <= 1 or len(texts) < NLP_BATCH_MIN_PARALLEL:
+        return await run_in_threadpool(extract_raw_batch, texts)
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    size = -(-len(texts) // NLP_BATCH_WORKERS)
+    parts = await asyncio.gather(*[
+        loop.run_in_executor(pool, extract_raw_batch, texts[i:i + size])
+        for i in range(0, len(texts), size)
+    ])
+    return [entities for part in parts for entities in part]
+
+
+def _normalize_lines(chunk, extracted) -> bytes:
+    db = SessionLocal()
+    try:
+        normalized = iter(normalize_many(db, extracted))
+    finally:
+        db.close()
+
+    lines = []
+    for index, payload, error in chunk:
+        if payload is None:
+            _stats["errors"] += 1
+            line = {"index": index, "error": error}
+        else:
+            response = NLPResponse(product_id=payload.product_id, **next(normalized))
+            line = {"index": index, **response.dict()}
+        lines.append(json.dumps(line, ensure_ascii=False))
+    _stats["items"] += len(chunk)
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def stream_batch(objects: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+    _stats["batches"] += 1
+
+    def start(chunk):
+        texts = [payload.text for _, payload, _ in chunk if payload is not None]
+        return asyncio.ensure_future(_extract(texts))
+
+    pending = None
+    async for chunk in _chunks(objects):
+        extraction = start(chunk)
+        if pending is not None:
+            previous_chunk, previous_extraction = pending
+            yield await run_in_threadpool(_normalize_lines, previous_chunk, await previous_extraction)
+        pending = (chunk, extraction)
+    if pending is not None:
+        previous_chunk, previous_extraction = pending
+        yield await run_in_threadpool(_normalize_lines, previous_chunk, await previous_extraction)
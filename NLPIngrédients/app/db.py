@@ -1,12 +1,35 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL,
+    NLP_ASYNC_DATABASE_URL,
+    NLP_DB_POOL_SIZE,
+    NLP_DB_MAX_OVERFLOW,
+    NLP_DB_POOL_TIMEOUT_S,
+    NLP_DB_POOL_RECYCLE_S,
+)
 from .models import Base
 
 engine = create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Moteur async (asyncpg) pour les endpoints async : aucune requête ne bloque la boucle
+_pool_args = {} if NLP_ASYNC_DATABASE_URL.startswith("sqlite") else {
+    "pool_size": NLP_DB_POOL_SIZE,
+    "max_overflow": NLP_DB_MAX_OVERFLOW,
+    "pool_timeout": NLP_DB_POOL_TIMEOUT_S,
+}
+async_engine = create_async_engine(
+    NLP_ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=NLP_DB_POOL_RECYCLE_S,
+    **_pool_args,
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
 
@@ -16,3 +39,10 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def close_async_engine():
+    await async_engine.dispose()
@@ -0,0 +1,200 @@
+# fuzzy_matcher.py
+"""
+Correspondance approchée (fautes d'OCR, accents, variantes d'écriture) sur les
+noms et synonymes des taxonomies.
+
+- clé floue : minuscules, sans accents, ponctuation -> espace
+- index inversé de trigrammes (clé entourée de deux espaces) -> liste des clés
+- candidats : clés de longueur compatible (|écart| <= k) qui partagent des
+  trigrammes avec la requête ; seuls les 3e + 1 trigrammes les plus rares sont
+  lus (une édition détruit au plus 3 trigrammes ; e = nb max d'éditions, jusqu'à
+  2k quand la requête contient des caractères confondus à 0.5), puis les
+  NLP_FUZZY_MAX_CANDIDATES clés qui en partagent le plus sont scorées
+- score : distance d'édition bornée (abandon dès que k est dépassé), une
+  substitution entre caractères confondus par l'OCR (l/i/1, o/0, ...) coûte 0.5
+- confiance : 0.9 * similarité, -0.1 si deux entités différentes sont à égalité,
+  toujours strictement entre 0.4 (pas de correspondance) et 0.9 (correspondance exacte)
+"""
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from itertools import chain
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from .config import NLP_FUZZY_MAX_CANDIDATES, NLP_FUZZY_MAX_DIST
+
+T = TypeVar("T")
+
+# paires (a, b) et (b, a) de caractères souvent confondus par l'OCR
+_CONFUSABLE = {pair for a, b in ("li", "l1", "i1", "o0", "s5", "b8", "ea", "uv", "ce", "il") for pair in ((a, b), (b, a))}
+_CONFUSABLE_CHARS = {a for a, _ in _CONFUSABLE}
+_MIN_LEN = 4
+_MIN_CONFIDENCE = 0.45
+
+
+@dataclass(frozen=True)
+class FuzzyMatch(Generic[T]):
+    value: T
+    key: str
+    distance: float
+    confidence: float
+
+
+def fuzzy_key(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    chars = [c if c.isalnum() else " " for c in decomposed if not unicodedata.combining(c)]
+    return " ".join("".join(chars).split())
+
+
+def max_distance(length: int) -> int:
+    if length < _MIN_LEN:
+        return 0
+    if length < 8:
+        k = 1
+    elif length < 16:
+        k = 2
+    else:
+        k = 3
+    return min(k, NLP_FUZZY_MAX_DIST)
+
+
+def max_edits(key: str, k: int) -> int:
+    """
+    Nb max d'éditions d'une clé à distance pondérée <= k de `key` : chaque
+    substitution confondue (0.5) part d'un caractère confondable de la requête,
+    il y en a au plus min(c, 2k) ; e = k + min(c, 2k) // 2.
+    """
+    confusable = sum(1 for ch in key if ch in _CONFUSABLE_CHARS)
+    return k + min(confusable, 2 * k) // 2
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f"  {key}  "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def bounded_distance(a: str, b: str, k: float) -> Optional[float]:
+    """Distance d'édition pondérée si elle est <= k, sinon None (calcul en bande)."""
+    if abs(len(a) - len(b)) > k:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    band = int(k)
+    inf = k + 1
+    previous = [float(j) if j <= band else inf for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        lo, hi = max(1, i - band), min(len(b), i + band)
+        current = [inf] * (len(b) + 1)
+        if i <= band:
+            current[0] = float(i)
+        ca = a[i - 1]
+        row_min = current[0] if lo == 1 else inf
+        for j in range(lo, hi + 1):
+            cb = b[j - 1]
+            sub = 0.0 if ca == cb else (0.5 if (ca, cb) in _CONFUSABLE else 1.0)
+            cost = min(previous[j - 1] + sub, previous[j] + 1, current[j - 1] + 1)
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > k:
+            return None
+        previous = current
+    distance = previous[len(b)]
+    return distance if distance <= k else None
+
+
+class FuzzyIndex(Generic[T]):
+    """Index de trigrammes sur des clés (nom ou synonyme) -> valeur."""
+
+    def __init__(self, entries: Iterable[Tuple[str, T]]):
+        self._keys: List[str] = []
+        self._values: List[T] = []
+        # (trigramme, longueur de la clé) -> ids : le filtre de longueur est gratuit
+        self._postings: Dict[Tuple[str, int], List[int]] = {}
+        seen: Dict[str, int] = {}
+        for raw_key, value in entries:
+            key = fuzzy_key(raw_key)
+            if not key or key in seen:
+                continue
+            seen[key] = len(self._keys)
+            key_id = len(self._keys)
+            self._keys.append(key)
+            self._values.append(value)
+            for gram in set(_trigrams(key)):
+                self._postings.setdefault((gram, len(key)), []).append(key_id)
+        self._exact = seen
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _candidates(self, key: str, k: int) -> List[int]:
+        length = len(key)
+        lengths = range(length - k, length + k + 1)
+        per_gram = []
+        for gram in set(_trigrams(key)):
+            lists = [self._postings[(gram, n)] for n in lengths if (gram, n) in self._postings]
+            if lists:
+                per_gram.append((sum(map(len, lists)), lists))
+        # pigeonhole : une clé à distance <= k est à e = max_edits() éditions au plus
+        # (2k si toutes sont des substitutions confondues à 0.5) ; elle partage tous les
+        # trigrammes de la requête sauf 3e au plus, donc au moins l'un des 3e + 1 plus rares
+        per_gram.sort(key=lambda item: item[0])
+        budget = 3 * max_edits(key, k) + 1
+        seed = chain.from_iterable(lists for _, group in per_gram[:budget] for lists in group)
+        # comptage en C (Counter sur un itérable) ; les plus partagés d'abord
+        counts = Counter(seed)
+        return [key_id for key_id, _ in counts.most_common(NLP_FUZZY_MAX_CANDIDATES)]
+
+    def match(self, raw: str) -> Optional[FuzzyMatch[T]]:
+        key = fuzzy_key(raw)
+        if not key:
+            return None
+        exact = self._exact.get(key)
+        if exact is not None:
+            # même clé aux accents/ponctuation près
+            return FuzzyMatch(self._values[exact], key, 0.0, 0.85)
+
+        k = max_distance(len(key))
+        if k == 0:
+            return None
+
+        best: Optional[Tuple[float, int]] = None
+        tie = False
+        for key_id in self._candidates(key, k):
+            limit = best[0] if best is not None else k
+            distance = bounded_distance(key, self._keys[key_id], limit)
+            if distance is None:
+                continue
+            if best is None or distance < best[0]:
+                best, tie = (distance, key_id), False
+            elif distance == best[0] and self._values[key_id] != self._values[best[1]]:
+                tie = True
+        if best is None:
+            return None
+
+        distance, key_id = best
+        similarity = 1 - distance / max(len(key), len(self._keys[key_id]))
+        confidence = 0.9 * similarity - (0.1 if tie else 0.0)
+        if confidence < _MIN_CONFIDENCE:
+            return None
+        return FuzzyMatch(self._values[key_id], self._keys[key_id], distance, round(min(confidence, 0.85), 3))
+
+    def match_many(self, raws: Sequence[str]) -> List[Optional[FuzzyMatch[T]]]:
+        """Liste entière en un appel ; les doublons de la liste ne sont calculés qu'une fois."""
+        memo: Dict[str, Optional[FuzzyMatch[T]]] = {}
+        results = []
+        for raw in raws:
+            key = fuzzy_key(raw)
+            if key not in memo:
+                memo[key] = self._match_parts(raw)
+            results.append(memo[key])
+        return results
+
+    def _match_parts(self, raw: str) -> Optional[FuzzyMatch[T]]:
+        found = self.match(raw)
+        if found is not None or "/" not in raw:
+            return found
+        # "aqua/water" : meilleure des parties
+        parts = [self.match(part) for part in raw.split("/") if part.strip()]
+        parts = [p for p in parts if p is not None]
+        return max(parts, key=lambda p: p.confidence, default=None)
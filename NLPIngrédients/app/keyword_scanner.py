@@ -0,0 +1,150 @@
+# keyword_scanner.py
+"""
+Repérage de mots-clés en une passe (labels, emballages, origines, sections d'ingrédients).
+
+- une règle = (catégorie, expression, valeur(s)) ; l'expression est cherchée en
+  minuscules, sur des frontières de mot :
+    "bio"          mot entier ("biodégradable" ne compte pas)
+    "recyclé*"     début de mot (recyclé, recyclée, recyclés...)
+    "*verre*"      n'importe où dans un mot ("potverre" : mots collés par l'OCR)
+    "fabriqué en"  une espace de l'expression accepte n'importe quels blancs
+- toutes les expressions vont dans un trie ; une expression régulière tirée du
+  trie (alternatives factorisées par préfixe) trouve en une passe, côté C, les
+  positions où une expression peut commencer, puis le trie donne toutes les
+  expressions qui y finissent (chevauchements compris : "100% recyclé" -> "100% recycl*" et "recyclé*")
+- le scanner est construit une fois pour un jeu de règles, puis partagé
+  (lecture seule, sans verrou)
+"""
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple, Union
+
+# {catégorie: {expression: valeur ou [valeurs]}} (ordre = priorité dans la catégorie)
+RuleSpec = Dict[str, Dict[str, Union[str, Sequence[str]]]]
+
+_END = ""  # clé des fins d'expression dans un nœud du trie (jamais un caractère)
+
+
+class Rule(NamedTuple):
+    index: int  # ordre d'enregistrement : les extracteurs s'en servent pour ordonner leurs valeurs
+    category: str
+    phrase: str  # minuscules, blancs réduits à une espace, sans "*"
+    values: Tuple[str, ...]
+    prefix: bool  # "mot*" : pas de frontière de mot à droite
+    infix: bool  # "*mot*" : pas de frontière de mot à gauche non plus
+
+
+class Hit(NamedTuple):
+    start: int
+    end: int
+    rule: Rule
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def normalize_phrase(phrase: str) -> str:
+    return " ".join(phrase.lower().split())
+
+
+def lower_aligned(text: str) -> str:
+    """text.lower() avec les mêmes positions (quelques caractères, ex. "İ", s'allongent en minuscules)."""
+    lower = text.lower()
+    if len(lower) != len(text):
+        lower = "".join(ch.lower()[0] for ch in text)
+    return lower
+
+
+def load_rules_file(path: str) -> RuleSpec:
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    if not isinstance(spec, dict) or not all(isinstance(v, dict) for v in spec.values()):
+        raise ValueError("format attendu : {catégorie: {expression: valeur ou [valeurs]}}")
+    return spec
+
+
+class KeywordScanner:
+    def __init__(self, specs: Iterable[RuleSpec]):
+        self.rules: List[Rule] = []
+        self._trie: Dict = {}
+        for spec in specs:
+            for category, phrases in spec.items():
+                for phrase, values in phrases.items():
+                    self._add(category, phrase, values)
+        # empreinte des règles : identique d'un processus à l'autre pour les mêmes règles
+        self.digest = hashlib.sha256(
+            repr([rule[1:] for rule in self.rules]).encode("utf-8")
+        ).hexdigest()[:16]
+        self._infix_starts = {rule.phrase[0] for rule in self.rules if rule.infix}
+        self._starts = re.compile(self._starts_regex()) if self.rules else None
+
+    def _add(self, category: str, phrase: str, values: Union[str, Sequence[str]]) -> None:
+        prefix = phrase.endswith("*")
+        infix = prefix and phrase.startswith("*")
+        key = normalize_phrase(phrase.strip("*"))
+        if not key:
+            return
+        values = (values,) if isinstance(values, str) else tuple(values)
+        rule = Rule(len(self.rules), category, key, values, prefix, infix)
+        self.rules.append(rule)
+        node = self._trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node.setdefault(_END, []).append(rule)
+
+    def _regex(self, node: Dict) -> str:
+        if _END in node:
+            # une expression finit ici : la regex n'a pas besoin d'aller plus loin,
+            # le parcours du trie vérifie la suite et les frontières de mot
+            return ""
+        alts = []
+        for ch, child in node.items():
+            piece = r"\s+" if ch == " " else re.escape(ch)
+            alts.append(piece + self._regex(child))
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+
+    def _starts_regex(self) -> str:
+        # chaque alternative commence par un caractère littéral (sre saute alors
+        # directement aux positions candidates) ; le reste de l'expression est en
+        # lookahead, un seul caractère est consommé : les chevauchements restent visibles
+        alts = []
+        for ch, child in self._trie.items():
+            piece = re.escape(ch)
+            # début en milieu de mot écarté d'emblée, sauf règle "*mot*" sur ce caractère
+            if _is_word(ch) and ch not in self._infix_starts:
+                piece += r"(?<!\w" + re.escape(ch) + ")"
+            rest = self._regex(child)
+            alts.append(piece + ("(?=" + rest + ")" if rest else ""))
+        return "|".join(alts)
+
+    def scan(self, lower: str) -> List[Hit]:
+        """Toutes les occurrences, dans l'ordre du texte (texte déjà en minuscules : lower_aligned)."""
+        if self._starts is None:
+            return []
+        hits: List[Hit] = []
+        n = len(lower)
+        for m in self._starts.finditer(lower):
+            start = i = m.start()
+            mid_word = start > 0 and _is_word(lower[start - 1])
+            node = self._trie
+            while node is not None:
+                for rule in node.get(_END, ()):
+                    if mid_word and not rule.infix:
+                        continue
+                    if rule.prefix or i == n or not _is_word(lower[i]) or not _is_word(rule.phrase[-1]):
+                        hits.append(Hit(start, i, rule))
+                if i == n:
+                    break
+                if lower[i].isspace():
+                    node = node.get(" ")
+                    while i < n and lower[i].isspace():
+                        i += 1
+                else:
+                    node = node.get(lower[i])
+                    i += 1
+        return hits
+
+    def __len__(self) -> int:
+        return len(self.rules)
@@ -1,5 +1,14 @@
-import httpx
 import os
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin
+
+from ecolabel_common.service_client import get_client
+from ecolabel_common.telemetry import get_logger
+
+from .config import NLP_LCA_VERSION_CHECK_S
+
+log = get_logger("lca_client")
 
 # URL de ton microservice 3 (LCALITE)
 # Utilise le nom du conteneur Docker si disponible, sinon localhost
@@ -8,12 +17,59 @@ LCA_SERVICE_URL = os.getenv(
     "http://localhost:8002/lca/calc"
 )
 
+# Version des facteurs ACV, à côté de /lca/calc
+LCA_FACTORS_VERSION_URL = os.getenv(
+    "LCA_FACTORS_VERSION_URL",
+    urljoin(LCA_SERVICE_URL, "factors/version")
+)
+
+# Codes des facteurs ingrédients (table de résolution ingrédient -> code, lca_resolution)
+LCA_INGREDIENT_CODES_URL = os.getenv(
+    "LCA_INGREDIENT_CODES_URL",
+    urljoin(LCA_SERVICE_URL, "factors/ingredients")
+)
+
+# Pool de connexions gardé pendant la vie de l'application
+_client = get_client("lca", timeout=10.0)
+
+_factors_version: Optional[str] = None
+_factors_checked_at = 0.0
+
 
 async def call_lca_service(payload: dict) -> dict:
     """
     Appelle le microservice LCALite (MS3) et retourne la réponse JSON.
     """
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.post(LCA_SERVICE_URL, json=payload)
-        resp.raise_for_status()
-        return resp.json()
+    return await _client.post_json(LCA_SERVICE_URL, payload)
+
+
+async def get_factors_version() -> Optional[str]:
+    """
+    Version des facteurs ACV de LCALite, relue au plus une fois par
+    NLP_LCA_VERSION_CHECK_S. None si LCALite ne répond pas (pas de cache possible).
+    """
+    global _factors_version, _factors_checked_at
+    now = time.monotonic()
+    if _factors_version is not None and now - _factors_checked_at < NLP_LCA_VERSION_CHECK_S:
+        return _factors_version
+    try:
+        response = await _client.request("GET", LCA_FACTORS_VERSION_URL)
+        response.raise_for_status()
+        _factors_version = response.json()["version"]
+    except Exception as e:
+        log.warning(f"Version des facteurs ACV indisponible : {e}")
+        _factors_version = None
+    _factors_checked_at = now
+    return _factors_version
+
+
+async def get_ingredient_codes() -> Optional[Tuple[str, List[str]]]:
+    """(version des facteurs, codes des facteurs ingrédients) ; None si LCALite ne répond pas."""
+    try:
+        response = await _client.request("GET", LCA_INGREDIENT_CODES_URL)
+        response.raise_for_status()
+        data = response.json()
+        return data["version"], list(data["codes"])
+    except Exception as e:
+        log.warning(f"Codes des facteurs ingrédients indisponibles : {e}")
+        return None
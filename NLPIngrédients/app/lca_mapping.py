@@ -1,6 +1,12 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 import re
 
+from ecolabel_common.telemetry import fields, get_logger
+
+from .lca_resolution import ResolutionTable
+
+log = get_logger("lca_mapping")
+
 
 # -------------------------
 # Helpers
@@ -51,6 +57,121 @@ def _guess_transport_mode(text: str) -> str:
     return "ROAD"
 
 
+_PERCENT_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*%")
+_SHARE_RE = re.compile(r"\(?\s*\d+(?:[.,]\d+)?\s*%\s*\)?")
+
+
+def split_share(raw: str) -> Tuple[str, Optional[float]]:
+    """
+    Nom et pourcentage déclaré d'un ingrédient.
+    Ex: "sucre (12 %)" -> ("sucre", 12.0) ; "huile d'olive 2,5%" -> ("huile d'olive", 2.5)
+    """
+    m = _PERCENT_RE.search(raw or "")
+    percent = float(m.group(1).replace(",", ".")) if m else None
+    return " ".join(_SHARE_RE.sub(" ", raw or "").split()), percent
+
+
+def estimate_shares(percents: Sequence[Optional[float]]) -> List[float]:
+    """
+    Part (en %) de chaque ingrédient, dans l'ordre de la liste.
+
+    - pourcentages déclarés repris tels quels (ramenés à 100 si leur somme dépasse 100)
+    - le reste est réparti sur les autres ingrédients selon leur rang (poids 1/rang :
+      la liste est par ordre décroissant de masse), entre deux bornes : pas plus
+      qu'un pourcentage déclaré qui le précède, pas moins qu'un pourcentage déclaré
+      qui le suit ; l'excédent (ou le manque) passe aux autres
+    - si le reste ne suffit pas à ces minimums (ex. [None, None, 60]), les ingrédients
+      non déclarés prennent leur minimum et toutes les parts sont ramenées à 100
+    """
+    declared = sum(p for p in percents if p is not None)
+    scale = 100.0 / declared if declared > 100.0 else 1.0
+    shares = [p * scale if p is not None else 0.0 for p in percents]
+    remaining = 100.0 - declared * scale
+
+    caps: Dict[int, float] = {}
+    cap = 100.0
+    for i, p in enumerate(percents):
+        if p is not None:
+            cap = min(cap, p * scale)
+        else:
+            caps[i] = cap
+    floors: Dict[int, float] = {}
+    floor = 0.0
+    for i in range(len(percents) - 1, -1, -1):
+        if percents[i] is not None:
+            floor = max(floor, percents[i] * scale)
+        else:
+            floors[i] = min(floor, caps[i])
+
+    if floors and sum(floors.values()) >= remaining:
+        for i, low in floors.items():
+            shares[i] = low
+        total = sum(shares)
+        return [share * 100.0 / total for share in shares] if total > 0 else shares
+
+    free = list(caps)
+    while free and remaining > 1e-9:
+        total_weight = sum(1.0 / (i + 1) for i in free)
+        proposed = {i: remaining / (i + 1) / total_weight for i in free}
+        # minimums d'abord : les fixer réduit la part des autres, ce qui peut lever un plafond
+        bound = {i: floors[i] for i in free if proposed[i] < floors[i]}
+        if not bound:
+            bound = {i: caps[i] for i in free if proposed[i] > caps[i]}
+        if not bound:
+            for i in free:
+                shares[i] = proposed[i]
+            break
+        for i, value in bound.items():
+            shares[i] = value
+            remaining -= value
+        free = [i for i in free if i not in bound]
+    return shares
+
+
+def _ingredient_items(
+    entities: List[Dict[str, Any]],
+    net_mass_g: float,
+    resolution: ResolutionTable,
+) -> List[Dict[str, Any]]:
+    """[{code, name, mass_g}] pour les ingrédients qui ont un code de facteur ACV (masses cumulées par code)."""
+    parsed = [split_share(e.get("raw") or "") for e in entities]
+    shares = estimate_shares([percent for _, percent in parsed])
+    items: Dict[str, Dict[str, Any]] = {}
+    for entity, (raw_name, _), share in zip(entities, parsed, shares):
+        name, _ = split_share(entity.get("normalized") or "")
+        code = resolution.resolve(name, raw_name)
+        if code is None:
+            continue
+        mass_g = net_mass_g * share / 100.0
+        if code in items:
+            items[code]["mass_g"] += mass_g
+        else:
+            items[code] = {"code": code, "name": name or raw_name, "mass_g": mass_g}
+    for item in items.values():
+        item["mass_g"] = round(item["mass_g"], 3)
+    return list(items.values())
+
+
+def _extract_net_mass_kg(nlp_output: Dict[str, Any], fallback_text: str) -> float:
+    """Masse nette du produit (poids_net_g, sinon "Poids net: 800 g" dans le texte), 0.5 kg par défaut."""
+    if nlp_output.get("poids_net_g"):
+        return float(nlp_output.get("poids_net_g", 0)) / 1000.0
+    # Fallback : extraire depuis le texte (ex: "Poids net: 800 g")
+    raw_text = nlp_output.get("raw_text") or fallback_text
+    poids_match = re.search(r"(?i)poids\s*net\s*[:\s]+(\d+(?:[.,]\d+)?)\s*(g|kg|ml|l)\b", raw_text)
+    if poids_match:
+        val = float(poids_match.group(1).replace(",", "."))
+        unit = poids_match.group(2).lower()
+        if unit == "kg":
+            return val
+        elif unit in ("g", "ml"):
+            return val / 1000.0
+        elif unit == "l":
+            return val  # approximation 1L = 1kg
+    # Dernier fallback : utiliser 0.5 kg par défaut
+    return 0.5
+
+
 def _dedup_by_material(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     seen = set()
     out = []
@@ -66,23 +187,28 @@ def _dedup_by_material(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 # Main mapping
 # -------------------------
 
-def build_lca_request_from_nlp(nlp_output: Dict[str, Any]) -> Dict[str, Any]:
+def build_lca_request_from_nlp(nlp_output: Dict[str, Any], resolution: Optional[ResolutionTable] = None) -> Dict[str, Any]:
     """
     Transforme la sortie NLP en requête pour le microservice LCA.
 
     ATTENDU côté LCALite:
-      ingredients: [{code, mass_g}]
+      ingredients: [{code, name, mass_g}] (vide sans table de résolution)
       packaging: [{material, mass_g}]
       transport: [{mode, distance_km, mass_kg}]
     """
     product_id = str(nlp_output.get("product_id", "UNKNOWN"))
 
     # =========================
-    # 1) INGREDIENTS (démo: vide pour le moment)
+    # 1) INGREDIENTS
     # =========================
-    # -> Pour activer ingredients > 0, il faut mapper les ingrédients vers des codes
-    #    existants dans ta table lca_ingredient_factors (ex: WATER, SLES, GLYCERIN...)
+    # -> code de facteur via la table de résolution (lca_resolution), masse
+    #    estimée à partir des pourcentages déclarés / du rang dans la liste
+    transport_text = nlp_output.get("transport_raw") or nlp_output.get("packaging_raw") or nlp_output.get("raw_text") or ""
+    mass_kg = _extract_net_mass_kg(nlp_output, transport_text)
+
     ingredients: List[Dict[str, Any]] = []
+    if resolution is not None and len(resolution):
+        ingredients = _ingredient_items(nlp_output.get("ingredients", []), mass_kg * 1000.0, resolution)
 
     # =========================
     # 2) PACKAGING
@@ -116,33 +242,8 @@ def build_lca_request_from_nlp(nlp_output: Dict[str, Any]) -> Dict[str, Any]:
     # =========================
     transport: List[Dict[str, Any]] = []
 
-    transport_text = nlp_output.get("transport_raw") or nlp_output.get("packaging_raw") or nlp_output.get("raw_text") or ""
     distance_km = _extract_distance_km(transport_text)
     mode = _guess_transport_mode(transport_text)
-    
-    # Debug
-    print(f"DEBUG Transport extraction: text='{transport_text[:100]}...', distance={distance_km} km, mode={mode}")
-
-    # masse produit en kg - essayer plusieurs sources
-    mass_kg = 0.0
-    if nlp_output.get("poids_net_g"):
-        mass_kg = float(nlp_output.get("poids_net_g", 0)) / 1000.0
-    else:
-        # Fallback : extraire depuis le texte (ex: "Poids net: 800 g")
-        raw_text = nlp_output.get("raw_text") or transport_text
-        poids_match = re.search(r"(?i)poids\s*net\s*[:\s]+(\d+(?:[.,]\d+)?)\s*(g|kg|ml|l)\b", raw_text)
-        if poids_match:
-            val = float(poids_match.group(1).replace(",", "."))
-            unit = poids_match.group(2).lower()
-            if unit == "kg":
-                mass_kg = val
-            elif unit in ("g", "ml"):
-                mass_kg = val / 1000.0
-            elif unit == "l":
-                mass_kg = val  # approximation 1L = 1kg
-        else:
-            # Dernier fallback : utiliser 0.5 kg par défaut
-            mass_kg = 0.5
 
     # Inclure aussi la masse d'emballage dans le transport
     packaging_mass_g = _extract_packaging_mass_g(
@@ -157,10 +258,16 @@ def build_lca_request_from_nlp(nlp_output: Dict[str, Any]) -> Dict[str, Any]:
             "distance_km": distance_km,
             "mass_kg": total_mass_kg
         })
-        # Debug log
-        print(f"DEBUG LCA Mapping: Transport créé - mode={mode}, distance={distance_km} km, mass={total_mass_kg} kg")
-    else:
-        print(f"DEBUG LCA Mapping: Transport NON créé - distance={distance_km} km, mass={total_mass_kg} kg")
+
+    log.debug("Requête LCA construite", extra=fields(
+        product_id=product_id,
+        ingredients=len(ingredients),
+        packaging=len(packaging),
+        transport_mode=mode,
+        distance_km=distance_km,
+        transport_mass_kg=round(total_mass_kg, 3),
+        transport_created=bool(transport),
+    ))
 
     return {
         "product_id": product_id,
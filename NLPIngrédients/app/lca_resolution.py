@@ -0,0 +1,130 @@
+# lca_resolution.py
+"""
+Table de résolution ingrédient normalisé -> code de facteur ACV (lca_ingredient_factors.code).
+
+- compilée à partir de deux sources :
+    * les codes des facteurs ingrédients de LCALite (GET /lca/factors/ingredients),
+      chacun accessible par lui-même et sans "_" ("MILK_COW" -> "milk cow")
+    * la taxonomie des ingrédients : pour chaque nom / synonyme, le premier de
+      (eco_ref_code, nom, clé) qui est un code connu ; la taxonomie l'emporte
+      sur les alias de codes
+- recherche O(1) en mémoire : un dict clé normalisée -> code
+- recompilée quand la version des taxonomies ou celle des facteurs change
+  (les deux versions sont déjà suivies pour le cache de résultats) ; aucune
+  requête par appel
+- LCALite injoignable : la dernière table reste en service (vide au départ :
+  pas d'ingrédients dans la requête ACV, comme avant)
+"""
+import asyncio
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .lca_client import get_factors_version, get_ingredient_codes
+from .taxonomy_index import TaxonomyEntry, TaxonomyIndex, normalize_key
+
+# nombre d'eco_ref_code inconnus de LCALite gardés pour les statistiques
+_DANGLING_SAMPLE = 20
+
+
+class ResolutionTable:
+    def __init__(
+        self,
+        codes_by_key: Dict[str, str],
+        taxonomy_version: Optional[str] = None,
+        factors_version: Optional[str] = None,
+        info: Optional[Dict[str, Any]] = None,
+    ):
+        self._codes = codes_by_key
+        self.taxonomy_version = taxonomy_version
+        self.factors_version = factors_version
+        self.info = info or {}
+        self._stats = {"resolved": 0, "unresolved": 0}
+
+    def resolve(self, *names: str) -> Optional[str]:
+        """Code du premier nom connu de la table, ou None."""
+        for name in names:
+            code = self._codes.get(normalize_key(name)) if name else None
+            if code is not None:
+                self._stats["resolved"] += 1
+                return code
+        self._stats["unresolved"] += 1
+        return None
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._codes),
+            "taxonomy_version": self.taxonomy_version,
+            "factors_version": self.factors_version,
+            **self.info,
+            **self._stats,
+        }
+
+
+def compile_resolution(entries: Dict[str, TaxonomyEntry], codes: Iterable[str]) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """(clé normalisée -> code, informations de compilation)."""
+    by_alias: Dict[str, str] = {}
+    for code in codes:
+        for alias in (code, code.replace("_", " ")):
+            by_alias.setdefault(normalize_key(alias), code)
+
+    table = dict(by_alias)
+    resolved = 0
+    dangling = set()
+    for key, entry in entries.items():
+        code = None
+        for candidate in (entry.eco_ref_code, entry.name, key):
+            if candidate:
+                code = by_alias.get(normalize_key(candidate))
+                if code is not None:
+                    break
+        if code is not None:
+            table[key] = code
+            resolved += 1
+        elif entry.eco_ref_code:
+            dangling.add(entry.eco_ref_code)
+
+    info = {
+        "factor_codes": len({*by_alias.values()}),
+        "taxonomy_keys_resolved": resolved,
+        "taxonomy_keys_unresolved": len(entries) - resolved,
+        # eco_ref_code renseignés dans la taxonomie mais absents des facteurs
+        "dangling_eco_ref_codes": sorted(dangling)[:_DANGLING_SAMPLE],
+        "dangling_count": len(dangling),
+    }
+    return table, info
+
+
+_table = ResolutionTable({})
+_builds = {"count": 0, "last_ms": 0.0}
+
+
+async def get_resolution_table(index: TaxonomyIndex) -> ResolutionTable:
+    """
+    Table pour l'index de taxonomies courant et la version courante des facteurs.
+    Deux requêtes simultanées peuvent recompiler en même temps : même résultat,
+    la dernière table installée est gardée.
+    """
+    global _table
+    factors_version = await get_factors_version()
+    if factors_version is None or index.version is None:
+        return _table
+    if (_table.taxonomy_version, _table.factors_version) == (index.version, factors_version):
+        return _table
+
+    fetched = await get_ingredient_codes()
+    if fetched is None:
+        return _table
+    _, codes = fetched
+    t0 = time.perf_counter()
+    codes_by_key, info = await asyncio.to_thread(compile_resolution, index.entries("ingredient"), codes)
+    _table = ResolutionTable(codes_by_key, index.version, factors_version, info)
+    _builds["count"] += 1
+    _builds["last_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    return _table
+
+
+def resolution_stats() -> Dict[str, Any]:
+    return {**_table.stats(), "builds": _builds["count"], "last_build_ms": _builds["last_ms"]}
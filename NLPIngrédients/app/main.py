@@ -1,7 +1,12 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import init_db, get_db
+from ecolabel_common.service_client import clients_stats, close_clients
+from ecolabel_common.telemetry import TraceMiddleware, annotate, get_logger, setup_logging, stage, stage_stats
+
+from .db import init_db, get_db, get_async_db, close_async_engine, SessionLocal
 from .schemas import RawTextRequest, NLPResponse
 from . import nlp_pipeline
 from .services import (
@@ -9,35 +14,108 @@ from .services import (
     normalize_packaging,
     normalize_labels,
     normalize_origins,
+    normalize_with_index,
 )
 
 from .lca_client import call_lca_service
+from .taxonomy_index import get_taxonomy_index, get_taxonomy_index_async, reload_taxonomy_index, taxonomy_stats
 from .lca_mapping import build_lca_request_from_nlp
+from .lca_resolution import get_resolution_table, resolution_stats
+from .config import NLP_SPACY_PRELOAD
+from .spacy_model import get_nlp, spacy_stats
+from .result_cache import cache_key, clear_result_cache, get_or_compute, result_cache_stats
+from .batch import NDJSON_TYPES, BatchStreamingResponse, batch_stats, iter_items, iter_ndjson, shutdown_process_pool, stream_batch
+
+setup_logging("nlp")
+log = get_logger("main")
+
+# Chargé à l'import (et non au startup) : avec gunicorn --preload, c'est le
+# maître qui charge le modèle avant le fork, les workers partagent ses pages
+if NLP_SPACY_PRELOAD:
+    get_nlp()
 
 app = FastAPI(title="EcoLabel-MS - NLPIngrédients")
+app.add_middleware(TraceMiddleware)
 
 
 @app.on_event("startup")
 def on_startup():
     init_db()
+    # index des taxonomies chargé une fois ; sinon au premier appel
+    db = SessionLocal()
+    try:
+        get_taxonomy_index(db)
+    except Exception as e:
+        log.warning(f"Taxonomies non chargées au démarrage : {e}")
+    finally:
+        db.close()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await close_clients()
+    await close_async_engine()
+    shutdown_process_pool()
+
+
+@app.get("/metrics/clients")
+def get_client_metrics():
+    return clients_stats()
+
+
+@app.get("/metrics/batch")
+def get_batch_metrics():
+    return batch_stats()
+
+
+@app.get("/metrics/result-cache")
+def get_result_cache_metrics():
+    return result_cache_stats()
+
+
+@app.post("/result-cache/clear")
+async def clear_results(db: AsyncSession = Depends(get_async_db)):
+    return await clear_result_cache(db)
+
+
+@app.get("/metrics/stages")
+def get_stage_metrics():
+    return stage_stats()
+
+
+@app.get("/metrics/spacy")
+def get_spacy_metrics():
+    return spacy_stats()
+
+
+@app.get("/metrics/taxonomy")
+def get_taxonomy_metrics():
+    return taxonomy_stats()
+
+
+@app.get("/metrics/lca-resolution")
+def get_lca_resolution_metrics():
+    return resolution_stats()
+
+
+@app.post("/taxonomy/reload")
+def reload_taxonomy(db: Session = Depends(get_db)):
+    return reload_taxonomy_index(db)
 
 
 # ---------- 1) Fonction interne : exécuter ton pipeline NLP existant ----------
 
 def run_nlp_pipeline(payload: RawTextRequest, db: Session) -> NLPResponse:
-    text = payload.text
-
-    # 1) extraction brute avec règles simples
-    ingredients_raw = nlp_pipeline.simple_extract_ingredients(text)
-    packaging_raw = nlp_pipeline.simple_extract_packaging(text)
-    labels_raw = nlp_pipeline.simple_extract_labels(text)
-    origins_raw = nlp_pipeline.simple_extract_origins(text)
+    # 1) extraction brute avec règles simples (une passe du scanner de mots-clés)
+    with stage("extract"):
+        raw = nlp_pipeline.extract_raw_entities(payload.text)
 
     # 2) normalisation via taxonomies
-    ingredients_norm = normalize_ingredients(db, ingredients_raw)
-    packaging_norm = normalize_packaging(db, packaging_raw)
-    labels_norm = normalize_labels(db, labels_raw)
-    origins_norm = normalize_origins(db, origins_raw)
+    with stage("normalize"):
+        ingredients_norm = normalize_ingredients(db, raw["ingredients"])
+        packaging_norm = normalize_packaging(db, raw["packaging"])
+        labels_norm = normalize_labels(db, raw["labels"])
+        origins_norm = normalize_origins(db, raw["origins"])
 
     return NLPResponse(
         product_id=payload.product_id,
@@ -48,6 +126,23 @@ def run_nlp_pipeline(payload: RawTextRequest, db: Session) -> NLPResponse:
     )
 
 
+async def run_nlp_pipeline_async(payload: RawTextRequest, db: AsyncSession) -> NLPResponse:
+    """
+    run_nlp_pipeline pour les endpoints async : index rafraîchi via le pilote
+    async, extraction + normalisation (CPU) dans le pool de threads.
+    """
+    index = await get_taxonomy_index_async(db)
+    return await run_in_threadpool(_extract_and_normalize, payload, index)
+
+
+def _extract_and_normalize(payload: RawTextRequest, index) -> NLPResponse:
+    with stage("extract"):
+        raw = nlp_pipeline.extract_raw_entities(payload.text)
+    with stage("normalize"):
+        normalized = normalize_with_index(index, [raw])[0]
+    return NLPResponse(product_id=payload.product_id, **normalized)
+
+
 # ---------- 2) Endpoint NLP simple (comme avant) ----------
 
 @app.post("/nlp/extract", response_model=NLPResponse)
@@ -55,39 +150,75 @@ def extract_entities(payload: RawTextRequest, db: Session = Depends(get_db)):
     return run_nlp_pipeline(payload, db)
 
 
+# ---------- 2 bis) Lot : réponse NDJSON en flux ----------
+
+@app.post("/nlp/extract-batch")
+async def extract_entities_batch(request: Request):
+    """
+    Corps : tableau JSON de RawTextRequest, ou NDJSON (Content-Type
+    application/x-ndjson, une RawTextRequest par ligne, lu au fil de l'eau).
+    Réponse NDJSON : une ligne {"index": i, ...NLPResponse} par texte, dans l'ordre.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_TYPES:
+        objects = iter_ndjson(request.stream())
+    else:
+        try:
+            items = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Corps JSON invalide")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Un tableau de RawTextRequest est attendu")
+        objects = iter_items(items)
+    return BatchStreamingResponse(stream_batch(objects), media_type="application/x-ndjson")
+
+
 # ---------- 3) Nouveau endpoint : NLP + LCA ----------
 
 @app.post("/nlp/extract-and-lca")
 async def extract_and_calculate_lca(
     payload: RawTextRequest,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     1) Exécute le NLP (MS2)
     2) Construit la requête LCA
     3) Appelle le microservice LCA (MS3)
     4) Retourne tout dans une seule réponse
-    """
 
-    # 1) NLP
-    nlp_response = run_nlp_pipeline(payload, db)
+    Résultat mis en cache (result_cache) : même texte normalisé + même produit,
+    avec les mêmes taxonomies et facteurs ACV -> pas de nouvel appel LCA / Scoring.
+    En-tête X-Result-Cache : hit | shared_hit | coalesced | miss | bypass.
+    """
+    key = await cache_key(db, payload.text, payload.product_id)
+    result, origin = await get_or_compute(db, key, lambda: _extract_and_calculate_lca(payload, db))
+    # texte d'origine de cette requête (la clé ne dépend que de sa forme normalisée)
+    result["nlp_output"]["raw_text"] = payload.text
+    response.headers["X-Result-Cache"] = origin
+    annotate(product_id=payload.product_id, result_cache=origin)
+    return result
+
+
+async def _extract_and_calculate_lca(payload: RawTextRequest, db: AsyncSession) -> dict:
+    # 1) NLP (sans bloquer la boucle : l'appel LCA des autres requêtes continue)
+    nlp_response = await run_nlp_pipeline_async(payload, db)
     nlp_dict = nlp_response.dict()
     
     # Ajouter les données structurées du texte si disponibles dans payload
     # Le texte peut contenir "Poids net: 800 g" qu'on peut extraire
-    nlp_dict["raw_text"] = payload.text
-    
-    # 2) Mapping vers la requête /lca/calc
-    lca_request = build_lca_request_from_nlp(nlp_dict)
+    # (forme normalisée : celle de la clé du cache de résultats)
+    nlp_dict["raw_text"] = nlp_pipeline.normalize_text(payload.text)
     
-    # Debug: afficher la requête LCA créée
-    print(f"DEBUG NLP->LCA: Requête LCA créée avec {len(lca_request.get('transport', []))} legs de transport")
-    if lca_request.get('transport'):
-        for t in lca_request['transport']:
-            print(f"  - Transport: mode={t.get('mode')}, distance={t.get('distance_km')} km, mass={t.get('mass_kg')} kg")
-
-    # 3) Appel du microservice 3
-    lca_result = await call_lca_service(lca_request)
+    # 2) Mapping vers la requête /lca/calc (ingrédients -> codes de facteurs
+    #    via la table de résolution compilée, sans requête par appel)
+    resolution = await get_resolution_table(await get_taxonomy_index_async(db))
+    with stage("map"):
+        lca_request = build_lca_request_from_nlp(nlp_dict, resolution)
+
+    # 3) Appel du microservice 3 (LCALite, qui appelle Scoring)
+    with stage("lca"):
+        lca_result = await call_lca_service(lca_request)
 
     # 4) Réponse combinée
     return {
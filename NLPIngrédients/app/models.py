@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, func
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -29,3 +29,16 @@ class OriginTaxonomy(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, unique=True, nullable=False)      # "France", "Maroc", "UE"
     synonyms = Column(String)
+
+class NLPResultCache(Base):
+    """
+    Cache partagé de /nlp/extract-and-lca (NLP_RESULT_CACHE_SHARED=1) :
+    clé (texte normalisé + product_id + versions) -> réponse JSON sérialisée.
+    """
+    __tablename__ = "nlp_result_cache"
+    key = Column(String(64), primary_key=True)
+    result = Column(Text, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,9 +1,28 @@
 import re
-import spacy
-from typing import List
+import threading
+import unicodedata
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from ecolabel_common.telemetry import get_logger
+
+from .config import NLP_KEYWORDS_FILE
+from .keyword_scanner import Hit, KeywordScanner, load_rules_file, lower_aligned
+from .spacy_model import get_nlp
+
+log = get_logger("nlp_pipeline")
+
+# Modèle spaCy : chargé à la demande (spacy_model.get_nlp), les extracteurs
+# simple_extract_* n'en ont pas besoin
+
+
+def __getattr__(name):
+    # compatibilité : nlp_pipeline.nlp charge le modèle au premier accès
+    if name == "nlp":
+        return get_nlp()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Modèle de base français (à adapter si multi-langue)
-nlp = spacy.load("fr_core_news_md")
 
 # Keywords (gardés)
 INGREDIENT_KEYWORDS = ["ingrédients", "ingrédient", "composition", "ingredients", "ingredient"]
@@ -11,10 +30,145 @@ PACKAGING_KEYWORDS = ["emballage", "bouteille", "sachet", "boîte", "verre", "pl
 ORIGIN_KEYWORDS = ["origine", "provenance", "fabriqué en", "made in"]
 LABEL_KEYWORDS = ["bio", "écologique", "recyclé", "équitable", "fairtrade"]  # ⚠️ on enlève AB ici
 
+
+def _keyword_rules(keywords: List[str], exclude=()) -> Dict[str, str]:
+    # mot-clé simple : début de mot (pluriels, accords) ; expression : mots entiers
+    return {(kw if " " in kw else kw + "*"): kw for kw in keywords if kw not in exclude}
+
+
+# Règles du scanner (keyword_scanner) : {catégorie: {expression: valeur(s)}}.
+# L'ordre fixe l'ordre des valeurs renvoyées par les extracteurs.
+# NLP_KEYWORDS_FILE (même format, JSON) et les taxonomies label / emballage /
+# origine s'y ajoutent sans toucher au code.
+KEYWORD_RULES = {
+    "label": {
+        "vegan": "vegan",
+        "100% recycl*": "recyclable",
+        "100%recycl*": "recyclable",
+        "recyclable": "recyclable",
+        "bio": "bio",
+        "biologique*": "bio",
+        "organic": "bio",
+        "fairtrade": "fairtrade",
+        # "bio" reste un mot entier (plus de faux positif sur "biodégradable")
+        **_keyword_rules(LABEL_KEYWORDS, exclude={"bio"}),
+    },
+    # matériaux : cherchés dans la section "Emballage" si elle existe, y compris
+    # dans des mots collés par l'OCR ("Potverre")
+    "packaging_material": {
+        "pet": ("PET", "PP", "plastic"),
+        "pp": ("PET", "PP", "plastic"),
+        "*verre*": "glass",
+        "*carton*": "cardboard",
+        "*papier*": "paper",
+        "*plastique*": "plastic",
+    },
+    # le mot "emballage" seul n'est pas un emballage
+    "packaging": _keyword_rules(PACKAGING_KEYWORDS, exclude={"emballage"}),
+    "origin": _keyword_rules(ORIGIN_KEYWORDS),
+    "ingredient_section": _keyword_rules(INGREDIENT_KEYWORDS),
+}
+
+_TAXONOMY_CATEGORIES = ("label", "packaging", "origin")
+
+_scanner: Optional[KeywordScanner] = None
+_scanner_lock = threading.Lock()
+_taxonomy_keywords: Dict[str, Dict[str, str]] = {}
+_keywords_version = 0
+
+
+def set_taxonomy_keywords(keywords: Dict[str, Dict[str, str]]) -> None:
+    """
+    Noms et synonymes des taxonomies ({catégorie: {expression: nom}}), appelé à chaque
+    chargement de l'index des taxonomies (et à l'initialisation des processus du lot).
+    """
+    global _scanner, _taxonomy_keywords, _keywords_version
+    keywords = {c: dict(keywords.get(c, {})) for c in _TAXONOMY_CATEGORIES}
+    with _scanner_lock:
+        if keywords == _taxonomy_keywords:
+            return
+        _taxonomy_keywords = keywords
+        _keywords_version += 1
+        _scanner = None  # reconstruit au prochain texte
+
+
+def taxonomy_keywords() -> Dict[str, Dict[str, str]]:
+    return _taxonomy_keywords
+
+
+def keywords_version() -> int:
+    return _keywords_version
+
+
+def get_scanner() -> KeywordScanner:
+    global _scanner
+    scanner = _scanner
+    if scanner is not None:
+        return scanner
+    with _scanner_lock:
+        if _scanner is None:
+            specs = [KEYWORD_RULES]
+            if NLP_KEYWORDS_FILE:
+                try:
+                    specs.append(load_rules_file(NLP_KEYWORDS_FILE))
+                except (OSError, ValueError) as e:
+                    log.warning(f"Mots-clés de {NLP_KEYWORDS_FILE} ignorés : {e}")
+            specs.append(_taxonomy_keywords)
+            _scanner = KeywordScanner(specs)
+        return _scanner
+
+
+def rules_digest() -> str:
+    """Empreinte des règles de mots-clés en vigueur (base + fichier + taxonomies)."""
+    return get_scanner().digest
+
+
 # -------------------------
 # Helpers
 # -------------------------
 
+class Section(NamedTuple):
+    value: str
+    start: int
+    end: int
+
+
+class TextScan(NamedTuple):
+    """Un texte analysé une fois : mots-clés (une passe) et lignes "Clé: valeur"."""
+    text: str
+    lower: str
+    hits: List[Hit]
+    sections: Dict[str, Section]
+
+
+# "Clé: valeur" en début de ligne ; lookahead : la ligne suivante reste candidate
+_SECTION_RE = re.compile(r"(?m)^([^:\n]+):(?=\s*(.+)$)")
+
+
+def _section_key(key: str) -> str:
+    # "ı" sans point (fréquent en OCR) : l'ancienne recherche (?i) le confondait avec "i"
+    return key.rstrip().lower().replace("ı", "i")
+
+
+def _sections(text: str) -> Dict[str, Section]:
+    """Première ligne "Clé: valeur" par clé (clé en minuscules)."""
+    sections: Dict[str, Section] = {}
+    for m in _SECTION_RE.finditer(text):
+        sections.setdefault(_section_key(m.group(1)), Section(m.group(2).strip(), m.start(2), m.end(2)))
+    return sections
+
+
+def analyze_text(text: str) -> TextScan:
+    lower = lower_aligned(text)
+    return TextScan(text, lower, get_scanner().scan(lower), _sections(text))
+
+
+def _rule_values(hits: Iterable[Hit], category: str) -> List[str]:
+    """Valeurs des règles touchées, dans l'ordre des règles (et non du texte)."""
+    rules = sorted({h.rule.index: h.rule for h in hits if h.rule.category == category}.values())
+    return [value for rule in rules for value in rule.values]
+
+
 def _dedup_keep_order(items: List[str]) -> List[str]:
     seen = set()
     out = []
@@ -26,52 +180,58 @@ def _dedup_keep_order(items: List[str]) -> List[str]:
     return out
 
 
-def _extract_section_value(text: str, key: str) -> str:
+def _section_value(scan: TextScan, key: str) -> str:
     """
-    Extrait la valeur d'une ligne: "Key: ...."
+    Valeur d'une ligne "Key: ...."
     Exemple: "Emballage: Flacon PET 22 g + Bouchon PP 3 g"
     """
-    m = re.search(rf"(?mi)^{re.escape(key)}\s*:\s*(.+)$", text)
-    return m.group(1).strip() if m else ""
+    section = scan.sections.get(_section_key(key))
+    return section.value if section else ""
 
 
 # -------------------------
 # Ingredient extraction
 # -------------------------
 
-def simple_extract_ingredients(text: str) -> List[str]:
+# virgule ou point-virgule, sauf virgule décimale ("huile d'olive 2,5%")
+_LIST_SPLIT_RE = re.compile(r"(?<!\d),|,(?!\d)|;")
+
+
+def simple_extract_ingredients(text: str, scan: Optional[TextScan] = None) -> List[str]:
     """
     Version plus propre :
     - Priorité à la ligne "Ingredients (INCI): ..." ou "Ingrédients: ..."
-    - Split par virgule
+    - Split par virgule (pas entre deux chiffres)
     """
+    scan = scan or analyze_text(text)
+
     # 1) priorité INCI
-    line = _extract_section_value(text, "Ingredients (INCI)")
+    line = _section_value(scan, "Ingredients (INCI)")
     if not line:
         # fallback "Ingrédients" / "Ingredients"
         for k in ["Ingrédients", "Ingredients"]:
-            line = _extract_section_value(text, k)
+            line = _section_value(scan, k)
             if line:
                 break
 
     ingredients = []
     if line:
-        for part in re.split(r",|;", line):
+        for part in _LIST_SPLIT_RE.split(line):
             ing = part.strip()
             if ing:
                 ingredients.append(ing)
         return _dedup_keep_order(ingredients)
 
-    # 2) fallback ancien: chercher lignes contenant keyword
-    lines = text.split("\n")
-    candidates = []
-    for l in lines:
-        if any(kw.lower() in l.lower() for kw in INGREDIENT_KEYWORDS):
-            candidates.append(l)
+    # 2) fallback ancien: lignes contenant un keyword (repérées par le scanner)
+    lines = scan.text.split("\n")
+    starts = list(accumulate((len(l) + 1 for l in lines[:-1]), initial=0))
+    candidate_idx = sorted({
+        bisect_right(starts, h.start) - 1 for h in scan.hits if h.rule.category == "ingredient_section"
+    })
 
-    for l in candidates:
-        l_clean = l.split(":", 1)[-1]
-        for part in re.split(r",|;", l_clean):
+    for idx in candidate_idx:
+        l_clean = lines[idx].split(":", 1)[-1]
+        for part in _LIST_SPLIT_RE.split(l_clean):
             ing = part.strip()
             if ing:
                 ingredients.append(ing)
@@ -83,79 +243,38 @@ def simple_extract_ingredients(text: str) -> List[str]:
 # Labels extraction (rule-based fiable)
 # -------------------------
 
-def simple_extract_labels(text: str) -> List[str]:
+def simple_extract_labels(text: str, scan: Optional[TextScan] = None) -> List[str]:
     """
     IMPORTANT:
     - On évite le faux label "AB" qui sort juste parce que 'AB' est un token.
-    - On détecte explicitement Vegan / 100% recyclable / Bio.
+    - On détecte explicitement Vegan / 100% recyclable / Bio (règles "label").
     """
-    found = []
-    lower = text.lower()
-
-    # vegan
-    if re.search(r"\bvegan\b", lower):
-        found.append("vegan")
-
-    # recyclable (détecter 100% recyclable)
-    if re.search(r"100%\s*recycl", lower) or re.search(r"\brecyclable\b", lower):
-        found.append("recyclable")
-
-    # bio / organic
-    if re.search(r"\bbio\b", lower) or re.search(r"\borganic\b", lower):
-        found.append("bio")
-
-    # fairtrade
-    if re.search(r"\bfairtrade\b", lower):
-        found.append("fairtrade")
-
-    # garder les autres keywords (sans AB)
-    for kw in LABEL_KEYWORDS:
-        if kw.lower() in lower:
-            found.append(kw.lower())
-
-    return _dedup_keep_order(found)
+    scan = scan or analyze_text(text)
+    return _dedup_keep_order(_rule_values(scan.hits, "label"))
 
 
 # -------------------------
 # Packaging extraction (rule-based PET/PP)
 # -------------------------
 
-def simple_extract_packaging(text: str) -> List[str]:
+def simple_extract_packaging(text: str, scan: Optional[TextScan] = None) -> List[str]:
     """
     IMPORTANT:
     - On ne renvoie pas juste 'emballage' (mot générique).
     - On détecte PET / PP et on renvoie des valeurs utiles.
     """
-    found = []
-    lower = text.lower()
-
-    # prendre la section Emballage si elle existe
-    emballage_line = _extract_section_value(text, "Emballage").lower()
-
-    haystack = emballage_line if emballage_line else lower
-
-    # PET/PP => plastic
-    if re.search(r"\bpet\b", haystack) or re.search(r"\bpp\b", haystack):
-        # On met des tokens exploitables par mapping LCA
-        found.append("PET")
-        found.append("PP")
-        found.append("plastic")
-
-    # autres matériaux
-    if "verre" in haystack:
-        found.append("glass")
-    if "carton" in haystack:
-        found.append("cardboard")
-    if "papier" in haystack:
-        found.append("paper")
-    if "plastique" in haystack and "plastic" not in found:
-        found.append("plastic")
-
-    # fallback keywords (mais on ignore le mot "emballage" seul)
-    for kw in PACKAGING_KEYWORDS:
-        if kw.lower() in lower and kw.lower() != "emballage":
-            found.append(kw.lower())
-
+    scan = scan or analyze_text(text)
+
+    # matériaux : dans la section Emballage si elle existe, sinon tout le texte
+    section = scan.sections.get("emballage")
+    if section and section.value:
+        materials = [h for h in scan.hits if section.start <= h.start and h.end <= section.end]
+    else:
+        materials = scan.hits
+    found = _rule_values(materials, "packaging_material")
+
+    # fallback keywords (tout le texte)
+    found += _rule_values(scan.hits, "packaging")
     return _dedup_keep_order(found)
 
 
@@ -163,20 +282,44 @@ def simple_extract_packaging(text: str) -> List[str]:
 # Origin extraction (simple)
 # -------------------------
 
-def simple_extract_origins(text: str) -> List[str]:
+def simple_extract_origins(text: str, scan: Optional[TextScan] = None) -> List[str]:
     """
     Amélioration simple :
     - si "Origine: ..." existe, renvoyer la valeur
     - sinon fallback keywords
     """
-    found = []
-    origine = _extract_section_value(text, "Origine")
+    scan = scan or analyze_text(text)
+    origine = _section_value(scan, "Origine")
     if origine:
-        found.append(origine)
-        return _dedup_keep_order(found)
+        return _dedup_keep_order([origine])
+    return _dedup_keep_order(_rule_values(scan.hits, "origin"))
 
-    lower = text.lower()
-    for kw in ORIGIN_KEYWORDS:
-        if kw.lower() in lower:
-            found.append(kw)
-    return _dedup_keep_order(found)
+
+# -------------------------
+# Extraction complète (un texte / un lot)
+# -------------------------
+
+def normalize_text(text: str) -> str:
+    """
+    Forme canonique d'un texte avant extraction (et clé du cache de résultats) :
+    accents composés (NFC, comme les mots-clés), fins de ligne "\n", sans blancs finaux.
+    """
+    text = unicodedata.normalize("NFC", text)
+    return text.replace("\r\n", "\n").replace("\r", "\n").rstrip()
+
+
+def extract_raw_entities(text: str) -> Dict[str, List[str]]:
+    """Entités brutes (avant normalisation) des quatre catégories."""
+    text = normalize_text(text)
+    scan = analyze_text(text)
+    return {
+        "ingredients": simple_extract_ingredients(text, scan),
+        "packaging": simple_extract_packaging(text, scan),
+        "labels": simple_extract_labels(text, scan),
+        "origins": simple_extract_origins(text, scan),
+    }
+
+
+def extract_raw_batch(texts: List[str]) -> List[Dict[str, List[str]]]:
+    """Tâche d'un processus du pool (/nlp/extract-batch) : un paquet de textes."""
+    return [extract_raw_entities(text) for text in texts]
@@ -0,0 +1,277 @@
+# result_cache.py
+"""
+Cache de résultats de /nlp/extract-and-lca (NLP + LCA + Scoring).
+
+- clé = SHA-256 de (product_id, version des taxonomies, empreinte des règles de
+  mots-clés, version des facteurs ACV, texte normalisé) : une modification des
+  taxonomies ou des facteurs change la clé, les anciennes entrées ne sont plus
+  lues et sortent par TTL / LRU
+- product_id fait partie de la clé : la réponse (et le score enregistré par
+  Scoring) dépend du produit
+- local : LRU borné en mémoire (NLP_RESULT_CACHE_MAX_MB, résultats gardés en
+  JSON sérialisé) avec TTL (NLP_RESULT_CACHE_TTL_S), un par worker
+- partagé (NLP_RESULT_CACHE_SHARED=1) : table nlp_result_cache, lue après un
+  défaut local ; tous les workers / instances en profitent
+- requêtes identiques simultanées (retries) : une seule calcule, les autres
+  attendent son résultat
+- sans version des facteurs (LCALite injoignable) : pas de cache, calcul normal
+- accès base via AsyncSession (pilote asyncpg) : aucune requête ne bloque la boucle
+"""
+import asyncio
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ecolabel_common.telemetry import get_logger
+
+from .config import (
+    NLP_RESULT_CACHE_ENABLED,
+    NLP_RESULT_CACHE_MAX_MB,
+    NLP_RESULT_CACHE_TTL_S,
+    NLP_RESULT_CACHE_SHARED,
+    NLP_RESULT_CACHE_SHARED_MAX_ENTRIES,
+)
+from .lca_client import get_factors_version
+from .models import NLPResultCache
+from .nlp_pipeline import normalize_text, rules_digest
+from .taxonomy_index import get_taxonomy_index_async
+
+log = get_logger("result_cache")
+
+# surcoût approximatif d'une entrée (tuple, nœud de l'OrderedDict) en plus des deux chaînes
+_ENTRY_OVERHEAD = 120
+# éviction de la table partagée : une fois tous les N enregistrements (COUNT(*) coûteux)
+_SHARED_EVICT_EVERY = 100
+
+
+class LocalResultCache:
+    """LRU borné en octets, avec date d'expiration par entrée."""
+
+    def __init__(self, max_bytes: int, ttl_s: float):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    @staticmethod
+    def _size(key: str, blob: str) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(blob) + _ENTRY_OVERHEAD
+
+    def _remove(self, key: str) -> None:
+        _, blob = self._entries.pop(key)
+        self._bytes -= self._size(key, blob)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def put(self, key: str, blob: str, ttl_s: Optional[float] = None) -> None:
+        size = self._size(key, blob)
+        if size > self.max_bytes:
+            return
+        ttl_s = self.ttl_s if ttl_s is None else min(ttl_s, self.ttl_s)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl_s, blob)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+_local = LocalResultCache(int(NLP_RESULT_CACHE_MAX_MB * 1024 * 1024), NLP_RESULT_CACHE_TTL_S)
+_inflight: Dict[str, "asyncio.Future[Optional[str]]"] = {}
+_counters = {"hits": 0, "shared_hits": 0, "coalesced": 0, "misses": 0, "bypassed": 0, "stores": 0, "shared_errors": 0}
+_counters_lock = threading.Lock()
+
+
+def _incr(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def result_key(text: str, product_id: Optional[str], versions: Sequence[str]) -> str:
+    digest = hashlib.sha256()
+    for part in (product_id or "", *versions, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def cache_key(db: AsyncSession, text: str, product_id: Optional[str]) -> Optional[str]:
+    """Clé du résultat, ou None si le cache est désactivé ou une version est inconnue."""
+    if not NLP_RESULT_CACHE_ENABLED:
+        return None
+    taxonomy_version = (await get_taxonomy_index_async(db)).version
+    factors_version = await get_factors_version()
+    if taxonomy_version is None or factors_version is None:
+        _incr("bypassed")
+        return None
+    return result_key(normalize_text(text), product_id, (taxonomy_version, rules_digest(), factors_version))
+
+
+# ---------- cache partagé (table nlp_result_cache) ----------
+
+async def _shared_get(db: AsyncSession, key: str) -> Optional[Tuple[str, float]]:
+    """(résultat, secondes restantes) ; une erreur de base = défaut de cache."""
+    now = datetime.now(timezone.utc)
+    try:
+        row = (await db.execute(
+            select(NLPResultCache.result, NLPResultCache.expires_at)
+            .where(NLPResultCache.key == key, NLPResultCache.expires_at > now)
+        )).first()
+        if row is None:
+            return None
+        await db.execute(
+            update(NLPResultCache)
+            .where(NLPResultCache.key == key)
+            .values(hits=NLPResultCache.hits + 1, last_used_at=func.now())
+        )
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        _incr("shared_errors")
+        log.warning(f"Cache partagé illisible : {e.__class__.__name__}")
+        return None
+    return row.result, (row.expires_at - now).total_seconds()
+
+
+async def _shared_store(db: AsyncSession, key: str, blob: str) -> None:
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=NLP_RESULT_CACHE_TTL_S)
+    try:
+        await db.execute(
+            insert(NLPResultCache)
+            .values(key=key, result=blob, hits=0, expires_at=expires_at)
+            .on_conflict_do_update(
+                index_elements=[NLPResultCache.key],
+                set_={"result": blob, "expires_at": expires_at, "last_used_at": func.now()},
+            )
+        )
+        if _counters["stores"] % _SHARED_EVICT_EVERY == 0:
+            await _shared_evict(db)
+        await db.commit()
+    except SQLAlchemyError as e:
+        await db.rollback()
+        _incr("shared_errors")
+        log.warning(f"Cache partagé non mis à jour : {e.__class__.__name__}")
+
+
+async def _shared_evict(db: AsyncSession) -> None:
+    """Entrées expirées, puis LRU au-delà de NLP_RESULT_CACHE_SHARED_MAX_ENTRIES."""
+    await db.execute(delete(NLPResultCache).where(NLPResultCache.expires_at <= datetime.now(timezone.utc)))
+    count = await db.scalar(select(func.count()).select_from(NLPResultCache)) or 0
+    excess = count - NLP_RESULT_CACHE_SHARED_MAX_ENTRIES
+    if excess > 0:
+        oldest = select(NLPResultCache.key).order_by(NLPResultCache.last_used_at.asc()).limit(excess)
+        await db.execute(delete(NLPResultCache).where(NLPResultCache.key.in_(oldest)))
+
+
+# ---------- lecture / calcul ----------
+
+async def get_or_compute(
+    db: AsyncSession,
+    key: Optional[str],
+    compute: Callable[[], Awaitable[Dict[str, Any]]],
+) -> Tuple[Dict[str, Any], str]:
+    """
+    (résultat, origine) avec origine = "hit" | "shared_hit" | "coalesced" | "miss" | "bypass".
+    Un résultat en cache est toujours une copie neuve (json.loads) : l'appelant peut le modifier.
+    """
+    if key is None:
+        return await compute(), "bypass"
+
+    blob = _local.get(key)
+    if blob is not None:
+        _incr("hits")
+        return json.loads(blob), "hit"
+
+    if NLP_RESULT_CACHE_SHARED:
+        found = await _shared_get(db, key)
+        if found is not None:
+            blob, remaining_s = found
+            _local.put(key, blob, remaining_s)
+            _incr("shared_hits")
+            return json.loads(blob), "shared_hit"
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        blob = await asyncio.shield(pending)
+        if blob is not None:
+            _incr("coalesced")
+            return json.loads(blob), "coalesced"
+        # le calcul en cours a échoué : on retente pour cette requête-ci
+        return await compute(), "miss"
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    blob = None
+    try:
+        result = await compute()
+        blob = json.dumps(result, ensure_ascii=False)
+    finally:
+        _inflight.pop(key, None)
+        future.set_result(blob)
+
+    _incr("misses")
+    _local.put(key, blob)
+    _incr("stores")
+    if NLP_RESULT_CACHE_SHARED:
+        await _shared_store(db, key, blob)
+    return result, "miss"
+
+
+async def clear_result_cache(db: AsyncSession) -> Dict[str, Any]:
+    _local.clear()
+    if NLP_RESULT_CACHE_SHARED:
+        await db.execute(delete(NLPResultCache))
+        await db.commit()
+    return result_cache_stats()
+
+
+def result_cache_stats() -> Dict[str, Any]:
+    with _counters_lock:
+        counters = dict(_counters)
+    lookups = counters["hits"] + counters["shared_hits"] + counters["coalesced"] + counters["misses"]
+    served = lookups - counters["misses"]
+    return {
+        "enabled": NLP_RESULT_CACHE_ENABLED,
+        "shared": NLP_RESULT_CACHE_SHARED,
+        "ttl_s": NLP_RESULT_CACHE_TTL_S,
+        **counters,
+        "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+        "local": _local.stats(),
+    }
@@ -1,51 +1,65 @@
 from sqlalchemy.orm import Session
-from typing import List
-from .models import IngredientTaxonomy, PackagingTaxonomy, LabelTaxonomy, OriginTaxonomy
+from typing import Dict, List
 from .schemas import NormalizedEntity
+from .taxonomy_index import TaxonomyIndex, get_taxonomy_index
 
-def _match_entity(db: Session, table, raw: str, category: str) -> NormalizedEntity:
-    # simple match : exact + ILIKE + recherche dans synonyms
-    raw_clean = raw.strip()
-
-    # 1) essai sur name exact
-    obj = db.query(table).filter(table.name.ilike(raw_clean)).first()
-
-    if not obj:
-        # 2) essai sur synonyms (simple split par ';')
-        all_objs = db.query(table).all()
-        for o in all_objs:
-            if o.synonyms:
-                syns = [s.strip().lower() for s in o.synonyms.split(";")]
-                if raw_clean.lower() in syns:
-                    obj = o
-                    break
-
-    if obj:
-        return NormalizedEntity(
-            raw=raw_clean,
-            normalized=obj.name,
-            category=category,
-            eco_ref_code=getattr(obj, "eco_ref_code", None),
-            confidence=0.9
-        )
-    else:
-        # pas trouvé dans la taxonomie → on renvoie tel quel, avec faible confiance
-        return NormalizedEntity(
-            raw=raw_clean,
-            normalized=raw_clean,
-            category=category,
-            eco_ref_code=None,
-            confidence=0.4
-        )
+def _match_entities(db: Session, category: str, raws: List[str]) -> List[NormalizedEntity]:
+    # match exact sur le nom puis sur les synonyms (insensible à la casse), puis
+    # correspondance approchée (trigrammes) : toute la liste en un appel,
+    # via l'index en mémoire (taxonomy_index) : pas de requête SQL par entité
+    raws_clean = [raw.strip() for raw in raws]
+    matches = get_taxonomy_index(db).match_many(category, raws_clean)
+    return _to_entities(category, raws_clean, matches)
+
+def _to_entities(category: str, raws_clean: List[str], matches) -> List[NormalizedEntity]:
+    entities = []
+    for raw_clean, (entry, confidence) in zip(raws_clean, matches):
+        if entry:
+            entities.append(NormalizedEntity(
+                raw=raw_clean,
+                normalized=entry.name,
+                category=category,
+                eco_ref_code=entry.eco_ref_code,
+                confidence=confidence
+            ))
+        else:
+            # pas trouvé dans la taxonomie → on renvoie tel quel, avec faible confiance
+            entities.append(NormalizedEntity(
+                raw=raw_clean,
+                normalized=raw_clean,
+                category=category,
+                eco_ref_code=None,
+                confidence=confidence
+            ))
+    return entities
 
 def normalize_ingredients(db: Session, ingredients_raw: List[str]) -> List[NormalizedEntity]:
-    return [_match_entity(db, IngredientTaxonomy, ing, "ingredient") for ing in ingredients_raw]
+    return _match_entities(db, "ingredient", ingredients_raw)
 
 def normalize_packaging(db: Session, packaging_raw: List[str]) -> List[NormalizedEntity]:
-    return [_match_entity(db, PackagingTaxonomy, p, "packaging") for p in packaging_raw]
+    return _match_entities(db, "packaging", packaging_raw)
 
 def normalize_labels(db: Session, labels_raw: List[str]) -> List[NormalizedEntity]:
-    return [_match_entity(db, LabelTaxonomy, l, "label") for l in labels_raw]
+    return _match_entities(db, "label", labels_raw)
 
 def normalize_origins(db: Session, origins_raw: List[str]) -> List[NormalizedEntity]:
-    return [_match_entity(db, OriginTaxonomy, o, "origin") for o in origins_raw]
+    return _match_entities(db, "origin", origins_raw)
+
+_CATEGORIES = {"ingredients": "ingredient", "packaging": "packaging", "labels": "label", "origins": "origin"}
+
+def normalize_many(db: Session, extracted: List[Dict[str, List[str]]]) -> List[Dict[str, List[NormalizedEntity]]]:
+    """
+    Normalise les entités brutes de tout un lot de textes : par catégorie, les
+    termes distincts du lot passent en un seul appel à l'index des taxonomies.
+    """
+    return normalize_with_index(get_taxonomy_index(db), extracted)
+
+def normalize_with_index(index: TaxonomyIndex, extracted: List[Dict[str, List[str]]]) -> List[Dict[str, List[NormalizedEntity]]]:
+    """normalize_many sans accès base : index déjà rafraîchi (chemin async)."""
+    results: List[Dict[str, List[NormalizedEntity]]] = [{} for _ in extracted]
+    for field, category in _CATEGORIES.items():
+        terms = list(dict.fromkeys(raw.strip() for item in extracted for raw in item[field]))
+        by_term = dict(zip(terms, _to_entities(category, terms, index.match_many(category, terms))))
+        for item, result in zip(extracted, results):
+            result[field] = [by_term[raw.strip()] for raw in item[field]]
+    return results
@@ -0,0 +1,56 @@
+# spacy_model.py
+"""
+Modèle spaCy partagé, chargé à la demande.
+
+- aucun chargement à l'import : les extracteurs à règles (simple_extract_*) n'en
+  ont pas besoin, le service démarre sans payer le modèle (secondes + centaines de Mo)
+- get_nlp() charge le modèle une seule fois par processus (verrou), avec seulement
+  les composants listés dans NLP_SPACY_PIPES ("*" = tous) ; les autres sont
+  exclus (ni chargés ni gardés en mémoire)
+- NLP_SPACY_PRELOAD=1 : chargement à l'import de app.main. Avec gunicorn
+  --preload (gunicorn.conf.py), l'import a lieu dans le maître avant le fork :
+  les workers partagent les pages du modèle en copie sur écriture
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .config import NLP_SPACY_MODEL, NLP_SPACY_PIPES
+
+_nlp = None
+_lock = threading.Lock()
+_load_info: Dict[str, Any] = {}
+
+
+def _wanted_pipes():
+    return [p.strip() for p in NLP_SPACY_PIPES.split(",") if p.strip()]
+
+
+def get_nlp():
+    global _nlp
+    if _nlp is not None:
+        return _nlp
+    with _lock:
+        if _nlp is None:
+            import spacy  # import coûteux : seulement si un extracteur spaCy sert
+
+            t0 = time.perf_counter()
+            wanted = _wanted_pipes()
+            available = spacy.info(NLP_SPACY_MODEL).get("pipeline", [])
+            exclude = [] if "*" in wanted else [p for p in available if p not in wanted]
+            _nlp = spacy.load(NLP_SPACY_MODEL, exclude=exclude)
+            _load_info.update(
+                model=NLP_SPACY_MODEL,
+                pipes=list(_nlp.pipe_names),
+                excluded=exclude,
+                load_ms=round((time.perf_counter() - t0) * 1000, 1),
+            )
+    return _nlp
+
+
+def is_loaded() -> bool:
+    return _nlp is not None
+
+
+def spacy_stats() -> Dict[str, Optional[Any]]:
+    return {"loaded": is_loaded(), "wanted_pipes": _wanted_pipes(), **_load_info}
@@ -0,0 +1,323 @@
+# taxonomy_index.py
+"""
+Index en mémoire des quatre taxonomies (ingrédients, emballages, labels, origines).
+
+- clé = nom ou synonyme normalisé (strip + minuscules) -> entité : un dict, O(1)
+- chargé au démarrage (quatre SELECT), puis la base sort du chemin chaud
+- rafraîchissement :
+    * toutes les NLP_TAXONOMY_CHECK_S secondes, une empreinte par table
+      (nb de lignes, md5 de id / nom / synonymes / code dans l'ordre des id) est
+      recalculée côté base (PostgreSQL ; ailleurs les lignes sont relues et hachées ici) ;
+      si elle a changé, l'index est rechargé
+    * au plus tard après NLP_TAXONOMY_TTL_S secondes, rechargement complet (filet de sécurité)
+    * POST /taxonomy/reload pour forcer
+- l'index est remplacé d'un bloc : les lectures en cours ne voient jamais un état partiel
+- endpoints async : get_taxonomy_index_async (AsyncSession, pilote asyncpg), même
+  index ; la construction (dicts, trigrammes) passe dans un thread
+
+Priorité identique à l'ancienne recherche SQL : le nom exact l'emporte sur un
+synonyme ; entre synonymes, la ligne d'id le plus petit gagne. Sans correspondance
+exacte, match_many passe par l'index de trigrammes (fuzzy_matcher).
+
+Les noms et synonymes label / emballage / origine alimentent aussi le scanner de
+mots-clés des extracteurs (nlp_pipeline.set_taxonomy_keywords).
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ecolabel_common.telemetry import get_logger
+
+from .config import NLP_TAXONOMY_CHECK_S, NLP_TAXONOMY_TTL_S, NLP_FUZZY_ENABLED, NLP_KEYWORD_MIN_LEN
+from .fuzzy_matcher import FuzzyIndex
+from .keyword_scanner import normalize_phrase
+from .models import IngredientTaxonomy, PackagingTaxonomy, LabelTaxonomy, OriginTaxonomy
+from .nlp_pipeline import set_taxonomy_keywords
+
+log = get_logger("taxonomy_index")
+
+TABLES = {
+    "ingredient": IngredientTaxonomy,
+    "packaging": PackagingTaxonomy,
+    "label": LabelTaxonomy,
+    "origin": OriginTaxonomy,
+}
+
+
+@dataclass(frozen=True)
+class TaxonomyEntry:
+    name: str
+    eco_ref_code: Optional[str] = None
+
+
+def normalize_key(raw: str) -> str:
+    return raw.strip().lower()
+
+
+def _rows_query(table):
+    cols = [table.name, table.synonyms]
+    if hasattr(table, "eco_ref_code"):
+        cols.append(table.eco_ref_code)
+    return select(*cols).order_by(table.id)
+
+
+def _build_table(rows: Sequence[Sequence[Optional[str]]]) -> Dict[str, TaxonomyEntry]:
+    entries: Dict[str, TaxonomyEntry] = {}
+    names: Dict[str, TaxonomyEntry] = {}
+    for row in rows:
+        entry = TaxonomyEntry(name=row[0], eco_ref_code=row[2] if len(row) > 2 else None)
+        names[normalize_key(row[0])] = entry
+        for syn in (row[1] or "").split(";"):
+            key = normalize_key(syn)
+            if key:
+                entries.setdefault(key, entry)
+    entries.update(names)
+    return entries
+
+
+def _keywords(maps: Dict[str, Dict[str, TaxonomyEntry]]) -> Dict[str, Dict[str, str]]:
+    """Noms et synonymes label / emballage / origine, repérés dans le texte par le scanner de mots-clés."""
+    return {
+        category: {
+            key: entry.name
+            for key, entry in maps.get(category, {}).items()
+            if len(normalize_phrase(key)) >= NLP_KEYWORD_MIN_LEN
+        }
+        for category in ("label", "packaging", "origin")
+    }
+
+
+# séparateurs de champs / de lignes dans l'empreinte (absents des noms et synonymes)
+_FIELD_SEP = "\x1f"
+_ROW_SEP = "\x1e"
+
+
+def _fingerprint_queries(dialect: str):
+    for table in TABLES.values():
+        cols = [table.id, table.name, table.synonyms]
+        if hasattr(table, "eco_ref_code"):
+            cols.append(table.eco_ref_code)
+        if dialect == "postgresql":
+            row = func.concat_ws(_FIELD_SEP, *(func.coalesce(cast(col, String), "") for col in cols))
+            content = func.string_agg(row, aggregate_order_by(literal(_ROW_SEP), table.id))
+            yield select(func.count(), func.coalesce(func.md5(content), ""))
+        else:
+            yield select(*cols).order_by(table.id)
+
+
+def _table_fingerprint(dialect: str, rows: Sequence) -> Tuple:
+    """(nb de lignes, md5 du contenu) : toute modification d'un champ change l'empreinte."""
+    if dialect == "postgresql":
+        return tuple(rows[0])
+    digest = hashlib.md5()
+    for row in rows:
+        digest.update(_FIELD_SEP.join("" if v is None else str(v) for v in row).encode())
+        digest.update(_ROW_SEP.encode())
+    return len(rows), digest.hexdigest()
+
+
+def _fingerprint(db: Session) -> Tuple:
+    dialect = db.get_bind().dialect.name
+    return tuple(
+        _table_fingerprint(dialect, db.execute(query).all()) for query in _fingerprint_queries(dialect)
+    )
+
+
+async def _fingerprint_async(db: AsyncSession) -> Tuple:
+    dialect = db.get_bind().dialect.name
+    return tuple([
+        _table_fingerprint(dialect, (await db.execute(query)).all()) for query in _fingerprint_queries(dialect)
+    ])
+
+
+class TaxonomyIndex:
+    def __init__(self, check_s: float = NLP_TAXONOMY_CHECK_S, ttl_s: float = NLP_TAXONOMY_TTL_S):
+        self.check_s = check_s
+        self.ttl_s = ttl_s
+        self._maps: Dict[str, Dict[str, TaxonomyEntry]] = {}
+        self._fuzzy: Dict[str, FuzzyIndex] = {}
+        self._fingerprint: Optional[Tuple] = None
+        # empreinte du contenu chargé, partagée par tous les workers (clé du cache de résultats)
+        self.version: Optional[str] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "fuzzy_hits": 0, "misses": 0, "loads": 0, "checks": 0, "load_ms": 0.0}
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._maps)
+
+    def load(self, db: Session) -> None:
+        with self._lock:
+            self._load(db)
+
+    def _load(self, db: Session) -> None:
+        t0 = time.perf_counter()
+        rows = {category: db.execute(_rows_query(table)).all() for category, table in TABLES.items()}
+        self._install(rows, _fingerprint(db), t0)
+
+    def _install(self, rows: Dict[str, Sequence], fingerprint: Tuple, t0: float) -> None:
+        """Construit les dicts et l'index de trigrammes (CPU, sans base) puis remplace l'index d'un bloc."""
+        maps = {category: _build_table(r) for category, r in rows.items()}
+        fuzzy = {category: FuzzyIndex(m.items()) for category, m in maps.items()} if NLP_FUZZY_ENABLED else {}
+        self._fingerprint = fingerprint
+        self.version = hashlib.sha256(repr(fingerprint).encode()).hexdigest()[:16]
+        self._maps, self._fuzzy = maps, fuzzy
+        set_taxonomy_keywords(_keywords(maps))
+        self._loaded_at = self._checked_at = time.monotonic()
+        self._stats["loads"] += 1
+        self._stats["load_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+
+    def _is_fresh(self) -> bool:
+        return bool(self._maps) and time.monotonic() - self._checked_at < self.check_s
+
+    def _expired(self) -> bool:
+        return self.ttl_s > 0 and time.monotonic() - self._loaded_at >= self.ttl_s
+
+    def refresh_if_stale(self, db: Session) -> None:
+        """Appelé par requête : ne touche la base qu'une fois par NLP_TAXONOMY_CHECK_S."""
+        if self._is_fresh():
+            return
+        # un seul thread vérifie ; les autres continuent avec l'index courant
+        if not self._lock.acquire(blocking=not self._maps):
+            return
+        try:
+            if self._is_fresh():
+                return
+            self._checked_at = time.monotonic()
+            self._stats["checks"] += 1
+            if not self._maps or self._expired() or _fingerprint(db) != self._fingerprint:
+                self._load(db)
+        except SQLAlchemyError as e:
+            if not self._maps:
+                raise
+            # base indisponible : on garde l'index courant, nouvel essai au prochain intervalle
+            db.rollback()
+            log.warning(f"Vérification des taxonomies impossible : {e.__class__.__name__}")
+        finally:
+            self._lock.release()
+
+    async def refresh_if_stale_async(self, db: AsyncSession) -> None:
+        """
+        Variante des endpoints async : requêtes via le pilote async, construction
+        de l'index dans un thread ; la boucle d'événements n'est jamais bloquée.
+        """
+        if self._is_fresh():
+            return
+        if not self._lock.acquire(blocking=False):
+            if self._maps:
+                return
+            # premier chargement en cours ailleurs : on l'attend sans bloquer la boucle.
+            # Pas d'acquire() dans un thread : si la requête est annulée pendant l'attente,
+            # le thread prendrait quand même le verrou et personne ne le relâcherait.
+            while not self._lock.acquire(blocking=False):
+                await asyncio.sleep(0.05)
+        # transaction de lecture ouverte ici : refermée à la fin pour rendre la
+        # connexion au pool avant les appels HTTP (LCA) de la requête
+        own_transaction = not db.in_transaction()
+        try:
+            if self._is_fresh():
+                return
+            self._checked_at = time.monotonic()
+            self._stats["checks"] += 1
+            fingerprint = await _fingerprint_async(db)
+            if self._maps and not self._expired() and fingerprint == self._fingerprint:
+                return
+            t0 = time.perf_counter()
+            rows = {}
+            for category, table in TABLES.items():
+                rows[category] = (await db.execute(_rows_query(table))).all()
+            await asyncio.to_thread(self._install, rows, fingerprint, t0)
+        except SQLAlchemyError as e:
+            if not self._maps:
+                raise
+            own_transaction = True
+            log.warning(f"Vérification des taxonomies impossible : {e.__class__.__name__}")
+        finally:
+            self._lock.release()
+            if own_transaction and db.in_transaction():
+                await db.rollback()
+
+    def entries(self, category: str) -> Dict[str, TaxonomyEntry]:
+        """Clé normalisée -> entité (lecture seule) ; remplacé d'un bloc au rechargement."""
+        return self._maps.get(category, {})
+
+    def match_many(self, category: str, raws: Sequence[str]) -> List[Tuple[Optional[TaxonomyEntry], float]]:
+        """
+        (entité, confiance) pour chaque terme : 0.9 en exact (nom ou synonyme),
+        confiance calibrée de l'index de trigrammes sinon, (None, 0.4) si rien.
+        """
+        exact_map = self._maps.get(category, {})
+        results: List[Tuple[Optional[TaxonomyEntry], float]] = []
+        missing = []
+        for i, raw in enumerate(raws):
+            entry = exact_map.get(normalize_key(raw))
+            results.append((entry, 0.9) if entry is not None else (None, 0.4))
+            if entry is None:
+                missing.append(i)
+
+        fuzzy = self._fuzzy.get(category)
+        fuzzy_hits = 0
+        if missing and fuzzy is not None:
+            for i, found in zip(missing, fuzzy.match_many([raws[i] for i in missing])):
+                if found is not None:
+                    results[i] = (found.value, found.confidence)
+                    fuzzy_hits += 1
+
+        # compteurs approximatifs (pas de verrou dans le chemin chaud)
+        self._stats["hits"] += len(raws) - len(missing)
+        self._stats["fuzzy_hits"] += fuzzy_hits
+        self._stats["misses"] += len(missing) - fuzzy_hits
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        hits, misses = self._stats["hits"] + self._stats["fuzzy_hits"], self._stats["misses"]
+        now = time.monotonic()
+        return {
+            "loaded": self.loaded,
+            "version": self.version,
+            "entries": {category: len(m) for category, m in self._maps.items()},
+            "hits": hits,
+            "fuzzy_hits": self._stats["fuzzy_hits"],
+            "fuzzy_enabled": bool(self._fuzzy),
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "loads": self._stats["loads"],
+            "last_load_ms": self._stats["load_ms"],
+            "fingerprint_checks": self._stats["checks"],
+            "age_s": round(now - self._loaded_at, 1) if self._maps else None,
+            "check_s": self.check_s,
+            "ttl_s": self.ttl_s,
+        }
+
+
+_index = TaxonomyIndex()
+
+
+def get_taxonomy_index(db: Session) -> TaxonomyIndex:
+    _index.refresh_if_stale(db)
+    return _index
+
+
+async def get_taxonomy_index_async(db: AsyncSession) -> TaxonomyIndex:
+    await _index.refresh_if_stale_async(db)
+    return _index
+
+
+def reload_taxonomy_index(db: Session) -> Dict[str, Any]:
+    _index.load(db)
+    return _index.stats()
+
+
+def taxonomy_stats() -> Dict[str, Any]:
+    return _index.stats()
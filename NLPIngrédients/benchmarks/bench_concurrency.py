@@ -0,0 +1,128 @@
+# benchmarks/bench_concurrency.py
+"""
+Requêtes simultanées sur /nlp/extract-and-lca : chemin async (AsyncSession +
+pool de threads) contre l'ancien chemin (Session synchrone appelée depuis la
+boucle d'événements).
+
+- l'appel LCA est remplacé par une attente (--lca-ms) : c'est pendant cette
+  attente que les autres requêtes doivent avancer
+- NLP_TAXONOMY_CHECK_S=0 : chaque requête vérifie l'empreinte des taxonomies
+  en base (pire cas : le chemin chaud touche la base à chaque fois)
+- cache de résultats désactivé : chaque requête fait tout le calcul
+- "retard boucle" : une tâche se réveille toutes les 5 ms et mesure son
+  retard ; une requête SQL bloquante le fait monter
+- ancien chemin : au-delà de la taille du pool synchrone (5 + 10 connexions,
+  gardées pendant l'appel LCA), l'attente d'une connexion bloque la boucle
+  elle-même et les requêtes restent figées jusqu'au timeout du pool (30 s) ;
+  garder --concurrency sous 15 pour obtenir une mesure
+
+Usage (depuis NLPIngrédients/, base de DATABASE_URL, Postgres de préférence) :
+    python benchmarks/bench_concurrency.py [--requests 400] [--concurrency 12] [--lca-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("NLP_TAXONOMY_CHECK_S", "0")
+os.environ.setdefault("NLP_RESULT_CACHE_ENABLED", "0")
+os.environ.setdefault("NLP_SPACY_PRELOAD", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # ecolabel_common
+
+import httpx  # noqa: E402
+from fastapi import Depends  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import main  # noqa: E402
+from app.db import get_db  # noqa: E402
+from app.schemas import RawTextRequest  # noqa: E402
+
+TEXT = (
+    "Nom: Gel douche\n"
+    "Ingredients (INCI): Aqua, Sodium Laureth Sulfate, Glycerin, Parfum\n"
+    "Emballage: Flacon PET recyclé 22 g\n"
+    "Labels: Ecocert, Cosmos Organic\n"
+    "Origine: Fabriqué en France\n"
+    "Poids net: 250 ml\n"
+)
+
+
+@main.app.post("/bench/legacy-extract-and-lca")
+async def legacy_extract_and_lca(payload: RawTextRequest, db: Session = Depends(get_db)):
+    """Ancien chemin : Session synchrone appelée directement depuis la coroutine."""
+    nlp_response = main.run_nlp_pipeline(payload, db)
+    lca_result = await main.call_lca_service({})
+    return {"nlp_output": nlp_response.dict(), "lca_result": lca_result}
+
+
+async def run(path: str, requests: int, concurrency: int):
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - t0 - 0.005)
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def one(i: int):
+            async with semaphore:
+                t0 = time.perf_counter()
+                r = await client.post(path, json={"text": TEXT + f"Lot: {i}\n", "product_id": f"P{i}"})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        await client.post(path, json={"text": TEXT, "product_id": "warmup"})
+        tick = asyncio.create_task(ticker())
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await tick
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "lag_max_ms": max(lags) * 1000 if lags else 0.0,
+        "lag_p95_ms": sorted(lags)[int(len(lags) * 0.95) - 1] * 1000 if lags else 0.0,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--lca-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    async def fake_lca(_request):
+        await asyncio.sleep(args.lca_ms / 1000)
+        return {"co2_kg": 1.0}
+
+    main.call_lca_service = fake_lca
+    main.on_startup()
+
+    async def bench():
+        for label, path in (("sync (ancien)", "/bench/legacy-extract-and-lca"), ("async", "/nlp/extract-and-lca")):
+            res = await run(path, args.requests, args.concurrency)
+            print(
+                f"{label:>14} : {res['rps']:7.1f} req/s  p50 {res['p50_ms']:7.1f} ms  p95 {res['p95_ms']:7.1f} ms"
+                f"  retard boucle p95 {res['lag_p95_ms']:6.1f} ms  max {res['lag_max_ms']:6.1f} ms"
+            )
+        await main.close_async_engine()
+
+    print(f"{args.requests} requêtes, {args.concurrency} simultanées, LCA simulé {args.lca_ms:.0f} ms")
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,80 @@
+# benchmarks/bench_fuzzy_matcher.py
+"""
+Latence de fuzzy_matcher.FuzzyIndex sur une taxonomie synthétique (50k entrées par défaut).
+
+- termes avec une faute d'OCR (une substitution) : latence par terme, part retrouvée
+- termes inconnus (pire cas : aucun candidat ne passe la distance bornée)
+- liste de 30 ingrédients en un appel (match_many), comme une étiquette
+
+Usage (depuis NLPIngrédients/) :
+    python benchmarks/bench_fuzzy_matcher.py [--entries 50000] [--queries 500]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.fuzzy_matcher import FuzzyIndex  # noqa: E402
+
+# syllabes de noms INCI : beaucoup de trigrammes partagés (cas défavorable pour l'index)
+_SYLLABLES = ["so", "di", "um", "lau", "reth", "sul", "fate", "gly", "ce", "rin", "chlo", "ride", "ac", "id",
+              "ci", "tric", "ben", "zo", "ate", "ole", "yl", "meth", "eth", "prop", "ane", "ol", "ex",
+              "tract", "oil", "seed", "flo", "wer", "leaf", "ro", "sa"]
+
+
+def make_names(n: int, rnd: random.Random):
+    def word():
+        return "".join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(2, 4)))
+
+    names = set()
+    while len(names) < n:
+        names.add(" ".join(word() for _ in range(rnd.randint(1, 3))))
+    return sorted(names)
+
+
+def typo(text: str, rnd: random.Random) -> str:
+    i = rnd.randrange(len(text))
+    return text[:i] + rnd.choice("abcdefl1o0") + text[i + 1:]
+
+
+def per_term_ms(index, terms) -> float:
+    t0 = time.perf_counter()
+    for term in terms:
+        index.match_many([term])
+    return (time.perf_counter() - t0) * 1000 / len(terms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    names = make_names(args.entries, rnd)
+
+    t0 = time.perf_counter()
+    index = FuzzyIndex((name, name) for name in names)
+    print(f"index : {len(index)} clés construites en {time.perf_counter() - t0:.2f} s")
+
+    sources = [rnd.choice(names) for _ in range(args.queries)]
+    typos = [typo(s, rnd) for s in sources]
+    found = index.match_many(typos)
+    correct = sum(1 for m, s in zip(found, sources) if m is not None and m.value == s)
+    print(f"faute OCR : {per_term_ms(index, typos):.3f} ms/terme, {correct}/{len(typos)} retrouvés")
+
+    unknown = [name + "zq" for name in rnd.sample(names, args.queries)]
+    print(f"inconnus  : {per_term_ms(index, unknown):.3f} ms/terme")
+
+    label = typos[:20] + unknown[:10]
+    t0 = time.perf_counter()
+    index.match_many(label)
+    print(f"étiquette de {len(label)} termes (match_many) : {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
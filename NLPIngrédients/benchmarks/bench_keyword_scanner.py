@@ -0,0 +1,73 @@
+# benchmarks/bench_keyword_scanner.py
+"""
+Coût de l'extraction à règles (nlp_pipeline.extract_raw_entities) par texte, selon
+le nombre de mots-clés venus des taxonomies (label / emballage / origine).
+
+Le scanner (keyword_scanner) fait une passe par texte quel que soit le nombre de
+règles : le temps par texte doit rester à peu près plat quand les taxonomies grossissent.
+
+Usage (depuis NLPIngrédients/) :
+    python benchmarks/bench_keyword_scanner.py [--texts 600] [--keywords 0,200,2000,20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))  # ecolabel_common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "ParserProduit", "benchmarks"))
+
+from app import nlp_pipeline  # noqa: E402
+from synthetic_corpus import build_corpus  # noqa: E402
+
+_LETTERS = "abcdefghijklmnopqrstuvwxyzéè"
+
+
+def fake_keywords(n: int, rnd: random.Random):
+    per_category = max(1, n // 3)
+    out = {}
+    for category in ("label", "packaging", "origin"):
+        words = set()
+        while len(words) < per_category:
+            words.add("".join(rnd.choice(_LETTERS) for _ in range(rnd.randint(4, 12))))
+        out[category] = {w: w.capitalize() for w in words}
+    return out
+
+
+def per_text_us(texts, repeat: int) -> float:
+    nlp_pipeline.extract_raw_entities(texts[0])  # construction du scanner hors mesure
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for text in texts:
+            nlp_pipeline.extract_raw_entities(text)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6 / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=600)
+    parser.add_argument("--keywords", default="0,200,2000,20000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = build_corpus(max(1, args.texts // 2), seed=args.seed, pdf_pages=0, images=False)
+    texts = [s.text for s in corpus] + [s.noisy for s in corpus if isinstance(s.noisy, str)]
+    texts = texts[:args.texts]
+    print(f"{len(texts)} textes, {sum(map(len, texts)) / len(texts):.0f} caractères en moyenne")
+
+    rnd = random.Random(args.seed)
+    for n in (int(x) for x in args.keywords.split(",")):
+        nlp_pipeline.set_taxonomy_keywords(fake_keywords(n, rnd) if n else {})
+        t0 = time.perf_counter()
+        rules = len(nlp_pipeline.get_scanner())
+        build_ms = (time.perf_counter() - t0) * 1000
+        print(f"{rules:>7} règles (construction {build_ms:7.1f} ms) : {per_text_us(texts, args.repeat):7.1f} µs/texte")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# benchmarks/bench_startup.py
+"""
+Coût de démarrage du service NLP : temps d'import de app.main et RSS, selon le
+mode de chargement de spaCy. Chaque mesure tourne dans un processus neuf.
+
+    lazy            import app.main (par défaut : modèle non chargé)
+    preload         NLP_SPACY_PRELOAD=1, composants NLP_SPACY_PIPES seulement
+    preload_full    NLP_SPACY_PRELOAD=1, tous les composants (ancien comportement)
+
+--gunicorn N : lance aussi gunicorn (gunicorn.conf.py, preload) avec N workers et
+additionne la mémoire réellement privée (USS) et proportionnelle (PSS) du maître
+et des workers, pour vérifier que le modèle est partagé (Linux, base NLP joignable).
+
+Usage (depuis NLPIngrédients/) :
+    python benchmarks/bench_startup.py [--repeat 3] [--gunicorn 4]
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# racine du dépôt (ecolabel_common) dans le PYTHONPATH des processus lancés
+PYTHONPATH = os.pathsep.join(filter(None, [os.path.join(ROOT, ".."), os.environ.get("PYTHONPATH")]))
+
+_CHILD = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+rss_kb = 0
+try:
+    with open("/proc/self/status") as f:
+        rss_kb = next(int(l.split()[1]) for l in f if l.startswith("VmRSS:"))
+except OSError:
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+from app.spacy_model import spacy_stats
+print(json.dumps({"import_s": elapsed, "rss_mb": rss_kb / 1024, "spacy": spacy_stats()}))
+"""
+
+MODES = {
+    "lazy": {"NLP_SPACY_PRELOAD": "0"},
+    "preload": {"NLP_SPACY_PRELOAD": "1"},
+    "preload_full": {"NLP_SPACY_PRELOAD": "1", "NLP_SPACY_PIPES": "*"},
+}
+
+
+def run_mode(env_overrides, repeat: int):
+    env = {**os.environ, "PYTHONPATH": PYTHONPATH, **env_overrides}
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _CHILD], cwd=ROOT, env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            return {"error": (out.stderr.strip().splitlines() or ["?"])[-1]}
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "import_s": round(statistics.median(r["import_s"] for r in runs), 3),
+        "rss_mb": round(statistics.median(r["rss_mb"] for r in runs), 1),
+        "pipes": runs[-1]["spacy"].get("pipes"),
+    }
+
+
+def _memory_kb(pid: int):
+    """(USS, PSS) en Ko depuis /proc/<pid>/smaps_rollup."""
+    uss = pss = 0
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            field, _, rest = line.partition(":")
+            if field in ("Private_Clean", "Private_Dirty"):
+                uss += int(rest.split()[0])
+            elif field == "Pss":
+                pss = int(rest.split()[0])
+    return uss, pss
+
+
+def _children(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def run_gunicorn(workers: int, port: int = 18001, timeout_s: float = 120):
+    env = {**os.environ, "PYTHONPATH": PYTHONPATH, "NLP_SPACY_PRELOAD": "1", "NLP_WORKERS": str(workers), "PORT": str(port)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    t0 = time.perf_counter()
+    try:
+        while True:
+            if proc.poll() is not None:
+                return {"error": (proc.stderr.read().strip().splitlines() or ["gunicorn arrêté"])[-1]}
+            if time.perf_counter() - t0 > timeout_s:
+                return {"error": "délai dépassé"}
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics/spacy", timeout=1)
+                if len(_children(proc.pid)) >= workers:
+                    break
+            except OSError:
+                pass
+            time.sleep(0.5)
+        ready_s = time.perf_counter() - t0
+        time.sleep(2)  # les workers terminent leur démarrage
+        pids = [proc.pid] + _children(proc.pid)
+        mem = [_memory_kb(pid) for pid in pids]
+        return {
+            "workers": workers,
+            "ready_s": round(ready_s, 1),
+            "uss_total_mb": round(sum(u for u, _ in mem) / 1024, 1),
+            "pss_total_mb": round(sum(p for _, p in mem) / 1024, 1),
+            "pss_per_worker_mb": [round(p / 1024, 1) for _, p in mem[1:]],
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--gunicorn", type=int, default=0, metavar="N")
+    args = parser.parse_args()
+
+    for mode, env in MODES.items():
+        r = run_mode(env, args.repeat)
+        if "error" in r:
+            print(f"{mode:<13} échec : {r['error']}")
+            continue
+        pipes = ",".join(r["pipes"]) if r["pipes"] is not None else "-"
+        print(f"{mode:<13} import {r['import_s']:7.3f} s   RSS {r['rss_mb']:8.1f} Mo   composants : {pipes}")
+
+    if args.gunicorn:
+        r = run_gunicorn(args.gunicorn)
+        if "error" in r:
+            print(f"gunicorn      échec : {r['error']}")
+        else:
+            print(f"gunicorn x{r['workers']}   prêt en {r['ready_s']} s   USS total {r['uss_total_mb']} Mo   "
+                  f"PSS total {r['pss_total_mb']} Mo   PSS/worker {r['pss_per_worker_mb']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+# gunicorn.conf.py
+# Plusieurs workers uvicorn qui partagent le modèle spaCy (copie sur écriture) :
+#   NLP_SPACY_PRELOAD=1 NLP_WORKERS=4 gunicorn -c gunicorn.conf.py app.main:app
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+workers = int(os.getenv("NLP_WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+# l'application (et le modèle si NLP_SPACY_PRELOAD=1) est importée une fois dans le maître
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # objets du maître exclus du GC : le ramasse-miettes des workers ne réécrit
+    # pas leurs en-têtes, les pages du modèle restent partagées
+    gc.freeze()
@@ -0,0 +1,38 @@
+from app.keyword_scanner import KeywordScanner, lower_aligned
+
+
+def _found(scanner, text):
+    return [(hit.rule.category, hit.rule.values[0]) for hit in scanner.scan(lower_aligned(text))]
+
+
+def test_whole_word():
+    scanner = KeywordScanner([{"label": {"bio": "Bio"}}])
+    assert _found(scanner, "Produit BIO") == [("label", "Bio")]
+    assert _found(scanner, "emballage biodégradable") == []
+
+
+def test_prefix_and_infix():
+    scanner = KeywordScanner([{"packaging": {"recyclé*": "Recyclé", "*verre*": "Verre"}}])
+    assert _found(scanner, "carton recyclée") == [("packaging", "Recyclé")]
+    assert _found(scanner, "potverre") == [("packaging", "Verre")]
+
+
+def test_whitespace_in_phrase_matches_any_blanks():
+    scanner = KeywordScanner([{"origin": {"fabriqué en": "Fabriqué en"}}])
+    assert _found(scanner, "Fabriqué\n  en France") == [("origin", "Fabriqué en")]
+
+
+def test_overlapping_hits_in_text_order():
+    scanner = KeywordScanner([{"packaging": {"100% recycl*": "100% recyclé", "recyclé*": "Recyclé"}}])
+    hits = scanner.scan(lower_aligned("PET 100% recyclé"))
+    assert [(h.start, h.rule.values[0]) for h in hits] == [(4, "100% recyclé"), (9, "Recyclé")]
+
+
+def test_digest_depends_on_rules_only():
+    spec = {"label": {"bio": "Bio", "vegan": "Vegan"}}
+    assert KeywordScanner([spec]).digest == KeywordScanner([dict(spec)]).digest
+    assert KeywordScanner([spec]).digest != KeywordScanner([{"label": {"bio": "Bio"}}]).digest
+
+
+def test_empty_scanner():
+    assert KeywordScanner([]).scan("bio") == []
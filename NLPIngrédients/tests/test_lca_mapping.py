@@ -0,0 +1,46 @@
+import pytest
+
+from app.lca_mapping import estimate_shares, split_share
+
+
+def _descending(shares):
+    return all(a >= b - 1e-9 for a, b in zip(shares, shares[1:]))
+
+
+def test_split_share():
+    assert split_share("sucre (12 %)") == ("sucre", 12.0)
+    assert split_share("huile d'olive 2,5%") == ("huile d'olive", 2.5)
+    assert split_share("sel") == ("sel", None)
+
+
+def test_undeclared_shares_follow_rank():
+    shares = estimate_shares([None, None])
+    assert shares == pytest.approx([200 / 3, 100 / 3])
+
+
+def test_declared_percentages_kept():
+    shares = estimate_shares([None, 20, None])
+    assert shares[1] == 20
+    assert sum(shares) == pytest.approx(100)
+    assert _descending(shares)
+
+
+def test_declared_percentages_scaled_to_100():
+    assert estimate_shares([80, 40]) == pytest.approx([200 / 3, 100 / 3])
+
+
+def test_undeclared_not_below_later_declared():
+    shares = estimate_shares([None, None, None, None, None, 10])
+    assert shares[5] == 10
+    assert min(shares[:5]) >= 10
+    assert sum(shares) == pytest.approx(100)
+    assert _descending(shares)
+
+
+def test_floors_exceeding_remainder_rescale_everything():
+    shares = estimate_shares([None, None, 60])
+    assert shares == pytest.approx([100 / 3] * 3)
+
+
+def test_no_ingredients():
+    assert estimate_shares([]) == []
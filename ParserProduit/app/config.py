@@ -0,0 +1,74 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Nombre de processus pour l'extraction en lot (/parse/batch) — par défaut : nb de cœurs
+PARSER_BATCH_WORKERS = int(os.getenv("PARSER_BATCH_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Taille max d'un fichier (ou d'un membre d'archive zip) accepté en lot, en Mo
+PARSER_BATCH_MAX_FILE_MB = int(os.getenv("PARSER_BATCH_MAX_FILE_MB", "25"))
+
+# Cache d'extraction (clé = SHA-256 du fichier) : taille max (texte + champs parsés, en Mo)
+# avant éviction LRU
+PARSER_CACHE_MAX_MB = float(os.getenv("PARSER_CACHE_MAX_MB", "256"))
+
+# Exécuteur d'extraction (/parse, /parse-and-nlp) : threads de travail + profondeur de file
+# Au-delà de workers + queue_depth requêtes en cours, on répond 503.
+PARSER_EXTRACT_WORKERS = int(os.getenv("PARSER_EXTRACT_WORKERS", "0")) or (os.cpu_count() or 1)
+PARSER_EXTRACT_QUEUE_DEPTH = int(os.getenv("PARSER_EXTRACT_QUEUE_DEPTH", "32"))
+
+# PDF : lecture page par page avec arrêt anticipé dès que les champs utiles sont trouvés.
+# Désactivé par défaut : les pages suivantes ne sont pas lues, leurs labels (bio, vegan,
+# recyclable...) et mentions d'origine manquent alors dans labels_raw et dans le texte envoyé au NLP.
+PARSER_PDF_STREAMING = os.getenv("PARSER_PDF_STREAMING", "0") == "1"
+# PDF : nb de processus pour extraire plusieurs pages en parallèle (0 = séquentiel)
+PARSER_PDF_PAGE_WORKERS = int(os.getenv("PARSER_PDF_PAGE_WORKERS", "0"))
+
+# OCR (Tesseract)
+# Chemin de l'exécutable (pytesseract) — utile surtout sous Windows
+TESSERACT_CMD = os.getenv("TESSERACT_CMD") or (
+    r"C:\Program Files\Tesseract-OCR\tesseract.exe" if os.name == "nt" else ""
+)
+# Dossier tessdata (fra.traineddata, eng.traineddata) pour tesserocr — vide = détection automatique
+TESSDATA_PREFIX = os.getenv("TESSDATA_PREFIX", "")
+OCR_LANG = os.getenv("OCR_LANG", "fra+eng")
+# "auto" : tesserocr (moteur gardé en mémoire par thread) si installé, sinon pytesseract
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+OCR_PSM = int(os.getenv("OCR_PSM", "3"))
+
+# Prétraitement des images avant OCR
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "1") == "1"
+# Résolution cible transmise à Tesseract (les scans sont remis à cette résolution)
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+# Plus grand côté accepté en pixels (photos de téléphone réduites au-delà)
+OCR_MAX_SIDE_PX = int(os.getenv("OCR_MAX_SIDE_PX", "2400"))
+OCR_DESKEW = os.getenv("OCR_DESKEW", "1") == "1"
+OCR_DESKEW_MAX_ANGLE = float(os.getenv("OCR_DESKEW_MAX_ANGLE", "5"))
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "1") == "1"
+
+# Jobs asynchrones (/parse-and-nlp/jobs)
+# Nb de workers asyncio qui exécutent la chaîne Parser -> NLP -> LCA -> Scoring
+PARSER_JOB_WORKERS = int(os.getenv("PARSER_JOB_WORKERS", "4"))
+# Au-delà de ce nombre de jobs en attente, les nouvelles soumissions reçoivent 503
+PARSER_JOB_MAX_PENDING = int(os.getenv("PARSER_JOB_MAX_PENDING", "1000"))
+# Tentatives max pour une erreur transitoire (service NLP/LCA injoignable...)
+PARSER_JOB_MAX_ATTEMPTS = int(os.getenv("PARSER_JOB_MAX_ATTEMPTS", "3"))
+# Intervalle de scrutation de la table (jobs d'autres instances ou d'avant un redémarrage)
+PARSER_JOB_POLL_S = float(os.getenv("PARSER_JOB_POLL_S", "5"))
+# Un job "running" sans nouvelle depuis ce délai est considéré abandonné et relancé
+PARSER_JOB_STALE_S = int(os.getenv("PARSER_JOB_STALE_S", "900"))
+PARSER_JOB_WEBHOOK_TIMEOUT_S = float(os.getenv("PARSER_JOB_WEBHOOK_TIMEOUT_S", "10"))
+PARSER_JOB_WEBHOOK_RETRIES = int(os.getenv("PARSER_JOB_WEBHOOK_RETRIES", "3"))
+# Hôtes autorisés pour webhook_url (liste séparée par des virgules). Vide : tout hôte
+# public est accepté, les adresses loopback / privées / link-local sont refusées.
+PARSER_JOB_WEBHOOK_ALLOWED_HOSTS = frozenset(
+    h.strip().lower() for h in os.getenv("PARSER_JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()
+)
+
+# Écriture en masse des ProduitRaw
+# Lignes par INSERT multi-lignes (... RETURNING id)
+PARSER_BULK_CHUNK = int(os.getenv("PARSER_BULK_CHUNK", "1000"))
+# Tampon d'écriture partagé (jobs) : flush dès N lignes en attente ou après N ms
+PARSER_BULK_FLUSH_ROWS = int(os.getenv("PARSER_BULK_FLUSH_ROWS", "500"))
+PARSER_BULK_FLUSH_MS = int(os.getenv("PARSER_BULK_FLUSH_MS", "20"))
@@ -1,22 +1,56 @@
 # app/main.py
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException
+import time
+import zipfile
+from typing import List, Optional
+
+from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
+from ecolabel_common.service_client import clients_stats, close_clients
+from ecolabel_common.telemetry import TraceMiddleware, setup_logging, stage_stats
+
 from .database import Base, engine, SessionLocal
-from .models import ProduitRaw
-from .schemas import ProduitRawOut
-from .services.pdf_extractor import extract_text_from_pdf
-from .services.ocr_extractor import extract_text_from_image
-from .services.parser_logic import parse_product_text
+from .schemas import ProduitRawOut, BatchParseOut, BatchItemOut, JobOut
+from .services.extraction import UnsupportedFileError, EmptyTextError
+from .services.extraction_executor import (
+    ExecutorSaturated,
+    get_extraction_executor,
+    shutdown_extraction_executor,
+)
+from .services.batch import expand_upload, run_batch, shutdown_process_pool
+from .services.pdf_extractor import shutdown_page_pool
+from .services.ocr_extractor import ocr_stats, shutdown_ocr_engines
+from .services import extraction_cache, pipeline, jobs, produit_writer
 
-# ⬇️ NOUVEL IMPORT
-from .services.nlp_client import call_nlp_and_lca
+setup_logging("parser")
 
 
 # Création tables au démarrage
 Base.metadata.create_all(bind=engine)
+# colonne next_attempt_at sur une table parse_jobs créée avant elle
+jobs.add_next_attempt_column(engine)
 
 app = FastAPI(title="ParserProduit-MS")
+app.add_middleware(TraceMiddleware)
+
+
+@app.on_event("startup")
+async def on_startup():
+    # workers des jobs /parse-and-nlp/jobs (+ reprise des jobs en attente)
+    jobs.start_job_workers()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await jobs.stop_job_workers()
+    shutdown_process_pool()
+    # attend les extractions en cours : elles utilisent les instances Tesseract libérées ensuite
+    shutdown_extraction_executor(wait=True)
+    shutdown_page_pool()
+    shutdown_ocr_engines()
+    await close_clients()
+    produit_writer.shutdown_produit_writer()
 
 
 # DB
@@ -28,32 +62,167 @@ def get_db():
         db.close()
 
 
+async def extract_and_parse_cached(db: Session, file_bytes: bytes, filename: str, content_type: str):
+    """pipeline.extract_and_parse_cached avec les erreurs traduites en HTTP."""
+    try:
+        return await pipeline.extract_and_parse_cached(db, file_bytes, filename, content_type)
+    except (UnsupportedFileError, EmptyTextError) as e:
+        raise HTTPException(400, str(e))
+    except ExecutorSaturated as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+
+
 @app.post("/parse", response_model=ProduitRawOut)
 async def parse_file(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
 ):
     file_bytes = await file.read()
-    content_type = file.content_type or ""
-    filename_lower = file.filename.lower()
-
-    if content_type == "application/pdf" or filename_lower.endswith(".pdf"):
-        text = extract_text_from_pdf(file_bytes)
-    elif content_type.startswith("image/") or filename_lower.endswith((".png", ".jpg", ".jpeg", ".webp")):
-        text = extract_text_from_image(file_bytes)
-    else:
-        raise HTTPException(400, "Fichier non supporté")
-
-    if not text.strip():
-        raise HTTPException(400, "Impossible d'extraire du texte")
-
-    produit_dict = parse_product_text(text=text, gtin="", source_file=file.filename)
-    produit = ProduitRaw(**produit_dict)
-    db.add(produit)
+
+    _, produit_dict, cache_status = await extract_and_parse_cached(db, file_bytes, file.filename, file.content_type)
+    produit = pipeline.save_produit(db, produit_dict)
+
+    return {**produit, "cache": cache_status}
+
+
+@app.get("/cache/stats")
+def get_cache_stats(db: Session = Depends(get_db)):
+    return extraction_cache.cache_stats(db)
+
+
+@app.get("/metrics/executor")
+def get_executor_metrics():
+    return get_extraction_executor().stats()
+
+
+@app.get("/metrics/writer")
+def get_writer_metrics():
+    return produit_writer.get_produit_writer().stats()
+
+
+@app.get("/metrics/clients")
+def get_client_metrics():
+    return clients_stats()
+
+
+@app.get("/metrics/stages")
+def get_stage_metrics():
+    return stage_stats()
+
+
+@app.get("/metrics/ocr")
+def get_ocr_metrics():
+    return ocr_stats()
+
+
+def _store_batch(db: Session, to_store: list, produits: List[dict]) -> list:
+    """Entrées du cache d'extraction + ProduitRaw du lot, validés en une transaction."""
+    for digest, text, produit in to_store:
+        extraction_cache.store(db, digest, text, produit, evict=False)
+    extraction_cache.maybe_evict(db)
+    inserted = produit_writer.insert_many(db, produits)
     db.commit()
-    db.refresh(produit)
+    return inserted
+
+
+@app.post("/parse/batch", response_model=BatchParseOut)
+async def parse_batch(
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+):
+    """
+    Import en lot : plusieurs fichiers (multipart) et/ou archives zip.
+    - extraction + parsing répartis sur un pool de processus
+    - insertion de tous les ProduitRaw dans une seule transaction
+    - statut par fichier + temps agrégés
+    """
+    t_start = time.perf_counter()
+
+    # 1) Lecture des uploads (les zip sont dépliés)
+    inputs = []
+    results: List[dict] = []
+    for upload in files:
+        file_bytes = await upload.read()
+        try:
+            inputs.extend(expand_upload(upload.filename, upload.content_type, file_bytes))
+        except zipfile.BadZipFile:
+            results.append({"filename": upload.filename, "status": "error", "error": "Archive zip invalide"})
+
+    if not inputs and not results:
+        raise HTTPException(400, "Aucun fichier fourni")
 
-    return produit
+    # 2) Cache par contenu : les fichiers déjà vus ne passent pas par le pool
+    digests = [extraction_cache.content_hash(data) for _, _, data in inputs]
+    # accès base dans le pool de threads : un gros lot ne bloque pas la boucle
+    cached = await run_in_threadpool(extraction_cache.lookup_many, db, digests)
+
+    to_extract = {}
+    for (name, ctype, data), digest in zip(inputs, digests):
+        if digest not in cached and digest not in to_extract:
+            to_extract[digest] = (name, ctype, data)
+
+    # 3) Extraction + parsing en parallèle (une seule fois par contenu)
+    extracted = dict(zip(to_extract, await run_batch(list(to_extract.values()))))
+
+    to_store = []
+    for (name, _, _), digest in zip(inputs, digests):
+        if digest in cached:
+            results.append({
+                "filename": name,
+                "status": "ok",
+                "produit": extraction_cache.cached_produit(cached[digest], name),
+                "cache": "hit",
+            })
+            continue
+
+        r = dict(extracted[digest], filename=name, cache="miss")
+        if r["status"] == "ok":
+            r["produit"] = dict(r["produit"], source_file=name)
+            if to_extract[digest][0] == name:
+                to_store.append((digest, r["text"], r["produit"]))
+        results.append(r)
+
+    # 4) Cache + insertion groupée (INSERT multi-lignes, une transaction) ; erreur par ligne
+    t_db = time.perf_counter()
+    to_insert = [r for r in results if r["status"] == "ok"]
+    inserted = await run_in_threadpool(_store_batch, db, to_store, [r["produit"] for r in to_insert])
+    for r, res in zip(to_insert, inserted):
+        if res.error:
+            r.update(status="error", error=f"Erreur base de données: {res.error}")
+        else:
+            r["produit_id"] = res.id
+    db_ms = (time.perf_counter() - t_db) * 1000
+    ok_results = [r for r in results if r["status"] == "ok"]
+
+    total_ms = (time.perf_counter() - t_start) * 1000
+    items = []
+    for r in results:
+        produit = r.get("produit") or {}
+        items.append(BatchItemOut(
+            filename=r["filename"],
+            status=r["status"],
+            produit_id=r.get("produit_id"),
+            gtin=produit.get("gtin"),
+            nom=produit.get("nom"),
+            error=r.get("error"),
+            cache=r.get("cache"),
+            extract_ms=r.get("extract_ms", 0.0),
+            parse_ms=r.get("parse_ms", 0.0),
+        ))
+
+    return BatchParseOut(
+        total=len(items),
+        succeeded=len(ok_results),
+        failed=len(items) - len(ok_results),
+        timings={
+            "total_ms": round(total_ms, 2),
+            "extract_ms": round(sum(i.extract_ms for i in items), 2),
+            "parse_ms": round(sum(i.parse_ms for i in items), 2),
+            "db_ms": round(db_ms, 2),
+            "files_per_s": round(len(items) / (total_ms / 1000), 2) if total_ms > 0 else 0.0,
+        },
+        results=items,
+    )
 
 
 @app.post("/parse-and-nlp")
@@ -63,39 +232,78 @@ async def parse_file_and_nlp(
 ):
     # Recyclage du /parse
     file_bytes = await file.read()
-    content_type = file.content_type or ""
-    filename_lower = file.filename.lower()
 
-    if content_type == "application/pdf" or filename_lower.endswith(".pdf"):
-        text = extract_text_from_pdf(file_bytes)
-    elif content_type.startswith("image/") or filename_lower.endswith((".png", ".jpg", ".jpeg", ".webp")):
-        text = extract_text_from_image(file_bytes)
-    else:
-        raise HTTPException(400, "Fichier non supporté")
-
-    if not text.strip():
-        raise HTTPException(400, "Impossible d'extraire du texte")
-
-    produit_dict = parse_product_text(text=text, gtin="", source_file=file.filename)
-
-    produit = ProduitRaw(**produit_dict)
-    db.add(produit)
-    db.commit()
-    db.refresh(produit)
+    text, produit_dict, cache_status = await extract_and_parse_cached(db, file_bytes, file.filename, file.content_type)
+    produit = pipeline.save_produit(db, produit_dict)
 
     # 🔥 ici on appelle MS2 → MS3
-    combined = call_nlp_and_lca(
-        product_id=str(produit.id),
-        text=text,
-    )
-
-    # Extraction propre
-    nlp_output = combined.get("nlp_output", {})
-    lca_output = combined.get("lca_result", {})
+    chain = await pipeline.call_nlp_chain(produit["id"], text)
 
     # Réponse enrichie
     return {
         "product": produit,
-        "nlp": nlp_output,
-        "lca": lca_output
+        "nlp": chain["nlp"],
+        "lca": chain["lca"],
+        "cache": cache_status,
     }
+
+
+@app.post("/parse-and-nlp/jobs", status_code=202, response_model=JobOut)
+async def create_parse_and_nlp_job(
+    response: Response,
+    file: UploadFile = File(...),
+    webhook_url: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Variante asynchrone de /parse-and-nlp : répond 202 avec l'id du job,
+    la chaîne est exécutée en arrière-plan. Résultat : GET /jobs/{job_id}
+    (et POST sur webhook_url à la fin, si fourni).
+    """
+    if webhook_url:
+        try:
+            await run_in_threadpool(jobs.check_webhook_url, webhook_url)
+        except jobs.InvalidWebhookURL as e:
+            raise HTTPException(400, str(e))
+
+    file_bytes = await file.read()
+    if not file_bytes:
+        raise HTTPException(400, "Fichier vide")
+
+    try:
+        job = await jobs.submit_job(db, file_bytes, file.filename, file.content_type, webhook_url)
+    except jobs.JobQueueFull as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "5"})
+
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job_out(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobOut)
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    job = jobs.get_job(db, job_id)
+    if job is None:
+        raise HTTPException(404, "Job introuvable")
+    return job_out(job)
+
+
+@app.get("/metrics/jobs")
+def get_job_metrics(db: Session = Depends(get_db)):
+    return jobs.job_stats(db)
+
+
+def job_out(job) -> JobOut:
+    return JobOut(
+        job_id=job.id,
+        status=job.status,
+        filename=job.filename,
+        attempts=job.attempts,
+        next_attempt_at=job.next_attempt_at,
+        produit_id=job.produit_id,
+        result=job.result,
+        error=job.error,
+        webhook_status=job.webhook_status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, LargeBinary, func
 from .database import Base
 
 class ProduitRaw(Base):
@@ -19,3 +19,50 @@ class ProduitRaw(Base):
     labels_raw = Column(Text)
 
     source_file = Column(String(255))
+
+
+class ExtractionCache(Base):
+    """
+    Cache d'extraction adressé par contenu : SHA-256 du fichier uploadé (et de la
+    version d'extracteur) -> texte extrait + champs parsés (sans source_file).
+    """
+    __tablename__ = "extraction_cache"
+
+    sha256 = Column(String(64), primary_key=True)
+    text = Column(Text, nullable=False)
+    parsed = Column(JSON, nullable=False)
+    size_bytes = Column(Integer, nullable=False)     # texte + champs parsés (limite PARSER_CACHE_MAX_MB)
+    hits = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class ParseJob(Base):
+    """
+    Job asynchrone /parse-and-nlp/jobs : Parser -> NLP -> LCA -> Scoring.
+    status : pending -> running -> succeeded | failed
+    (erreur transitoire : running -> retry, repris à partir de next_attempt_at)
+    Le fichier (payload) est effacé une fois le job terminé.
+    """
+    __tablename__ = "parse_jobs"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)
+
+    filename = Column(String(255))
+    content_type = Column(String(100))
+    payload = Column(LargeBinary)
+
+    produit_id = Column(Integer)
+    result = Column(JSON)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True))
+
+    webhook_url = Column(String(1024))
+    webhook_status = Column(String(20))     # "sent" | "failed"
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
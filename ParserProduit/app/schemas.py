@@ -1,4 +1,6 @@
 # app/schemas.py
+from datetime import datetime
+from typing import Any, List, Optional, Dict
 from pydantic import BaseModel
 
 class ProduitRawOut(BaseModel):
@@ -12,6 +14,42 @@ class ProduitRawOut(BaseModel):
     origine_raw: str
     labels_raw: str
     source_file: str
+    cache: Optional[str] = None     # "hit" | "miss" (cache d'extraction)
 
     class Config:
         orm_mode = True
+
+
+class BatchItemOut(BaseModel):
+    filename: str
+    status: str                     # "ok" | "error"
+    produit_id: Optional[int] = None
+    gtin: Optional[str] = None
+    nom: Optional[str] = None
+    error: Optional[str] = None
+    cache: Optional[str] = None
+    extract_ms: float = 0.0
+    parse_ms: float = 0.0
+
+
+class BatchParseOut(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    timings: Dict[str, float]       # total_ms, extract_ms, parse_ms, db_ms, files_per_s
+    results: List[BatchItemOut]
+
+
+class JobOut(BaseModel):
+    job_id: str
+    status: str                     # "pending" | "running" | "retry" | "succeeded" | "failed"
+    filename: Optional[str] = None
+    attempts: int = 0
+    next_attempt_at: Optional[datetime] = None
+    produit_id: Optional[int] = None
+    result: Optional[Dict[str, Any]] = None     # même contenu que la réponse de /parse-and-nlp
+    error: Optional[str] = None
+    webhook_status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
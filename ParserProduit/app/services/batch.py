@@ -0,0 +1,116 @@
+# app/services/batch.py
+import asyncio
+import io
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..config import PARSER_BATCH_WORKERS, PARSER_BATCH_MAX_FILE_MB
+from .extraction import extract_product, UnsupportedFileError, EmptyTextError
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Pool de processus partagé par tous les appels /parse/batch.
+    Créé à la demande ("spawn" : pas de fork d'un process uvicorn multi-thread).
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=PARSER_BATCH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def is_zip_upload(filename: str, content_type: Optional[str]) -> bool:
+    return (content_type or "") in ZIP_CONTENT_TYPES or (filename or "").lower().endswith(".zip")
+
+
+def expand_upload(filename: str, content_type: Optional[str], file_bytes: bytes) -> List[Tuple[str, Optional[str], bytes]]:
+    """
+    Transforme un upload en liste (filename, content_type, bytes).
+    Une archive zip est dépliée : chaque membre devient un fichier du lot
+    (le type est alors déduit de l'extension).
+    """
+    if not is_zip_upload(filename, content_type):
+        return [(filename, content_type, file_bytes)]
+
+    max_bytes = PARSER_BATCH_MAX_FILE_MB * 1024 * 1024
+    files = []
+    with zipfile.ZipFile(io.BytesIO(file_bytes)) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or name.rsplit("/", 1)[-1].startswith("."):
+                continue
+            if info.file_size > max_bytes:
+                files.append((name, None, b""))
+                continue
+            files.append((name, None, archive.read(info)))
+    return files
+
+
+def extract_and_parse(file_bytes: bytes, filename: str, content_type: Optional[str]) -> Dict[str, Any]:
+    """
+    Tâche exécutée dans un processus du pool : extraction + parsing d'un fichier.
+    Ne lève jamais : les erreurs sont renvoyées dans le champ "error".
+    """
+    result: Dict[str, Any] = {
+        "filename": filename,
+        "status": "error",
+        "error": None,
+        "text": None,
+        "produit": None,
+        "extract_ms": 0.0,
+        "parse_ms": 0.0,
+    }
+
+    if not file_bytes:
+        result["error"] = "Fichier vide ou trop volumineux"
+        return result
+
+    timings: Dict[str, float] = {}
+    try:
+        text, produit_dict = extract_product(file_bytes, filename, content_type, timings)
+    except (UnsupportedFileError, EmptyTextError) as e:
+        result["error"] = str(e)
+        return result
+    except Exception as e:
+        result["error"] = f"Erreur d'extraction: {e}"
+        return result
+    finally:
+        result.update(timings)
+
+    result["text"] = text
+    result["produit"] = produit_dict
+    result["status"] = "ok"
+    return result
+
+
+async def run_batch(files: List[Tuple[str, Optional[str], bytes]]) -> List[Dict[str, Any]]:
+    """
+    Répartit l'extraction sur le pool de processus.
+    Le nombre de tâches en vol est borné (2 x workers) pour ne pas sérialiser
+    tout le lot d'un coup vers les processus.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    semaphore = asyncio.Semaphore(PARSER_BATCH_WORKERS * 2)
+
+    async def _one(filename: str, content_type: Optional[str], file_bytes: bytes) -> Dict[str, Any]:
+        async with semaphore:
+            return await loop.run_in_executor(pool, extract_and_parse, file_bytes, filename, content_type)
+
+    return await asyncio.gather(*(_one(name, ctype, data) for name, ctype, data in files))
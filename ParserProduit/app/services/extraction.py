@@ -0,0 +1,87 @@
+# app/services/extraction.py
+import time
+from typing import Optional, Tuple, Dict, Any
+
+from ..config import PARSER_PDF_STREAMING, PARSER_PDF_PAGE_WORKERS
+from .pdf_extractor import extract_text_from_pdf, iter_pdf_pages
+from .ocr_extractor import extract_text_from_image
+from .parser_logic import parse_product_text, parse_product_text_stream
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+# Version de l'extraction + du parsing, incluse dans la clé du cache d'extraction :
+# à incrémenter à chaque changement qui modifie le texte ou les champs produits.
+EXTRACTOR_VERSION = "4"
+
+
+class UnsupportedFileError(ValueError):
+    """Type de fichier non pris en charge (ni PDF, ni image)."""
+
+
+class EmptyTextError(ValueError):
+    """Aucun texte exploitable n'a pu être extrait du fichier."""
+
+
+def detect_file_kind(filename: str, content_type: Optional[str]) -> Optional[str]:
+    """
+    Retourne "pdf", "image" ou None selon le content-type et l'extension.
+    """
+    content_type = content_type or ""
+    filename_lower = (filename or "").lower()
+
+    if content_type == "application/pdf" or filename_lower.endswith(".pdf"):
+        return "pdf"
+    if content_type.startswith("image/") or filename_lower.endswith(IMAGE_EXTENSIONS):
+        return "image"
+    return None
+
+
+def extract_text(file_bytes: bytes, filename: str, content_type: Optional[str]) -> str:
+    """
+    Extrait le texte brut d'un PDF (pdfplumber) ou d'une image (Tesseract).
+    Lève UnsupportedFileError si le type n'est pas reconnu.
+    """
+    kind = detect_file_kind(filename, content_type)
+    if kind == "pdf":
+        return extract_text_from_pdf(file_bytes)
+    if kind == "image":
+        return extract_text_from_image(file_bytes)
+    raise UnsupportedFileError("Fichier non supporté")
+
+
+def extract_product(
+    file_bytes: bytes,
+    filename: str,
+    content_type: Optional[str],
+    timings: Optional[Dict[str, float]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Extraction + parsing d'un fichier (travail CPU, à exécuter hors de la boucle asyncio).
+    Retourne (texte brut, champs ProduitRaw).
+    Les PDF sont lus page par page (arrêt anticipé) si PARSER_PDF_STREAMING est actif :
+    le texte renvoyé s'arrête alors à la page où les champs utiles sont complets.
+    `timings` (optionnel) reçoit extract_ms / parse_ms.
+    """
+    t0 = time.perf_counter()
+
+    if PARSER_PDF_STREAMING and detect_file_kind(filename, content_type) == "pdf":
+        pages = iter_pdf_pages(file_bytes, workers=PARSER_PDF_PAGE_WORKERS)
+        text, produit_dict = parse_product_text_stream(pages, gtin="", source_file=filename)
+        if not text.strip():
+            raise EmptyTextError("Impossible d'extraire du texte")
+        if timings is not None:
+            # extraction et parsing sont entrelacés : tout est compté en extraction
+            timings["extract_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            timings["parse_ms"] = 0.0
+        return text, produit_dict
+
+    text = extract_text(file_bytes, filename, content_type)
+    t1 = time.perf_counter()
+    if not text.strip():
+        raise EmptyTextError("Impossible d'extraire du texte")
+
+    produit_dict = parse_product_text(text=text, gtin="", source_file=filename)
+    if timings is not None:
+        timings["extract_ms"] = round((t1 - t0) * 1000, 2)
+        timings["parse_ms"] = round((time.perf_counter() - t1) * 1000, 2)
+    return text, produit_dict
@@ -0,0 +1,179 @@
+# app/services/extraction_cache.py
+import hashlib
+import json
+import threading
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import func, select, delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..config import (
+    PARSER_CACHE_MAX_MB,
+    PARSER_PDF_STREAMING,
+    OCR_LANG,
+    OCR_ENGINE,
+    OCR_PSM,
+    OCR_PREPROCESS,
+    OCR_TARGET_DPI,
+    OCR_MAX_SIDE_PX,
+    OCR_DESKEW,
+    OCR_DESKEW_MAX_ANGLE,
+    OCR_BINARIZE,
+)
+from ..models import ExtractionCache
+from .extraction import EXTRACTOR_VERSION
+
+# Réglages qui changent le résultat de l'extraction : une entrée n'est servie
+# qu'avec la même version d'extracteur et les mêmes réglages
+_KEY_SETTINGS = (
+    EXTRACTOR_VERSION,
+    int(PARSER_PDF_STREAMING),
+    OCR_LANG,
+    OCR_ENGINE,
+    OCR_PSM,
+    int(OCR_PREPROCESS),
+    OCR_TARGET_DPI,
+    OCR_MAX_SIDE_PX,
+    int(OCR_DESKEW),
+    OCR_DESKEW_MAX_ANGLE,
+    int(OCR_BINARIZE),
+)
+_KEY_PREFIX = ("|".join(str(v) for v in _KEY_SETTINGS) + "\0").encode()
+
+_MAX_BYTES = int(PARSER_CACHE_MAX_MB * 1024 * 1024)
+# éviction : une fois tous les N enregistrements (somme des tailles sur toute la table)
+_EVICT_EVERY = 100
+
+# Compteurs du process (un par worker uvicorn)
+_counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_stores_since_evict = 0
+_lock = threading.Lock()
+
+
+def _incr(name: str, n: int = 1) -> None:
+    global _stores_since_evict
+    with _lock:
+        _counters[name] += n
+        if name == "stores":
+            _stores_since_evict += n
+
+
+def content_hash(file_bytes: bytes) -> str:
+    """Clé du cache : SHA-256 du fichier, préfixé de la version d'extracteur et des réglages."""
+    return hashlib.sha256(_KEY_PREFIX + file_bytes).hexdigest()
+
+
+def lookup(db: Session, digest: str) -> Optional[ExtractionCache]:
+    """
+    Cherche une extraction déjà faite pour ce contenu.
+    Un hit rafraîchit last_used_at (ordre LRU) et incrémente le compteur de hits.
+    """
+    entry = db.get(ExtractionCache, digest)
+    if entry is None:
+        _incr("misses")
+        return None
+
+    db.execute(
+        update(ExtractionCache)
+        .where(ExtractionCache.sha256 == digest)
+        .values(hits=ExtractionCache.hits + 1, last_used_at=func.now())
+    )
+    _incr("hits")
+    return entry
+
+
+def lookup_many(db: Session, digests: List[str]) -> Dict[str, ExtractionCache]:
+    """Version groupée de lookup() (une requête pour tout un lot)."""
+    unique = list(set(digests))
+    if not unique:
+        return {}
+
+    entries = db.scalars(select(ExtractionCache).where(ExtractionCache.sha256.in_(unique))).all()
+    found = {e.sha256: e for e in entries}
+    if found:
+        db.execute(
+            update(ExtractionCache)
+            .where(ExtractionCache.sha256.in_(list(found)))
+            .values(hits=ExtractionCache.hits + 1, last_used_at=func.now())
+        )
+
+    hits = sum(1 for d in digests if d in found)
+    _incr("hits", hits)
+    _incr("misses", len(digests) - hits)
+    return found
+
+
+def cached_produit(entry: ExtractionCache, source_file: str) -> Dict[str, Any]:
+    """Champs ProduitRaw à partir d'une entrée du cache (source_file = upload courant)."""
+    return {**entry.parsed, "source_file": source_file}
+
+
+def store(
+    db: Session,
+    digest: str,
+    text: str,
+    produit_dict: Dict[str, Any],
+    evict: bool = True,
+) -> None:
+    """
+    Enregistre une extraction (sans commit : suit la transaction de l'appelant).
+    ON CONFLICT DO NOTHING : deux uploads identiques simultanés ne se gênent pas.
+    size_bytes = taille stockée (texte + champs parsés), base de la limite PARSER_CACHE_MAX_MB.
+    evict=False permet de n'évincer qu'une fois à la fin d'un lot (voir maybe_evict()).
+    """
+    parsed = {k: v for k, v in produit_dict.items() if k != "source_file"}
+    size_bytes = len(text.encode("utf-8")) + len(json.dumps(parsed, ensure_ascii=False).encode("utf-8"))
+    db.execute(
+        insert(ExtractionCache)
+        .values(sha256=digest, text=text, parsed=parsed, size_bytes=size_bytes, hits=0)
+        .on_conflict_do_nothing(index_elements=[ExtractionCache.sha256])
+    )
+    _incr("stores")
+    if evict:
+        maybe_evict(db)
+
+
+def maybe_evict(db: Session) -> None:
+    """Lance evict_lru() si au moins _EVICT_EVERY entrées ont été ajoutées depuis la dernière éviction."""
+    global _stores_since_evict
+    with _lock:
+        if _stores_since_evict < _EVICT_EVERY:
+            return
+        _stores_since_evict = 0
+    evict_lru(db)
+
+
+def evict_lru(db: Session) -> None:
+    """
+    Éviction LRU : garde les entrées les plus récemment utilisées tant que leur
+    taille cumulée reste sous PARSER_CACHE_MAX_MB, supprime les autres.
+    """
+    kept_bytes = (
+        func.sum(ExtractionCache.size_bytes)
+        .over(order_by=(ExtractionCache.last_used_at.desc(), ExtractionCache.sha256))
+        .label("kept_bytes")
+    )
+    ranked = select(ExtractionCache.sha256, kept_bytes).subquery()
+    res = db.execute(
+        delete(ExtractionCache)
+        .where(ExtractionCache.sha256.in_(select(ranked.c.sha256).where(ranked.c.kept_bytes > _MAX_BYTES)))
+    )
+    if res.rowcount:
+        _incr("evictions", res.rowcount)
+
+
+def cache_stats(db: Session) -> Dict[str, Any]:
+    with _lock:
+        counters = dict(_counters)
+    lookups = counters["hits"] + counters["misses"]
+    entries, size_bytes = db.execute(
+        select(func.count(), func.sum(ExtractionCache.size_bytes)).select_from(ExtractionCache)
+    ).one()
+    return {
+        **counters,
+        "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        "entries": entries or 0,
+        "size_mb": round((size_bytes or 0) / (1024 * 1024), 2),
+        "max_mb": PARSER_CACHE_MAX_MB,
+    }
@@ -0,0 +1,137 @@
+# app/services/extraction_executor.py
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ..config import PARSER_EXTRACT_WORKERS, PARSER_EXTRACT_QUEUE_DEPTH
+
+
+class ExecutorSaturated(RuntimeError):
+    """Trop de requêtes en attente d'extraction : le client doit réessayer plus tard."""
+
+
+class _DurationStats:
+    """Compteurs de durées (ms) + fenêtre glissante pour les percentiles."""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self._recent.append(ms)
+
+    def snapshot(self) -> Dict[str, float]:
+        recent = sorted(self._recent)
+
+        def pct(p: float) -> float:
+            if not recent:
+                return 0.0
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))], 2)
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class ExtractionExecutor:
+    """
+    Pool de threads borné pour le travail CPU (pdfplumber, Tesseract, parsing).
+    - max_workers tâches en exécution, queue_depth tâches en attente au maximum
+    - au-delà : ExecutorSaturated (-> HTTP 503) plutôt qu'une file sans fin
+    - métriques : temps d'attente en file et temps d'exécution
+    """
+
+    def __init__(self, max_workers: int, queue_depth: int):
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._failed = 0
+        self._queue_wait = _DurationStats()
+        self._execution = _DurationStats()
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.queue_depth:
+                self._rejected += 1
+                raise ExecutorSaturated("Service saturé, réessayez plus tard")
+            self._in_flight += 1
+
+        submitted = time.perf_counter()
+
+        def _task() -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            except Exception:
+                with self._lock:
+                    self._failed += 1
+                raise
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._queue_wait.record((started - submitted) * 1000)
+                    self._execution.record((finished - started) * 1000)
+
+        def _done(_future) -> None:
+            # à la fin réelle de la tâche (ou à son annulation en file), pas à celle de
+            # l'appelant : une requête annulée laisse tourner son thread, qui compte toujours
+            with self._lock:
+                self._in_flight -= 1
+
+        try:
+            future = self._pool.submit(_task)
+        except BaseException:
+            _done(None)
+            raise
+        future.add_done_callback(_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self.queue_depth,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.max_workers),
+                "rejected": self._rejected,
+                "failed": self._failed,
+                "queue_wait": self._queue_wait.snapshot(),
+                "execution": self._execution.snapshot(),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Annule les tâches en file ; wait=True attend la fin de celles en cours."""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor: Optional[ExtractionExecutor] = None
+
+
+def get_extraction_executor() -> ExtractionExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ExtractionExecutor(PARSER_EXTRACT_WORKERS, PARSER_EXTRACT_QUEUE_DEPTH)
+    return _executor
+
+
+def shutdown_extraction_executor(wait: bool = False) -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
@@ -0,0 +1,148 @@
+# app/services/image_preprocess.py
+"""
+Prétraitement des images avant OCR (Pillow uniquement) :
+- décodage JPEG directement à taille réduite et en niveaux de gris (draft)
+- orientation EXIF, transparence -> fond blanc
+- normalisation de la résolution (scans remis à OCR_TARGET_DPI)
+  et réduction des photos trop grandes (OCR_MAX_SIDE_PX)
+- redressement (projection horizontale sur une miniature)
+- contraste automatique + binarisation (seuil d'Otsu)
+"""
+import io
+from typing import List, Tuple
+
+from PIL import Image, ImageOps
+
+from ..config import (
+    OCR_TARGET_DPI,
+    OCR_MAX_SIDE_PX,
+    OCR_DESKEW,
+    OCR_DESKEW_MAX_ANGLE,
+    OCR_BINARIZE,
+)
+
+# Miniature utilisée pour estimer l'inclinaison (recherche par pas de 1°, puis 0,25°)
+_DESKEW_WIDTH = 500
+_DESKEW_COARSE_STEP = 1.0
+_DESKEW_FINE_STEP = 0.25
+# En dessous, la rotation n'apporte rien à Tesseract
+_DESKEW_MIN_ANGLE = 0.3
+# Agrandissement max d'un scan basse résolution
+_MAX_UPSCALE = 2.0
+
+
+def _source_dpi(image: Image.Image) -> float:
+    """
+    Résolution déclarée par le fichier, ou 0 si absente / non fiable.
+    72 et 96 dpi sont les valeurs par défaut des appareils photo et captures
+    d'écran : elles ne décrivent pas la taille réelle du texte.
+    """
+    dpi = image.info.get("dpi")
+    try:
+        value = float(dpi[0])
+    except (TypeError, ValueError, IndexError):
+        return 0.0
+    return value if 100 <= value <= 1200 else 0.0
+
+
+def _scale_for(size: Tuple[int, int], dpi: float) -> float:
+    scale = min(OCR_TARGET_DPI / dpi, _MAX_UPSCALE) if dpi else 1.0
+    return min(scale, OCR_MAX_SIDE_PX / max(size))
+
+
+def _to_grayscale(image: Image.Image) -> Image.Image:
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, rgba)
+    return image.convert("L") if image.mode != "L" else image
+
+
+def estimate_skew(image: Image.Image) -> float:
+    """
+    Angle (degrés, sens trigonométrique de Image.rotate) qui remet les lignes
+    de texte à l'horizontale. On garde l'angle qui maximise le contraste entre
+    lignes de texte et interlignes (profil de projection horizontale).
+    """
+    w, h = image.size
+    if w > _DESKEW_WIDTH:
+        image = image.resize((_DESKEW_WIDTH, max(1, h * _DESKEW_WIDTH // w)), Image.BILINEAR)
+    # encre = valeurs élevées, fond = 0 (le remplissage de la rotation reste neutre)
+    ink = ImageOps.invert(image).convert("F")
+
+    def score(angle: float) -> float:
+        rotated = ink.rotate(angle, resample=Image.BILINEAR, fillcolor=0)
+        # redimensionner à 1 pixel de large = moyenne de chaque ligne (en C)
+        profile = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        return sum((b - a) ** 2 for a, b in zip(profile, profile[1:]))
+
+    steps = int(OCR_DESKEW_MAX_ANGLE / _DESKEW_COARSE_STEP)
+    best = max((i * _DESKEW_COARSE_STEP for i in range(-steps, steps + 1)), key=score)
+    fine = [best + k * _DESKEW_FINE_STEP for k in (-2, -1, 1, 2)]
+    fine = [a for a in fine if abs(a) <= OCR_DESKEW_MAX_ANGLE]
+    return max([best] + fine, key=score)
+
+
+def otsu_threshold(histogram: List[int]) -> int:
+    """Seuil d'Otsu sur un histogramme 256 niveaux."""
+    total = sum(histogram)
+    if not total:
+        return 127
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+
+    best_t, best_var = 127, -1.0
+    weight_bg = 0
+    sum_bg = 0.0
+    for t in range(256):
+        weight_bg += histogram[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * histogram[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best_t, best_var = t, var
+    return best_t
+
+
+def binarize(image: Image.Image) -> Image.Image:
+    image = ImageOps.autocontrast(image, cutoff=1)
+    t = otsu_threshold(image.histogram())
+    return image.point([0] * (t + 1) + [255] * (255 - t))
+
+
+def prepare_for_ocr(file_bytes: bytes) -> Tuple[Image.Image, int]:
+    """
+    Retourne (image prête pour Tesseract, résolution à lui indiquer en dpi).
+    """
+    image = Image.open(io.BytesIO(file_bytes))
+    dpi = _source_dpi(image)
+    scale = _scale_for(image.size, dpi)
+
+    if image.format == "JPEG" and scale < 1:
+        # le décodeur JPEG réduit directement (1/2, 1/4, 1/8) : moins de mémoire et de temps
+        w, h = image.size
+        image.draft("L", (max(1, int(w * scale)), max(1, int(h * scale))))
+        scale = scale * w / image.size[0]
+        dpi = dpi * image.size[0] / w
+
+    image = _to_grayscale(ImageOps.exif_transpose(image))
+
+    if abs(scale - 1) > 0.01:
+        w, h = image.size
+        image = image.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.LANCZOS, reducing_gap=3.0)
+        dpi = dpi * scale
+
+    if OCR_DESKEW:
+        angle = estimate_skew(image)
+        if abs(angle) >= _DESKEW_MIN_ANGLE:
+            image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+    if OCR_BINARIZE:
+        image = binarize(image)
+
+    return image, round(dpi) if dpi else OCR_TARGET_DPI
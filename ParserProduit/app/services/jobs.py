@@ -0,0 +1,413 @@
+# app/services/jobs.py
+"""
+Jobs asynchrones pour la chaîne /parse-and-nlp.
+
+- POST /parse-and-nlp/jobs enregistre le fichier dans parse_jobs (status "pending")
+  et renvoie 202 tout de suite
+- des workers asyncio (PARSER_JOB_WORKERS) exécutent la chaîne
+  Parser -> NLP -> LCA -> Scoring et enregistrent le résultat
+- un job est réservé par un UPDATE ... WHERE status = 'pending' : plusieurs
+  instances peuvent partager la table sans exécuter deux fois le même job
+- erreur transitoire : le job passe en "retry" avec next_attempt_at (backoff
+  exponentiel) et n'est réservable qu'à partir de cette date
+- la table est scrutée régulièrement : jobs d'une autre instance, jobs restés
+  "running" après un arrêt brutal, nouvelles tentatives arrivées à échéance
+- webhook optionnel appelé à la fin du job : l'URL doit viser un hôte public
+  (ou un hôte de PARSER_JOB_WEBHOOK_ALLOWED_HOSTS), sans suivre les redirections
+"""
+import asyncio
+import ipaddress
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func, inspect, or_, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ecolabel_common.service_client import CircuitOpenError, get_client
+from ecolabel_common.telemetry import get_logger, trace
+
+from ..config import (
+    PARSER_JOB_WORKERS,
+    PARSER_JOB_MAX_PENDING,
+    PARSER_JOB_MAX_ATTEMPTS,
+    PARSER_JOB_POLL_S,
+    PARSER_JOB_STALE_S,
+    PARSER_JOB_WEBHOOK_TIMEOUT_S,
+    PARSER_JOB_WEBHOOK_RETRIES,
+    PARSER_JOB_WEBHOOK_ALLOWED_HOSTS,
+)
+from ..database import SessionLocal
+from ..models import ParseJob, ProduitRaw
+from . import pipeline
+from .extraction import UnsupportedFileError, EmptyTextError
+from .extraction_executor import ExecutorSaturated
+from .produit_writer import get_produit_writer
+
+log = get_logger("jobs")
+
+
+class JobQueueFull(RuntimeError):
+    """Trop de jobs en attente : le client doit réessayer plus tard."""
+
+
+class ProduitWriteError(RuntimeError):
+    """Le ProduitRaw n'a pas pu être inséré."""
+
+
+class InvalidWebhookURL(ValueError):
+    """webhook_url refusée (schéma, hôte interne ou hors liste autorisée)."""
+
+
+_queue: Optional[asyncio.Queue] = None
+_queued: Set[str] = set()
+_tasks: List[asyncio.Task] = []
+
+
+def add_next_attempt_column(engine: Engine) -> None:
+    """Ajoute next_attempt_at à une table parse_jobs existante (create_all ne modifie pas une table)."""
+    existing = inspect(engine)
+    if not existing.has_table("parse_jobs"):
+        return
+    if "next_attempt_at" in {c["name"] for c in existing.get_columns("parse_jobs")}:
+        return
+    # IF NOT EXISTS : plusieurs workers peuvent arriver ici en même temps (PostgreSQL)
+    if_not_exists = "IF NOT EXISTS " if engine.dialect.name == "postgresql" else ""
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE parse_jobs ADD COLUMN {if_not_exists}next_attempt_at TIMESTAMP WITH TIME ZONE"))
+    log.info("Colonne next_attempt_at ajoutée à parse_jobs")
+
+
+def _claimable(now: datetime):
+    """Jobs réservables : en attente, ou à retenter dont l'échéance est passée."""
+    return or_(
+        ParseJob.status == "pending",
+        and_(ParseJob.status == "retry", ParseJob.next_attempt_at <= now),
+    )
+
+
+def create_job(
+    db: Session,
+    file_bytes: bytes,
+    filename: str,
+    content_type: Optional[str],
+    webhook_url: Optional[str] = None,
+) -> ParseJob:
+    pending = db.scalar(select(func.count()).select_from(ParseJob).where(ParseJob.status == "pending"))
+    if pending >= PARSER_JOB_MAX_PENDING:
+        raise JobQueueFull("Trop de jobs en attente, réessayez plus tard")
+
+    job = ParseJob(
+        id=uuid.uuid4().hex,
+        status="pending",
+        filename=filename,
+        content_type=content_type,
+        payload=file_bytes,
+        webhook_url=webhook_url,
+        attempts=0,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+async def submit_job(
+    db: Session,
+    file_bytes: bytes,
+    filename: str,
+    content_type: Optional[str],
+    webhook_url: Optional[str] = None,
+) -> ParseJob:
+    """create_job() dans le pool de threads (COUNT + INSERT du fichier), puis mise en file locale."""
+    job = await run_in_threadpool(create_job, db, file_bytes, filename, content_type, webhook_url)
+    # la file asyncio n'est pas thread-safe : mise en file depuis la boucle
+    _enqueue(job.id)
+    return job
+
+
+def check_webhook_url(url: str) -> None:
+    """
+    Refuse les webhooks vers le réseau interne (SSRF) : l'hôte doit figurer dans
+    PARSER_JOB_WEBHOOK_ALLOWED_HOSTS si la liste est définie, sinon toutes ses
+    adresses résolues doivent être publiques. Bloquant (résolution DNS).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise InvalidWebhookURL("webhook_url doit être une URL http(s)")
+    host = parts.hostname.lower()
+
+    if PARSER_JOB_WEBHOOK_ALLOWED_HOSTS:
+        if host not in PARSER_JOB_WEBHOOK_ALLOWED_HOSTS:
+            raise InvalidWebhookURL(f"Hôte de webhook non autorisé : {host}")
+        return
+
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (ValueError, OSError):
+        raise InvalidWebhookURL(f"Hôte de webhook introuvable : {host}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise InvalidWebhookURL(f"Hôte de webhook interne refusé : {host}")
+
+
+def get_job(db: Session, job_id: str) -> Optional[ParseJob]:
+    return db.get(ParseJob, job_id)
+
+
+def _enqueue(job_id: str) -> None:
+    # sans workers dans ce process, le job sera pris par la scrutation d'une autre instance
+    if _queue is not None and job_id not in _queued:
+        _queued.add(job_id)
+        _queue.put_nowait(job_id)
+
+
+def _claim(db: Session, job_id: str) -> Optional[ParseJob]:
+    """Réserve le job (pending|retry -> running) ; None s'il est déjà pris, terminé ou pas encore à échéance."""
+    res = db.execute(
+        update(ParseJob)
+        .where(ParseJob.id == job_id, _claimable(datetime.now(timezone.utc)))
+        .values(status="running", started_at=func.now(), attempts=ParseJob.attempts + 1)
+    )
+    db.commit()
+    if res.rowcount != 1:
+        return None
+    return db.get(ParseJob, job_id)
+
+
+def _reuse_produit(db: Session, produit_id: Optional[int]) -> Optional[Dict[str, Any]]:
+    produit = db.get(ProduitRaw, produit_id) if produit_id else None
+    return pipeline.produit_to_dict(produit) if produit is not None else None
+
+
+def _set_produit(db: Session, job: ParseJob, produit_id: int) -> None:
+    # valide aussi l'entrée du cache d'extraction ajoutée à la transaction
+    job.produit_id = produit_id
+    db.commit()
+
+
+async def _execute(db: Session, job: ParseJob) -> Dict[str, Any]:
+    while True:
+        try:
+            text, produit_dict, cache_status = await pipeline.extract_and_parse_cached(
+                db, job.payload, job.filename, job.content_type
+            )
+            break
+        except ExecutorSaturated:
+            # les requêtes synchrones passent d'abord : on patiente
+            await asyncio.sleep(1)
+
+    # nouvelle tentative : le ProduitRaw a déjà été créé, on le réutilise
+    product = await run_in_threadpool(_reuse_produit, db, job.produit_id)
+    if product is None:
+        # écriture groupée avec les autres jobs en cours (un INSERT + un commit par flush)
+        inserted = await get_produit_writer().write(produit_dict)
+        if inserted.error:
+            raise ProduitWriteError(inserted.error)
+        product = {"id": inserted.id, **produit_dict}
+    await run_in_threadpool(_set_produit, db, job, product["id"])
+
+    chain = await pipeline.call_nlp_chain(product["id"], text)
+    return {
+        "product": product,
+        "nlp": chain["nlp"],
+        "lca": chain["lca"],
+        "cache": cache_status,
+    }
+
+
+def _finish(db: Session, job: ParseJob, status: str, result: Any = None, error: Optional[str] = None) -> None:
+    job.status = status
+    job.result = result
+    job.error = error
+    job.payload = None
+    job.finished_at = func.now()
+    db.commit()
+
+
+def _record_failure(db: Session, job: ParseJob, e: Exception) -> Optional[float]:
+    """Enregistre l'échec du job ; renvoie le délai avant nouvelle tentative, ou None si le job est terminé."""
+    db.rollback()
+    db.refresh(job)
+    if isinstance(e, (UnsupportedFileError, EmptyTextError)):
+        _finish(db, job, "failed", error=str(e))
+    elif isinstance(e, ProduitWriteError):
+        _finish(db, job, "failed", error=f"Erreur base de données: {e}")
+    elif isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+        # 4xx : la requête elle-même est refusée, une nouvelle tentative n'y changera rien
+        _finish(db, job, "failed", error=f"Erreur NLP/LCA: {e}")
+    elif isinstance(e, (httpx.HTTPError, CircuitOpenError)):
+        if job.attempts < PARSER_JOB_MAX_ATTEMPTS:
+            delay = 2 ** job.attempts
+            job.status = "retry"
+            job.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            job.error = f"Tentative {job.attempts} : {e}"
+            db.commit()
+            return delay
+        _finish(db, job, "failed", error=f"Erreur NLP/LCA: {e}")
+    else:
+        _finish(db, job, "failed", error=f"Erreur interne: {e}")
+    return None
+
+
+def _requeue(db: Session, job: ParseJob) -> None:
+    db.rollback()
+    job.status = "pending"
+    db.commit()
+
+
+def _retry_later(job_id: str, delay: float) -> None:
+    # simple réveil : _claim refuse le job tant que next_attempt_at n'est pas atteint
+    asyncio.get_running_loop().call_later(delay, _enqueue, job_id)
+
+
+async def _run_job(job_id: str) -> None:
+    # accès base dans le pool de threads : la boucle reste aux requêtes HTTP.
+    # expire_on_commit=False : lire job.* après un commit ne relance pas de SELECT sur la boucle
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        job = await run_in_threadpool(_claim, db, job_id)
+        if job is None:
+            return
+
+        try:
+            result = await _execute(db, job)
+        except asyncio.CancelledError:
+            # arrêt du service : le job repart en attente
+            _requeue(db, job)
+            raise
+        except Exception as e:
+            delay = await run_in_threadpool(_record_failure, db, job, e)
+            if delay is not None:
+                _retry_later(job.id, delay)
+                return
+        else:
+            await run_in_threadpool(_finish, db, job, "succeeded", result)
+
+        if job.webhook_url:
+            await _notify(db, job)
+    finally:
+        db.close()
+
+
+def _set_webhook_status(db: Session, job: ParseJob, sent: bool) -> None:
+    job.webhook_status = "sent" if sent else "failed"
+    db.commit()
+
+
+async def _notify(db: Session, job: ParseJob) -> None:
+    payload = {
+        "job_id": job.id,
+        "status": job.status,
+        "produit_id": job.produit_id,
+        "result": job.result,
+        "error": job.error,
+    }
+    # non idempotent : seule une connexion refusée est retentée (le POST n'est pas parti).
+    # Idempotency-Key permet malgré tout au destinataire de dédoublonner sur job_id.
+    webhook_client = get_client(
+        "webhook",
+        timeout=PARSER_JOB_WEBHOOK_TIMEOUT_S,
+        retries=PARSER_JOB_WEBHOOK_RETRIES,
+    )
+    try:
+        # revérifiée à l'envoi : l'hôte a pu changer d'adresse depuis la soumission
+        await run_in_threadpool(check_webhook_url, job.webhook_url)
+        response = await webhook_client.request(
+            "POST",
+            job.webhook_url,
+            idempotent=False,
+            follow_redirects=False,
+            headers={"Idempotency-Key": job.id},
+            json=payload,
+        )
+        sent = response.status_code < 300
+    except (httpx.HTTPError, CircuitOpenError, InvalidWebhookURL):
+        sent = False
+    await run_in_threadpool(_set_webhook_status, db, job, sent)
+
+
+def _pending_from_db() -> List[str]:
+    """Relance les jobs abandonnés et renvoie les plus anciens jobs réservables."""
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        stale = now - timedelta(seconds=PARSER_JOB_STALE_S)
+        abandoned = (ParseJob.status == "running", ParseJob.started_at < stale)
+        db.execute(
+            update(ParseJob)
+            .where(*abandoned, ParseJob.attempts >= PARSER_JOB_MAX_ATTEMPTS)
+            .values(status="failed", error="Job abandonné (délai dépassé)", payload=None, finished_at=func.now())
+        )
+        db.execute(update(ParseJob).where(*abandoned).values(status="pending"))
+        db.commit()
+
+        return list(db.scalars(
+            select(ParseJob.id)
+            .where(_claimable(now))
+            .order_by(ParseJob.created_at)
+            .limit(PARSER_JOB_WORKERS * 4)
+        ))
+    finally:
+        db.close()
+
+
+async def _worker() -> None:
+    while True:
+        job_id = await _queue.get()
+        _queued.discard(job_id)
+        try:
+            with trace("job", job_id=job_id):
+                await _run_job(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning(f"Job {job_id} : {e}")
+        finally:
+            _queue.task_done()
+
+
+async def _poller() -> None:
+    while True:
+        try:
+            for job_id in await run_in_threadpool(_pending_from_db):
+                _enqueue(job_id)
+        except Exception as e:
+            log.warning(f"Scrutation des jobs : {e}")
+        await asyncio.sleep(PARSER_JOB_POLL_S)
+
+
+def start_job_workers() -> None:
+    """À appeler au démarrage (boucle asyncio en cours)."""
+    global _queue
+    if _queue is not None or PARSER_JOB_WORKERS <= 0:
+        return
+    _queue = asyncio.Queue()
+    _tasks.extend(asyncio.create_task(_worker()) for _ in range(PARSER_JOB_WORKERS))
+    _tasks.append(asyncio.create_task(_poller()))
+
+
+async def stop_job_workers() -> None:
+    global _queue
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    _queued.clear()
+    _queue = None
+
+
+def job_stats(db: Session) -> Dict[str, Any]:
+    rows = db.execute(select(ParseJob.status, func.count()).group_by(ParseJob.status)).all()
+    return {
+        "workers": PARSER_JOB_WORKERS if _queue is not None else 0,
+        "queued_in_process": _queue.qsize() if _queue is not None else 0,
+        "by_status": {status: count for status, count in rows},
+    }
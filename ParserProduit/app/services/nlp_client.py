@@ -1,6 +1,6 @@
-# app/services/nlp_client.py
 import os
-import requests
+
+from ecolabel_common.service_client import get_client
 
 # MS2 tourne sur 8001
 NLP_SERVICE_URL = os.getenv(
@@ -8,8 +8,11 @@ NLP_SERVICE_URL = os.getenv(
     "http://localhost:8001/nlp/extract-and-lca"
 )
 
+# Pool de connexions gardé pendant la vie de l'application
+_client = get_client("nlp", timeout=30.0)
+
 
-def call_nlp_and_lca(product_id: str, text: str) -> dict:
+async def call_nlp_and_lca(product_id: str, text: str) -> dict:
     """
     Appelle /nlp/extract-and-lca (MS2)
     et renvoie le JSON complet :
@@ -23,6 +26,4 @@ def call_nlp_and_lca(product_id: str, text: str) -> dict:
         "language": "fr",
     }
 
-    response = requests.post(NLP_SERVICE_URL, json=payload, timeout=30)
-    response.raise_for_status()
-    return response.json()
+    return await _client.post_json(NLP_SERVICE_URL, payload)
@@ -1,12 +1,164 @@
 # app/services/ocr_extractor.py
+"""
+OCR des images (Tesseract).
+
+- tesserocr (si installé) : une instance TessBaseAPI initialisée par thread de
+  travail et gardée en mémoire -> pas de processus tesseract lancé ni de modèles
+  fra+eng rechargés à chaque image
+- sinon pytesseract (un processus tesseract par image)
+- les images passent d'abord par image_preprocess.prepare_for_ocr
+"""
 import io
+import os
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
 from PIL import Image
 import pytesseract
 
-# 👉 très important sur Windows, indique le chemin de Tesseract :
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+try:
+    import tesserocr
+except ImportError:  # dépendance optionnelle : repli sur pytesseract
+    tesserocr = None
+
+from ecolabel_common.telemetry import get_logger
+
+from ..config import (
+    TESSERACT_CMD,
+    TESSDATA_PREFIX,
+    OCR_LANG,
+    OCR_ENGINE,
+    OCR_PSM,
+    OCR_PREPROCESS,
+)
+from .image_preprocess import prepare_for_ocr
+
+log = get_logger("ocr")
+
+# 👉 très important sur Windows, indique le chemin de Tesseract (TESSERACT_CMD)
+if TESSERACT_CMD:
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+# Emplacements usuels des modèles (paquets tesseract-ocr Debian/Ubuntu/Alpine)
+_TESSDATA_CANDIDATES = (
+    "/usr/share/tesseract-ocr/5/tessdata",
+    "/usr/share/tesseract-ocr/4.00/tessdata",
+    "/usr/share/tessdata",
+    "/usr/local/share/tessdata",
+)
+
+_local = threading.local()
+_lock = threading.Lock()
+_apis: List[Any] = []          # toutes les instances créées (libérées à l'arrêt)
+_tesserocr_error = ""          # échec d'initialisation -> repli définitif sur pytesseract
+_closed = False                # instances libérées : plus d'OCR via tesserocr
+_stats = {"images": 0, "preprocess_ms": 0.0, "ocr_ms": 0.0}
+
+
+def _tessdata_path() -> str:
+    if TESSDATA_PREFIX:
+        return TESSDATA_PREFIX
+    first_lang = OCR_LANG.split("+")[0]
+    for path in _TESSDATA_CANDIDATES:
+        if os.path.isfile(os.path.join(path, f"{first_lang}.traineddata")):
+            return path
+    return ""
+
+
+def _use_tesserocr() -> bool:
+    return tesserocr is not None and OCR_ENGINE in ("auto", "tesserocr") and not _tesserocr_error and not _closed
+
+
+def _get_api():
+    """Instance TessBaseAPI du thread courant (créée au premier appel)."""
+    api = getattr(_local, "api", None)
+    if api is None:
+        kwargs = {"lang": OCR_LANG, "psm": OCR_PSM}
+        path = _tessdata_path()
+        if path:
+            kwargs["path"] = path
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        _local.api = api
+        with _lock:
+            _apis.append(api)
+    return api
+
+
+def _ocr_tesserocr(image: Image.Image, dpi: int) -> str:
+    api = _get_api()
+    try:
+        api.SetImage(image)
+        if dpi:
+            api.SetSourceResolution(dpi)
+        return api.GetUTF8Text()
+    finally:
+        api.Clear()
+
+
+def _ocr_pytesseract(image: Image.Image, dpi: int) -> str:
+    config = f"--psm {OCR_PSM}"
+    if dpi:
+        config += f" --dpi {dpi}"
+    return pytesseract.image_to_string(image, lang=OCR_LANG, config=config)
+
+
+def _load_image(file_bytes: bytes) -> Tuple[Image.Image, int]:
+    if OCR_PREPROCESS:
+        return prepare_for_ocr(file_bytes)
+    return Image.open(io.BytesIO(file_bytes)), 0
+
 
 def extract_text_from_image(file_bytes: bytes) -> str:
-    image = Image.open(io.BytesIO(file_bytes))
-    text = pytesseract.image_to_string(image, lang="fra+eng")  # texte en français
+    global _tesserocr_error
+
+    t0 = time.perf_counter()
+    image, dpi = _load_image(file_bytes)
+    t1 = time.perf_counter()
+
+    if _use_tesserocr():
+        try:
+            text = _ocr_tesserocr(image, dpi)
+        except RuntimeError as e:
+            # modèles introuvables, etc. : on le signale une fois et on passe à pytesseract
+            _tesserocr_error = str(e)
+            log.warning(f"tesserocr indisponible ({e}), repli sur pytesseract")
+            text = _ocr_pytesseract(image, dpi)
+    else:
+        text = _ocr_pytesseract(image, dpi)
+
+    t2 = time.perf_counter()
+    with _lock:
+        _stats["images"] += 1
+        _stats["preprocess_ms"] += (t1 - t0) * 1000
+        _stats["ocr_ms"] += (t2 - t1) * 1000
     return text
+
+
+def ocr_stats() -> Dict[str, Any]:
+    with _lock:
+        images = _stats["images"]
+        return {
+            "engine": "tesserocr" if _use_tesserocr() else "pytesseract",
+            "engine_error": _tesserocr_error or None,
+            "lang": OCR_LANG,
+            "preprocess": OCR_PREPROCESS,
+            "warm_instances": len(_apis),
+            "images": images,
+            "avg_preprocess_ms": round(_stats["preprocess_ms"] / images, 2) if images else 0.0,
+            "avg_ocr_ms": round(_stats["ocr_ms"] / images, 2) if images else 0.0,
+        }
+
+
+def shutdown_ocr_engines() -> None:
+    """
+    Libère les instances Tesseract. À appeler après shutdown_extraction_executor(wait=True) :
+    un thread encore en cours d'OCR utiliserait sinon une instance détruite.
+    """
+    global _closed
+    with _lock:
+        _closed = True
+        apis = list(_apis)
+        _apis.clear()
+    for api in apis:
+        api.End()
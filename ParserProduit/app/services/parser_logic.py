@@ -1,6 +1,9 @@
 # app/services/parser_logic.py
 import re
 import unicodedata
+from typing import Iterable, Tuple, Dict, Any
+
+from . import section_parser
 
 
 def normalize_text(text: str) -> str:
@@ -133,15 +136,25 @@ def parse_product_text(text: str, gtin: str, source_file: str):
     """
     Analyse OCR du texte :
     - Nettoyage
+    - Découpage en une passe (section_parser.tokenize)
     - Extraction de champs structurés (Nom/Marque/Catégorie/Poids net/Origine/etc.)
     - Extraction d'ingrédients sans débordement vers Emballage/Origine/Destination/Transport/Labels
     """
-    text_norm = normalize_text(text)
+    doc = section_parser.tokenize(normalize_text(text))
+    return section_parser.build_produit(doc, gtin=gtin, source_file=source_file)
 
-    # DEBUG → Regarder ce que l'extracteur a détecté (console)
-    print("\n===== OCR DEBUG =====")
-    print(text_norm)
-    print("=====================\n")
+
+def parse_product_text_regex(text: str, gtin: str, source_file: str):
+    """
+    Ancienne implémentation (cascade de regex), conservée comme référence
+    pour le corpus golden et le benchmark (benchmarks/bench_section_parser.py).
+
+    Analyse OCR du texte :
+    - Nettoyage
+    - Extraction de champs structurés (Nom/Marque/Catégorie/Poids net/Origine/etc.)
+    - Extraction d'ingrédients sans débordement vers Emballage/Origine/Destination/Transport/Labels
+    """
+    text_norm = normalize_text(text)
 
     # 1) GTIN automatique si non fourni
     auto_gtin = detect_gtin(text_norm)
@@ -244,3 +257,39 @@ def parse_product_text(text: str, gtin: str, source_file: str):
         "source_file": source_file,
     }
 
+
+
+def has_required_fields(text_norm: str) -> bool:
+    """
+    Vrai si le texte (normalisé) contient déjà tous les champs utiles :
+    GTIN, Nom, Ingrédients (bloc terminé par une section suivante),
+    Emballage, Origine, Transport.
+    Sert à arrêter la lecture d'un PDF avant la fin.
+    """
+    return section_parser.has_required_fields(section_parser.tokenize(text_norm))
+
+
+def parse_product_text_stream(pages: Iterable[str], gtin: str, source_file: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Variante "streaming" de parse_product_text : consomme les pages une à une
+    et s'arrête dès que tous les champs utiles ont été vus (RequiredFieldsTracker,
+    équivalent à has_required_fields() sur le texte lu, sans le re-découper à chaque page).
+    Les pages suivantes ne sont pas lues : labels et texte renvoyé s'arrêtent à cette page.
+    Retourne (texte lu, champs ProduitRaw).
+    """
+    raw_pages = []
+    tracker = section_parser.RequiredFieldsTracker()
+    try:
+        for page_text in pages:
+            raw_pages.append(page_text)
+            page_norm = normalize_text(page_text)
+            # chaque page n'est découpée qu'une fois (pas de re-découpage du texte cumulé)
+            if page_norm and tracker.feed(page_norm):
+                break
+    finally:
+        close = getattr(pages, "close", None)
+        if close:
+            close()
+
+    text = "\n".join(raw_pages)
+    return text, parse_product_text(text=text, gtin=gtin, source_file=source_file)
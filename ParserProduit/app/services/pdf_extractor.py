@@ -1,12 +1,74 @@
 # app/services/pdf_extractor.py
 import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional
+
 import pdfplumber
 
+_page_pool: Optional[ProcessPoolExecutor] = None
+
+
 def extract_text_from_pdf(file_bytes: bytes) -> str:
-    text_chunks = []
+    return "\n".join(iter_pdf_pages(file_bytes))
+
+
+def iter_pdf_pages(file_bytes: bytes, workers: int = 0) -> Iterator[str]:
+    """
+    Générateur : texte de chaque page, dans l'ordre.
+    - le consommateur peut s'arrêter avant la fin (les pages suivantes ne sont pas lues)
+    - le cache de chaque page est libéré dès qu'elle est lue (RSS bornée)
+    - workers > 1 : les pages sont extraites par fenêtres de `workers` pages en parallèle
+    """
+    if workers > 1:
+        yield from _iter_pdf_pages_parallel(file_bytes, workers)
+        return
+
     with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
         for page in pdf.pages:
             page_text = page.extract_text() or ""
-            text_chunks.append(page_text)
-    full_text = "\n".join(text_chunks)
-    return full_text
+            page.close()
+            yield page_text
+
+
+def _count_pages(file_bytes: bytes) -> int:
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_page(file_bytes: bytes, index: int) -> str:
+    """Tâche exécutée dans un processus : texte d'une seule page."""
+    with pdfplumber.open(io.BytesIO(file_bytes), pages=[index + 1]) as pdf:
+        return pdf.pages[0].extract_text() or ""
+
+
+def _get_page_pool(workers: int) -> ProcessPoolExecutor:
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _page_pool
+
+
+def _iter_pdf_pages_parallel(file_bytes: bytes, workers: int) -> Iterator[str]:
+    pool = _get_page_pool(workers)
+    n_pages = _count_pages(file_bytes)
+
+    for start in range(0, n_pages, workers):
+        window = [pool.submit(_extract_page, file_bytes, i) for i in range(start, min(start + workers, n_pages))]
+        try:
+            for future in window:
+                yield future.result()
+        finally:
+            # arrêt anticipé du consommateur : on abandonne le reste de la fenêtre
+            for future in window:
+                future.cancel()
+
+
+def shutdown_page_pool() -> None:
+    global _page_pool
+    if _page_pool is not None:
+        _page_pool.shutdown(wait=False, cancel_futures=True)
+        _page_pool = None
@@ -0,0 +1,75 @@
+# app/services/pipeline.py
+"""
+Chaîne Parser -> NLP -> LCA -> Scoring, partagée par /parse-and-nlp (synchrone)
+et par les workers de jobs (/parse-and-nlp/jobs).
+Les erreurs remontent en exceptions métier ; main.py les traduit en HTTP.
+"""
+from typing import Any, Dict, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from ecolabel_common.telemetry import annotate, record_stage, stage
+
+from ..models import ProduitRaw
+from . import extraction_cache
+from .extraction import extract_product
+from .extraction_executor import get_extraction_executor
+from .nlp_client import call_nlp_and_lca
+
+
+async def extract_and_parse_cached(
+    db: Session, file_bytes: bytes, filename: str, content_type: str
+) -> Tuple[str, Dict[str, Any], str]:
+    """
+    Extraction + parsing avec cache par contenu (SHA-256 du fichier).
+    Retourne (text, produit_dict, "hit" | "miss").
+    Les accès au cache passent par le pool de threads ; en cas de miss, le travail CPU
+    part sur l'exécuteur d'extraction (la boucle asyncio reste libre) et l'entrée du
+    cache est ajoutée à la transaction courante.
+    Lève UnsupportedFileError / EmptyTextError / ExecutorSaturated.
+    """
+    digest = extraction_cache.content_hash(file_bytes)
+    entry = await run_in_threadpool(extraction_cache.lookup, db, digest)
+    if entry is not None:
+        annotate(extraction_cache="hit")
+        return entry.text, extraction_cache.cached_produit(entry, filename), "hit"
+
+    # durées mesurées dans le thread d'extraction, reportées sur la trace de la requête
+    timings: Dict[str, float] = {}
+    text, produit_dict = await get_extraction_executor().run(
+        extract_product, file_bytes, filename, content_type, timings
+    )
+    record_stage("extract", timings["extract_ms"])
+    record_stage("parse", timings["parse_ms"])
+    annotate(extraction_cache="miss")
+    await run_in_threadpool(extraction_cache.store, db, digest, text, produit_dict)
+    return text, produit_dict, "miss"
+
+
+def save_produit(db: Session, produit_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Insère le ProduitRaw et valide la transaction (entrée du cache comprise).
+    L'id vient du RETURNING de l'INSERT : pas de SELECT de relecture.
+    """
+    produit = ProduitRaw(**produit_dict)
+    db.add(produit)
+    db.flush()
+    produit_id = produit.id
+    db.commit()
+    return {"id": produit_id, **produit_dict}
+
+
+def produit_to_dict(produit: ProduitRaw) -> Dict[str, Any]:
+    return {c.name: getattr(produit, c.name) for c in ProduitRaw.__table__.columns}
+
+
+async def call_nlp_chain(produit_id: int, text: str) -> Dict[str, Any]:
+    """MS2 -> MS3. Renvoie {"nlp": ..., "lca": ...}."""
+    annotate(produit_id=produit_id)
+    with stage("nlp"):
+        combined = await call_nlp_and_lca(product_id=str(produit_id), text=text)
+    return {
+        "nlp": combined.get("nlp_output", {}),
+        "lca": combined.get("lca_result", {}),
+    }
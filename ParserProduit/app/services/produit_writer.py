@@ -0,0 +1,201 @@
+# app/services/produit_writer.py
+"""
+Écriture en masse des ProduitRaw.
+
+- insert_many : INSERT multi-lignes ... RETURNING id par paquets de
+  PARSER_BULK_CHUNK lignes, dans la transaction de l'appelant. Si un paquet
+  échoue, il est rejoué ligne par ligne (un savepoint par ligne) : les lignes
+  valides sont écrites et chaque ligne en erreur a son message.
+- ProduitWriter : tampon partagé pour l'ingestion au fil de l'eau. Les lignes
+  de plusieurs appelants sont écrites ensemble (un INSERT + un commit par flush)
+  dès que PARSER_BULK_FLUSH_ROWS lignes attendent ou après PARSER_BULK_FLUSH_MS.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..config import PARSER_BULK_CHUNK, PARSER_BULK_FLUSH_ROWS, PARSER_BULK_FLUSH_MS
+from ..database import SessionLocal
+from ..models import ProduitRaw
+
+_COLUMNS = [c.name for c in ProduitRaw.__table__.columns if c.name != "id"]
+
+
+@dataclass
+class InsertResult:
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+def _row(produit_dict: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: produit_dict.get(name) for name in _COLUMNS}
+
+
+def _db_error(e: SQLAlchemyError) -> str:
+    orig = getattr(e, "orig", None)
+    message = str(orig if orig is not None else e).strip()
+    return message.splitlines()[0] if message else e.__class__.__name__
+
+
+def _insert_one_by_one(db: Session, rows: List[Dict[str, Any]]) -> List[InsertResult]:
+    results = []
+    for row in rows:
+        try:
+            with db.begin_nested():
+                new_id = db.scalar(insert(ProduitRaw).values(**row).returning(ProduitRaw.id))
+            results.append(InsertResult(id=new_id))
+        except SQLAlchemyError as e:
+            results.append(InsertResult(error=_db_error(e)))
+    return results
+
+
+def insert_many(db: Session, produits: List[Dict[str, Any]], chunk_size: int = PARSER_BULK_CHUNK) -> List[InsertResult]:
+    """
+    Insère les produits (dicts ProduitRaw) et renvoie un InsertResult par
+    produit, dans le même ordre. Le commit reste à la charge de l'appelant.
+    """
+    results: List[InsertResult] = []
+    stmt = insert(ProduitRaw).returning(ProduitRaw.id, sort_by_parameter_order=True)
+
+    for start in range(0, len(produits), chunk_size):
+        rows = [_row(p) for p in produits[start:start + chunk_size]]
+        try:
+            with db.begin_nested():
+                ids = db.scalars(stmt, rows).all()
+            results.extend(InsertResult(id=i) for i in ids)
+        except SQLAlchemyError:
+            results.extend(_insert_one_by_one(db, rows))
+    return results
+
+
+class ProduitWriter:
+    """
+    Tampon d'écriture partagé (thread dédié, session dédiée).
+    submit() renvoie un Future[InsertResult] ; write() est la version async.
+    """
+
+    def __init__(
+        self,
+        flush_rows: int = PARSER_BULK_FLUSH_ROWS,
+        flush_ms: int = PARSER_BULK_FLUSH_MS,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.flush_rows = flush_rows
+        self.flush_s = flush_ms / 1000
+        self._session_factory = session_factory
+        self._buffer: List[Tuple[Dict[str, Any], Future]] = []
+        self._first_at = 0.0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"rows": 0, "errors": 0, "flushes": 0, "flush_ms_total": 0.0}
+
+    def submit(self, produit_dict: Dict[str, Any]) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ProduitWriter fermé")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="produit-writer", daemon=True)
+                self._thread.start()
+            was_empty = not self._buffer
+            if was_empty:
+                self._first_at = time.monotonic()
+            self._buffer.append((produit_dict, future))
+            # réveil : démarrage du délai de flush, ou tampon plein
+            if was_empty or len(self._buffer) >= self.flush_rows:
+                self._cond.notify()
+        return future
+
+    async def write(self, produit_dict: Dict[str, Any]) -> InsertResult:
+        return await asyncio.wrap_future(self.submit(produit_dict))
+
+    def _take_batch(self) -> List[Tuple[Dict[str, Any], Future]]:
+        with self._cond:
+            while not self._closed:
+                if len(self._buffer) >= self.flush_rows:
+                    break
+                if self._buffer:
+                    remaining = self._first_at + self.flush_s - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            batch, self._buffer = self._buffer, []
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+            elif self._closed:
+                return
+
+    def _flush(self, batch: List[Tuple[Dict[str, Any], Future]]) -> None:
+        started = time.perf_counter()
+        db = self._session_factory()
+        try:
+            results = insert_many(db, [p for p, _ in batch])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            results = [InsertResult(error=str(e))] * len(batch)
+        finally:
+            db.close()
+
+        with self._cond:
+            self._stats["rows"] += len(batch)
+            self._stats["errors"] += sum(1 for r in results if r.error)
+            self._stats["flushes"] += 1
+            self._stats["flush_ms_total"] += (time.perf_counter() - started) * 1000
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            flushes = self._stats["flushes"]
+            return {
+                "flush_rows": self.flush_rows,
+                "flush_ms": round(self.flush_s * 1000),
+                "buffered": len(self._buffer),
+                "rows": self._stats["rows"],
+                "errors": self._stats["errors"],
+                "flushes": flushes,
+                "avg_rows_per_flush": round(self._stats["rows"] / flushes, 1) if flushes else 0.0,
+                "avg_flush_ms": round(self._stats["flush_ms_total"] / flushes, 2) if flushes else 0.0,
+            }
+
+    def close(self, timeout: Optional[float] = 10) -> None:
+        """Écrit ce qui reste dans le tampon puis arrête le thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+_writer: Optional[ProduitWriter] = None
+
+
+def get_produit_writer() -> ProduitWriter:
+    global _writer
+    if _writer is None:
+        _writer = ProduitWriter()
+    return _writer
+
+
+def shutdown_produit_writer() -> None:
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
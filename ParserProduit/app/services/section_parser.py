@@ -0,0 +1,276 @@
+# app/services/section_parser.py
+"""
+Moteur de parsing en une passe pour les étiquettes produit.
+
+Le texte normalisé est parcouru une seule fois par une regex compilée
+multi-lignes qui repère les lignes "Clé: valeur" (Nom, Marque, Emballage, ...)
+et les sections qui terminent la liste d'ingrédients. Le résultat est rangé
+dans un LabelDocument, à partir duquel tous les champs ProduitRaw sont remplis.
+Les autres motifs (GTIN, poids, début des ingrédients) sont des recherches
+compilées uniques ; plus de cascade re.search / re.split sur tout le texte.
+
+Le résultat est identique à l'ancienne cascade de regex (parse_product_text_regex),
+vérifié sur le corpus benchmarks/golden.
+"""
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple, Any
+
+# Une ligne "Clé: valeur" (lookahead : les correspondances ne se chevauchent pas,
+# une valeur vide prend la ligne suivante qui peut elle-même être une clé)
+_LINE_RE = re.compile(
+    r"^(?=(nom|marque|catégorie|emballage|origine|destination|transport|labels)\s*:(?:\s*(.+)$)?)",
+    re.IGNORECASE | re.MULTILINE,
+)
+_NEWLINE_RE = re.compile(r"\n")
+_GTIN_RE = re.compile(r"\b(\d{8,14})\b")
+_LETTER_RE = re.compile(r"[A-Za-zÀ-ÿ]")
+_POIDS_RE = re.compile(r"^Poids\s*net\s*:\s*(\d+(?:[.,]\d+)?)\s*(g|kg|ml|l)\b", re.IGNORECASE | re.MULTILINE)
+_INCI_RE = re.compile(r"Ingredients\s*\(INCI\)\s*:(\s*)", re.IGNORECASE)
+_BLOCK_RE = re.compile(r"(?:INGRÉDIENTS|INGREDIENTS|Contains|Contient|المكونات)(\s*[:\-]?\s*)", re.IGNORECASE)
+_BLOCK_TAIL_RE = re.compile(r"\s*[:\-]?\s*(.+?)(?=\n[A-Z][A-Z0-9 \-/]{3,}\n|\Z)", re.IGNORECASE | re.DOTALL)
+_HEADER_LINE_RE = re.compile(r"\n[A-Z][A-Z0-9 \-/]{3,}\n", re.IGNORECASE)
+_ORIGIN_RE = re.compile(
+    r"(Origine du lait|Origine|Made in|Product of|Produced for|Manufactured in)\s*[:\-]\s*(.+)",
+    re.IGNORECASE,
+)
+
+ORIGIN_WORDS = ("origine", "made in", "product of", "produced for", "manufactured in")
+
+# Sections qui terminent la liste d'ingrédients
+STOP_KEYS = frozenset({"emballage", "origine", "destination", "transport", "labels"})
+NUTRITION_KEYWORDS = (
+    "énergie", "energie", "kcal", "kj",
+    "fat", "saturates", "carbohydrate", "sugars",
+    "protein", "sel", "salt", "fibres", "fibers",
+)
+LABEL_RULES = (
+    (("bio", "organic"), "bio"),
+    (("vegan",), "vegan"),
+    (("fairtrade",), "fairtrade"),
+    (("recycl",), "recyclable"),
+)
+
+
+@dataclass
+class LabelDocument:
+    """Structure produite par tokenize() : une entrée par information repérée."""
+    text: str
+    lower: str
+    lines: List[str]
+    offsets: List[int]
+    kv: Dict[str, str] = field(default_factory=dict)       # clé (minuscule) -> 1re valeur
+    stop_lines: List[int] = field(default_factory=list)    # lignes "Emballage:", "Origine:", ...
+    gtin: str = ""
+    poids_net_g: int = 0
+    inci_start: Optional[Tuple[int, int]] = None           # (position, ligne) du début de la liste INCI
+    inci_colon_line: int = -1                              # ligne du ":" de "Ingredients (INCI):"
+    block_start: Optional[Tuple[int, int]] = None          # (fin du mot-clé, début du bloc) "INGRÉDIENTS:"...
+    has_nutrition: bool = False
+    labels: Set[str] = field(default_factory=set)
+
+
+def _poids_to_grams(value: str, unit: str) -> int:
+    val = float(value.replace(",", "."))
+    unit = unit.lower()
+    if unit in ("kg", "l"):
+        return int(val * 1000)  # 1 l ~ 1 kg (approximation)
+    return int(val)
+
+
+def _may_contain(lower: str, words: Tuple[str, ...]) -> bool:
+    """
+    Pré-filtre avant une regex IGNORECASE coûteuse sur tout le texte.
+    ("ı" sans point correspond à "i" pour re.IGNORECASE mais pas pour lower())
+    """
+    return any(w in lower for w in words) or "ı" in lower
+
+
+def _line_of(doc: LabelDocument, pos: int) -> int:
+    return bisect_right(doc.offsets, pos) - 1
+
+
+def tokenize(text_norm: str) -> LabelDocument:
+    """Découpe le texte normalisé (voir normalize_text) en un LabelDocument."""
+    lines = text_norm.split("\n")
+    offsets = [0]
+    offsets.extend(m.end() for m in _NEWLINE_RE.finditer(text_norm))
+    lower = text_norm.lower()
+    doc = LabelDocument(text=text_norm, lower=lower, lines=lines, offsets=offsets)
+
+    for m in _LINE_RE.finditer(text_norm):
+        key = m.group(1).lower()
+        if key in STOP_KEYS:
+            doc.stop_lines.append(_line_of(doc, m.start()))
+        if m.group(2) is not None and key not in doc.kv:
+            doc.kv[key] = m.group(2).strip()
+
+    m = _GTIN_RE.search(text_norm)
+    if m:
+        doc.gtin = m.group(1)
+
+    m = _POIDS_RE.search(text_norm)
+    if m:
+        doc.poids_net_g = _poids_to_grams(m.group(1), m.group(2))
+
+    m = _INCI_RE.search(text_norm) if _may_contain(lower, ("ingredients",)) else None
+    if m:
+        doc.inci_start = (m.end(), _line_of(doc, m.end()))
+        doc.inci_colon_line = _line_of(doc, m.start(1) - 1)
+
+    m = _BLOCK_RE.search(text_norm)
+    if m:
+        doc.block_start = (m.start(1), m.end())
+
+    doc.has_nutrition = any(kw in lower for kw in NUTRITION_KEYWORDS)
+    for kws, label in LABEL_RULES:
+        if any(kw in lower for kw in kws):
+            doc.labels.add(label)
+    return doc
+
+
+def _next_stop_line(doc: LabelDocument, after: int) -> int:
+    """Index de la 1re ligne "Section:" après la ligne `after` (ou len(lines))."""
+    k = bisect_right(doc.stop_lines, after)
+    return doc.stop_lines[k] if k < len(doc.stop_lines) else len(doc.lines)
+
+
+def _inci_ingredients(doc: LabelDocument) -> str:
+    """
+    Liste après "Ingredients (INCI):" jusqu'à la 1re section d'arrêt.
+    Comme dans la regex d'origine, les blancs après ":" (saut de ligne compris)
+    sont consommés d'abord : une section d'arrêt sur la ligne où commence la
+    liste ne la termine pas.
+    """
+    start, line = doc.inci_start
+    end = _next_stop_line(doc, line)
+    if end < len(doc.lines):
+        return doc.text[start:doc.offsets[end] - 1].strip()
+    return doc.text[start:].strip()
+
+
+def _block_ingredients(doc: LabelDocument) -> str:
+    """
+    Bloc après "INGRÉDIENTS"/"Contient"/... jusqu'à une ligne de titre
+    (MAJUSCULES, non dernière) ou la fin, puis coupé à la 1re section d'arrêt.
+    """
+    text = doc.text
+    keyword_end, start = doc.block_start
+    if start >= len(text):
+        # mot-clé en toute fin de texte : cas limite, on applique la regex d'origine
+        m = _BLOCK_TAIL_RE.match(text, keyword_end)
+        return m.group(1).strip() if m else ""
+
+    m = _HEADER_LINE_RE.search(text, start + 1)
+    end = m.start() if m else len(text)
+    stop = _next_stop_line(doc, _line_of(doc, start))
+    if stop < len(doc.lines):
+        end = min(end, doc.offsets[stop] - 1)
+    return text[start:end].strip()
+
+
+def _comma_block(doc: LabelDocument) -> str:
+    """Plus long bloc contigu de lignes "à virgules" (au moins 3 mots)."""
+    best = ""
+    current: List[str] = []
+    for line in doc.lines + [""]:
+        if ("," in line or ";" in line) and len(line.split()) >= 3:
+            current.append(line.strip())
+        elif current:
+            block = " ".join(current)
+            if len(block) > len(best):
+                best = block
+            current = []
+    return best
+
+
+def ingredients(doc: LabelDocument) -> str:
+    result = _inci_ingredients(doc) if doc.inci_start else ""
+    if not result and doc.block_start is not None:
+        result = _block_ingredients(doc)
+    if not result:
+        result = _comma_block(doc)
+    if not result and not doc.has_nutrition and ("," in doc.text or ";" in doc.text):
+        result = doc.text
+    return result
+
+
+def origine(doc: LabelDocument) -> str:
+    if "origine" in doc.kv:
+        return doc.kv["origine"]
+    if not _may_contain(doc.lower, ORIGIN_WORDS):
+        return ""
+    m = _ORIGIN_RE.search(doc.text)
+    return m.group(2).strip() if m else ""
+
+
+def product_name(doc: LabelDocument) -> str:
+    if "nom" in doc.kv:
+        return doc.kv["nom"]
+    for line in doc.lines:
+        if len(_LETTER_RE.findall(line)) >= 3:
+            return line.strip()
+    return doc.lines[0].strip()
+
+
+def has_required_fields(doc: LabelDocument) -> bool:
+    """GTIN, Nom, Emballage, Origine, Transport + bloc INCI suivi d'une autre section."""
+    if not (doc.gtin and "nom" in doc.kv and "emballage" in doc.kv and "transport" in doc.kv):
+        return False
+    if not origine(doc):
+        return False
+    return doc.inci_start is not None and _next_stop_line(doc, doc.inci_colon_line) < len(doc.lines)
+
+
+class RequiredFieldsTracker:
+    """
+    Version incrémentale de has_required_fields() pour une lecture page par page :
+    chaque page n'est découpée qu'une fois, les champs trouvés sont cumulés.
+    Un bloc INCI ouvert sur une page est fermé par une section d'arrêt d'une page suivante.
+    """
+
+    def __init__(self) -> None:
+        self.found: Set[str] = set()
+        self._inci_open = False
+
+    def feed(self, page_norm: str) -> bool:
+        """Ajoute une page normalisée ; vrai dès que tous les champs ont été vus."""
+        doc = tokenize(page_norm)
+        if doc.gtin:
+            self.found.add("gtin")
+        self.found.update(k for k in ("nom", "emballage", "transport") if k in doc.kv)
+        if "origine" not in self.found and origine(doc):
+            self.found.add("origine")
+
+        if "inci" not in self.found:
+            if self._inci_open and doc.stop_lines:
+                self.found.add("inci")
+            elif not self._inci_open and doc.inci_start is not None:
+                if _next_stop_line(doc, doc.inci_colon_line) < len(doc.lines):
+                    self.found.add("inci")
+                else:
+                    self._inci_open = True
+        return len(self.found) == 6
+
+
+def build_produit(doc: LabelDocument, gtin: str, source_file: str) -> Dict[str, Any]:
+    kv = doc.kv
+
+    parts = []
+    for key, label in (("emballage", "Emballage"), ("destination", "Destination"), ("transport", "Transport")):
+        if kv.get(key):
+            parts.append(f"{label}: {kv[key]}")
+
+    return {
+        "gtin": gtin or doc.gtin,
+        "nom": product_name(doc),
+        "marque": kv.get("marque") or "Non renseigné",
+        "categorie": kv.get("catégorie") or "Non renseigné",
+        "poids_net_g": doc.poids_net_g,
+        "ingredients_raw": ingredients(doc),
+        "packaging_raw": "\n".join(parts).strip() if parts else doc.text,
+        "origine_raw": origine(doc),
+        "labels_raw": ", ".join(sorted(doc.labels)),
+        "source_file": source_file,
+    }
@@ -0,0 +1,121 @@
+# benchmarks/bench_bulk_insert.py
+"""
+Compare trois façons d'écrire N ProduitRaw dans la base configurée (app/database.py) :
+
+1) une ligne à la fois : add + commit + refresh (ancien chemin de /parse et /parse/batch)
+2) insert_many : INSERT multi-lignes ... RETURNING par paquets, un seul commit
+3) ProduitWriter : N écritures concurrentes regroupées par le tampon partagé
+
+Les lignes créées sont marquées (source_file) puis supprimées à la fin.
+
+Usage (depuis ParserProduit/, base démarrée) :
+    python benchmarks/bench_bulk_insert.py [--rows 5000] [--chunk 1000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import delete  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.models import ProduitRaw  # noqa: E402
+from app.services.produit_writer import ProduitWriter, insert_many  # noqa: E402
+
+
+def make_rows(n: int, marker: str):
+    return [
+        {
+            "gtin": f"{3000000000000 + i}",
+            "nom": f"Produit bench {i}",
+            "marque": "Bench",
+            "categorie": "cosmétique",
+            "poids_net_g": 250.0,
+            "ingredients_raw": "AQUA, GLYCERIN, PARFUM",
+            "packaging_raw": "Flacon PET",
+            "origine_raw": "France",
+            "labels_raw": "",
+            "source_file": marker,
+        }
+        for i in range(n)
+    ]
+
+
+def bench_one_by_one(rows) -> float:
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        for row in rows:
+            produit = ProduitRaw(**row)
+            db.add(produit)
+            db.commit()
+            db.refresh(produit)
+        return time.perf_counter() - t0
+    finally:
+        db.close()
+
+
+def bench_insert_many(rows, chunk: int) -> float:
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        results = insert_many(db, rows, chunk_size=chunk)
+        db.commit()
+        elapsed = time.perf_counter() - t0
+        errors = sum(1 for r in results if r.error)
+        if errors:
+            print(f"  ⚠️ insert_many : {errors} erreur(s)")
+        return elapsed
+    finally:
+        db.close()
+
+
+def bench_writer(rows) -> float:
+    writer = ProduitWriter()
+
+    async def run():
+        return await asyncio.gather(*[writer.write(row) for row in rows])
+
+    t0 = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - t0
+    stats = writer.stats()
+    writer.close()
+    print(f"  writer : {stats['flushes']} flush(es), {stats['avg_rows_per_flush']} lignes/flush")
+    return elapsed
+
+
+def cleanup(marker: str) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(ProduitRaw).where(ProduitRaw.source_file == marker))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--chunk", type=int, default=1000)
+    args = ap.parse_args()
+
+    marker = f"bench-bulk-{uuid.uuid4().hex[:8]}"
+    try:
+        for label, fn in (
+            ("ligne par ligne", lambda rows: bench_one_by_one(rows)),
+            ("insert_many", lambda rows: bench_insert_many(rows, args.chunk)),
+            ("ProduitWriter", lambda rows: bench_writer(rows)),
+        ):
+            elapsed = fn(make_rows(args.rows, marker))
+            print(f"{label:<16} {args.rows} lignes en {elapsed:.3f} s  ({args.rows / elapsed:,.0f} lignes/s)")
+    finally:
+        cleanup(marker)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# benchmarks/bench_parser_suite.py
+"""
+Suite de benchmarks du ParserProduit sur le corpus synthétique (synthetic_corpus.py).
+
+Étapes mesurées (chacune isolément) :
+    parse_text      parse_product_text sur les textes propres
+    parse_ocr_text  parse_product_text sur les textes bruités OCR
+    pdf_extract     extract_text_from_pdf (toutes les pages)
+    pdf_product     extract_product sur PDF (page par page avec arrêt anticipé si PARSER_PDF_STREAMING=1)
+    image_prep      prepare_for_ocr (décodage, DPI, redressement, binarisation)
+    ocr             extract_text_from_image (ignorée si Tesseract est indisponible)
+
+Pour chaque étape : latence p50 / p95 / p99 / max (ms), débit (documents/s),
+pic mémoire Python (tracemalloc, passe séparée pour ne pas fausser les temps)
+et, pour le parsing, la part de documents où les champs clés sont trouvés.
+
+Régressions : --save-baseline écrit les mesures ; --baseline les compare et le
+script sort en code 1 si une étape dépasse le seuil (--threshold, 25 % par défaut)
+sur p50, p95 ou le pic mémoire, ou si la part de champs trouvés baisse.
+La baseline dépend de la machine : la générer sur celle qui compare.
+
+Usage (depuis ParserProduit/) :
+    python benchmarks/bench_parser_suite.py --save-baseline /tmp/parser_baseline.json
+    python benchmarks/bench_parser_suite.py --baseline /tmp/parser_baseline.json [--threshold 0.25]
+    python benchmarks/bench_parser_suite.py --stages parse_text,pdf_extract --labels 80 --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", ".."))  # ecolabel_common
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic_corpus import Sample, build_corpus  # noqa: E402
+from app.services.extraction import extract_product  # noqa: E402
+from app.services.image_preprocess import prepare_for_ocr  # noqa: E402
+from app.services.ocr_extractor import extract_text_from_image  # noqa: E402
+from app.services.parser_logic import parse_product_text  # noqa: E402
+from app.services.pdf_extractor import extract_text_from_pdf  # noqa: E402
+
+STAGES = ("parse_text", "parse_ocr_text", "pdf_extract", "pdf_product", "image_prep", "ocr")
+
+# métriques comparées à la baseline (plus grand = moins bon)
+_COMPARED = ("p50_ms", "p95_ms", "peak_kb")
+# en dessous, les écarts relatifs ne veulent rien dire (bruit de mesure)
+_MIN_MS = 0.05
+_MIN_KB = 64
+
+
+def _fields_found(produit: Dict[str, Any]) -> bool:
+    return bool(produit.get("gtin")) and bool(produit.get("ingredients_raw"))
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _ocr_available(sample: Sample) -> Optional[str]:
+    """None si l'OCR fonctionne ici, sinon la raison."""
+    try:
+        extract_text_from_image(sample.image)
+        return None
+    except Exception as e:  # TesseractNotFoundError, modèles absents...
+        return f"{e.__class__.__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+
+
+def _stage_inputs(samples: List[Sample]) -> Dict[str, List[Sample]]:
+    texts = [s for s in samples if s.pdf is None and s.image is None]
+    return {
+        "parse_text": [s for s in texts if not s.noisy],
+        "parse_ocr_text": [s for s in texts if s.noisy],
+        "pdf_extract": [s for s in samples if s.pdf is not None],
+        "pdf_product": [s for s in samples if s.pdf is not None],
+        "image_prep": [s for s in samples if s.image is not None],
+        "ocr": [s for s in samples if s.image is not None],
+    }
+
+
+def _stage_fn(stage: str) -> Callable[[Sample], Any]:
+    if stage in ("parse_text", "parse_ocr_text"):
+        return lambda s: parse_product_text(text=s.text, gtin="", source_file=s.name)
+    if stage == "pdf_extract":
+        return lambda s: extract_text_from_pdf(s.pdf)
+    if stage == "pdf_product":
+        return lambda s: extract_product(s.pdf, s.name, "application/pdf")[1]
+    if stage == "image_prep":
+        return lambda s: prepare_for_ocr(s.image)
+    if stage == "ocr":
+        return lambda s: extract_text_from_image(s.image)
+    raise ValueError(stage)
+
+
+def run_stage(stage: str, inputs: List[Sample], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    fn = _stage_fn(stage)
+
+    for s in inputs[:warmup]:
+        fn(s)
+
+    latencies = []
+    outputs = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for s in inputs:
+            t0 = time.perf_counter()
+            out = fn(s)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if len(outputs) < len(inputs):
+                outputs.append(out)
+    elapsed = time.perf_counter() - started
+
+    # passe séparée : tracemalloc ralentit fortement les allocations
+    tracemalloc.start()
+    for s in inputs:
+        fn(s)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    result = {
+        "docs": len(latencies),
+        "p50_ms": round(_percentile(latencies, 0.50), 3),
+        "p95_ms": round(_percentile(latencies, 0.95), 3),
+        "p99_ms": round(_percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "docs_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "peak_kb": round(peak / 1024, 1),
+    }
+    if stage in ("parse_text", "parse_ocr_text", "pdf_product"):
+        found = sum(1 for produit in outputs if _fields_found(produit))
+        result["fields_ratio"] = round(found / len(outputs), 3) if outputs else 0.0
+    return result
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Liste des régressions (vide si tout va bien)."""
+    regressions = []
+    for stage, current in results["stages"].items():
+        ref = baseline.get("stages", {}).get(stage)
+        if not ref or "skipped" in current or "skipped" in ref:
+            continue
+        for metric in _COMPARED:
+            old, new = ref.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            floor = _MIN_KB if metric == "peak_kb" else _MIN_MS
+            if new > max(old, floor) * (1 + threshold):
+                regressions.append(f"{stage}.{metric} : {old} -> {new} (+{(new / max(old, floor) - 1) * 100:.0f} %)")
+        if "fields_ratio" in ref and current.get("fields_ratio", 0) < ref["fields_ratio"]:
+            regressions.append(f"{stage}.fields_ratio : {ref['fields_ratio']} -> {current.get('fields_ratio')}")
+    return regressions
+
+
+def _print_table(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    print(f"{'étape':<15}{'docs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'docs/s':>10}{'pic Ko':>10}{'champs':>8}")
+    for stage, r in results["stages"].items():
+        if "skipped" in r:
+            print(f"{stage:<15}  ignorée : {r['skipped']}")
+            continue
+        fields = f"{r['fields_ratio'] * 100:.0f}%" if "fields_ratio" in r else "-"
+        print(f"{stage:<15}{r['docs']:>6}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+              f"{r['docs_per_s']:>10.1f}{r['peak_kb']:>10.1f}{fields:>8}")
+        ref = (baseline or {}).get("stages", {}).get(stage)
+        if ref and "skipped" not in ref:
+            print(f"{'  baseline':<15}{'':>6}{ref['p50_ms']:>10.3f}{ref['p95_ms']:>10.3f}{ref['p99_ms']:>10.3f}"
+                  f"{ref['docs_per_s']:>10.1f}{ref['peak_kb']:>10.1f}")
+    print(f"RSS max du processus : {results['max_rss_mb']} Mo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=int, default=20, help="nb d'étiquettes générées (x4 formats de fichiers)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--pdf-pages", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=2, help="passes de mesure (étapes rapides : x20)")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--baseline", help="JSON de référence à comparer")
+    parser.add_argument("--save-baseline", help="écrit les résultats comme nouvelle référence")
+    parser.add_argument("--threshold", type=float, default=0.25, help="régression tolérée (0.25 = +25 %%)")
+    parser.add_argument("--json", help="écrit aussi les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"étapes inconnues : {', '.join(sorted(unknown))}")
+
+    t0 = time.perf_counter()
+    samples = build_corpus(args.labels, args.seed, args.pdf_pages, images=any(s in stages for s in ("image_prep", "ocr")))
+    print(f"corpus : {len(samples)} documents générés en {time.perf_counter() - t0:.1f} s (graine {args.seed})")
+
+    inputs = _stage_inputs(samples)
+    results: Dict[str, Any] = {
+        "corpus": {"labels": args.labels, "seed": args.seed, "pdf_pages": args.pdf_pages},
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "stages": {},
+    }
+    for stage in stages:
+        if stage == "ocr":
+            reason = _ocr_available(inputs["ocr"][0]) if inputs["ocr"] else "aucune image"
+            if reason:
+                results["stages"][stage] = {"skipped": reason}
+                continue
+        # les étapes de parsing sont très rapides : plus de passes pour des percentiles stables
+        repeat = args.repeat * 20 if stage.startswith("parse") else args.repeat
+        results["stages"][stage] = run_stage(stage, inputs[stage], repeat)
+
+    # ru_maxrss : Ko sous Linux, octets sous macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["max_rss_mb"] = round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    _print_table(results, baseline)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        print(f"baseline écrite : {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) au-delà de +{args.threshold * 100:.0f} % :")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"✅ aucune régression au-delà de +{args.threshold * 100:.0f} %")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
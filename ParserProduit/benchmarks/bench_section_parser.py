@@ -0,0 +1,114 @@
+# benchmarks/bench_section_parser.py
+"""
+Compare l'ancienne cascade de regex (parse_product_text_regex) et le parseur
+en une passe (parse_product_text).
+
+1) Vérifie que la sortie est identique sur le corpus golden (benchmarks/golden/expected.json)
+2) Mesure le débit (textes/s) sur le corpus golden, puis sur du bruit OCR long
+
+Usage (depuis ParserProduit/) :
+    python benchmarks/bench_section_parser.py [--repeat 200] [--noise-kb 64]
+    python benchmarks/bench_section_parser.py --regen   # régénère expected.json (ancienne implémentation)
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.parser_logic import parse_product_text, parse_product_text_regex  # noqa: E402
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+EXPECTED_FILE = os.path.join(GOLDEN_DIR, "expected.json")
+
+
+def load_golden():
+    samples = {}
+    for name in sorted(os.listdir(GOLDEN_DIR)):
+        if name.endswith(".txt"):
+            # newline="" : on garde les \r\n tels quels (testés par le corpus)
+            with open(os.path.join(GOLDEN_DIR, name), encoding="utf-8", newline="") as f:
+                samples[name] = f.read()
+    return samples
+
+
+def noisy_ocr_text(size_kb: int, seed: int = 42) -> str:
+    """Long texte OCR bruité, sans section d'arrêt (pire cas de l'ancienne extract_block)."""
+    rnd = random.Random(seed)
+    words = ["AQUA", "eau", "sucre", "GLYCERIN", "l1t", "rn", "0,5", "%", "sel", "Ingrédients", "PARFUM", "|", "~"]
+    lines = ["Nom: Crème test", "INGRÉDIENTS:"]
+    size = 0
+    while size < size_kb * 1024:
+        line = " ".join(rnd.choice(words) for _ in range(rnd.randint(2, 12)))
+        if rnd.random() < 0.5:
+            line += ","
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def check_golden(samples) -> int:
+    with open(EXPECTED_FILE, encoding="utf-8") as f:
+        expected = json.load(f)
+
+    failures = 0
+    for name, text in samples.items():
+        if name not in expected:
+            print(f"  ?? {name} : absent de expected.json")
+            failures += 1
+            continue
+        got = parse_product_text(text=text, gtin="", source_file=name)
+        if got != expected[name]:
+            failures += 1
+            diff = [k for k in got if got[k] != expected[name].get(k)]
+            print(f"  KO {name} : champs différents {diff}")
+    print(f"golden : {len(samples) - failures}/{len(samples)} identiques")
+    return failures
+
+
+def throughput(fn, texts, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name, text in texts:
+            fn(text=text, gtin="", source_file=name)
+    elapsed = time.perf_counter() - start
+    return repeat * len(texts) / elapsed if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--noise-kb", type=int, default=64)
+    parser.add_argument("--regen", action="store_true")
+    args = parser.parse_args()
+
+    samples = load_golden()
+
+    if args.regen:
+        expected = {name: parse_product_text_regex(text=t, gtin="", source_file=name) for name, t in samples.items()}
+        with open(EXPECTED_FILE, "w", encoding="utf-8") as f:
+            json.dump(expected, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"expected.json régénéré ({len(expected)} échantillons)")
+        return 0
+
+    failures = check_golden(samples)
+
+    texts = list(samples.items())
+    old = throughput(parse_product_text_regex, texts, args.repeat)
+    new = throughput(parse_product_text, texts, args.repeat)
+    print(f"golden   : regex {old:9.0f} textes/s | une passe {new:9.0f} textes/s | x{new / old:.1f}")
+
+    noise = [("noise.txt", noisy_ocr_text(args.noise_kb))]
+    rep = max(1, args.repeat // 50)
+    old = throughput(parse_product_text_regex, noise, rep)
+    new = throughput(parse_product_text, noise, rep)
+    print(f"bruit {args.noise_kb}k : regex {old:9.1f} textes/s | une passe {new:9.1f} textes/s | x{new / old:.1f}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+# benchmarks/synthetic_corpus.py
+"""
+Corpus synthétique d'étiquettes produit, reproductible (graine fixe).
+
+Chaque échantillon existe en trois formes :
+- texte (.txt) : ce que renvoie l'extraction, tel quel ou "bruité OCR"
+  (confusions O/0, l/I/1, rn/m, espaces perdus, lignes parasites)
+- PDF (.pdf) : PDF texte écrit à la main (police Helvetica standard, aucune dépendance)
+- image (.png / .jpg) : étiquette rendue avec Pillow, propre ou dégradée
+  (inclinaison, flou, bruit, faible contraste, JPEG compressé)
+
+Formats couverts : alimentaire FR, cosmétique FR (INCI), EN, AR/FR bilingue.
+Les lignes arabes ne sont pas encodables en Helvetica (WinAnsi) : elles sont
+omises des PDF et rendues dans les images seulement si une police qui contient
+l'arabe est trouvée (DejaVuSans).
+
+Usage (depuis ParserProduit/) :
+    python benchmarks/synthetic_corpus.py --out /tmp/corpus [--labels 40] [--seed 1234]
+"""
+import argparse
+import io
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+_FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    r"C:\Windows\Fonts\arial.ttf",
+)
+
+FORMATS = ("fr_alimentaire", "fr_cosmetique", "en", "ar_fr")
+
+_MARQUES = ["La Biscuiterie", "EcoSoin", "Nature&Co", "Terra Verde", "Atlas Bio", "Maison Lune"]
+_ORIGINES = ["France", "Espagne", "Maroc", "Italie", "Tunisie", "Allemagne"]
+_DESTINATIONS = ["France", "Maroc", "Belgique", "Suisse"]
+_EMBALLAGES = [
+    "Flacon PET {a} g + Bouchon PP {b} g",
+    "Bouteille en verre {a} g",
+    "Sachet PE {b} g + Carton {a} g",
+    "Pot verre {a} g + Couvercle acier {b} g",
+]
+_TRANSPORTS = ["Routier", "Maritime + Routier", "Ferroviaire", "Aérien"]
+_LABELS = ["Bio", "Vegan", "AB", "Ecocert", "Fairtrade", "100% recyclable", "Nutri-Score A"]
+_ALIMENTS = [
+    ("Biscuits sablés au beurre", "Biscuits", ["farine de blé", "beurre", "sucre", "œufs frais", "sel", "poudre à lever"]),
+    ("Confiture d'abricots", "Confitures", ["abricots", "sucre de canne", "jus de citron concentré", "pectine de fruits"]),
+    ("Pâte à tartiner noisette", "Pâtes à tartiner", ["sucre", "huile de tournesol", "noisettes", "cacao maigre", "lait écrémé en poudre", "lécithine de soja"]),
+    ("Soupe de légumes", "Plats préparés", ["eau", "carottes", "pommes de terre", "poireaux", "oignons", "huile d'olive", "sel", "poivre"]),
+]
+_COSMETIQUES = [
+    ("Gel douche fraîcheur", "Hygiène / Gel douche", ["Aqua", "Sodium Laureth Sulfate", "Cocamidopropyl Betaine", "Glycerin", "Parfum", "Citric Acid", "Sodium Benzoate"]),
+    ("Shampooing doux camomille", "Hygiène / Shampooing", ["Aqua", "Sodium Lauryl Sulfate", "Glycerin", "Chamomilla Recutita Flower Extract", "Sodium Chloride"]),
+    ("Crème mains karité", "Soin / Crème", ["Aqua", "Butyrospermum Parkii Butter", "Glyceryl Stearate", "Cetearyl Alcohol", "Tocopherol", "Parfum"]),
+]
+_EN_PRODUCTS = [
+    ("Organic Peanut Butter", ["roasted peanuts", "sea salt"]),
+    ("Oat Granola", ["rolled oats", "honey", "sunflower oil", "almonds", "raisins"]),
+    ("Tomato Ketchup", ["tomatoes", "spirit vinegar", "sugar", "salt", "spice extracts"]),
+]
+_AR_PRODUCTS = [
+    ("زيت زيتون بكر ممتاز", "Huile d'olive vierge extra", "زيت زيتون بكر ممتاز", ["huile d'olive vierge extra"]),
+    ("كسكس القمح الصلب", "Couscous de blé dur", "سميد القمح الصلب", ["semoule de blé dur"]),
+    ("عسل طبيعي", "Miel naturel", "عسل", ["miel de fleurs"]),
+]
+
+_OCR_CONFUSIONS = [("O", "0"), ("o", "0"), ("l", "1"), ("I", "l"), ("i", "ı"), ("m", "rn"), ("é", "e"), ("S", "5"), ("B", "8")]
+_OCR_GARBAGE = ["|||", "~ ~", ". . :", "—", "_ _ _", "'", "®"]
+
+
+@dataclass
+class Sample:
+    name: str
+    fmt: str
+    text: str
+    noisy: bool = False
+    pdf: Optional[bytes] = None
+    image: Optional[bytes] = None
+    image_ext: str = ".png"
+    meta: Dict[str, object] = field(default_factory=dict)
+
+
+def _gtin(rnd: random.Random) -> str:
+    digits = [rnd.randint(0, 9) for _ in range(12)]
+    total = sum(d * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return "".join(map(str, digits)) + str((10 - total % 10) % 10)
+
+
+def _ingredients(rnd: random.Random, base: List[str], with_pct: bool) -> str:
+    items = base[:]
+    rnd.shuffle(items)
+    items = items[: rnd.randint(min(len(items), max(2, len(items) - 2)), len(items))]
+    if with_pct:
+        items[0] = f"{items[0]} {rnd.randint(30, 70)}%"
+    return ", ".join(items)
+
+
+def _emballage(rnd: random.Random) -> str:
+    return rnd.choice(_EMBALLAGES).format(a=rnd.randint(10, 450), b=rnd.randint(2, 30))
+
+
+def _label_fr_alimentaire(rnd: random.Random) -> List[str]:
+    nom, categorie, base = rnd.choice(_ALIMENTS)
+    lines = [
+        nom.upper(),
+        f"Marque: {rnd.choice(_MARQUES)}",
+        f"Catégorie: {categorie}",
+        f"Poids net: {rnd.choice(['250 g', '0,5 kg', '750 g', '1 kg', '400 g'])}",
+        f"INGRÉDIENTS : {_ingredients(rnd, base, True)}.",
+        "Peut contenir des traces de fruits à coque.",
+        "VALEURS NUTRITIONNELLES",
+        f"Énergie {rnd.randint(300, 2400)} kJ / {rnd.randint(70, 570)} kcal",
+        f"Emballage: {_emballage(rnd)}",
+        f"Origine: {rnd.choice(_ORIGINES)}",
+        f"Transport: {rnd.choice(_TRANSPORTS)}, Distance ~{rnd.randint(50, 3000)} km",
+        f"EAN {_gtin(rnd)}",
+    ]
+    if rnd.random() < 0.6:
+        lines.append(f"Labels: {', '.join(rnd.sample(_LABELS, 2))}")
+    return lines
+
+
+def _label_fr_cosmetique(rnd: random.Random) -> List[str]:
+    nom, categorie, base = rnd.choice(_COSMETIQUES)
+    inci = _ingredients(rnd, base, False)
+    cut = inci.find(",", len(inci) // 2)
+    inci_lines = [inci[: cut + 1], inci[cut + 2:]] if cut > 0 else [inci]
+    return [
+        f"Nom: {nom}",
+        f"Marque: {rnd.choice(_MARQUES)}",
+        f"Catégorie: {categorie}",
+        f"GTIN: {_gtin(rnd)}",
+        f"Poids net: {rnd.choice(['200 ml', '250 ml', '400ml', '75 ml'])}",
+        f"Ingredients (INCI): {inci_lines[0]}",
+        *inci_lines[1:],
+        f"Emballage: {_emballage(rnd)}",
+        f"Origine: {rnd.choice(_ORIGINES)}",
+        f"Destination: {rnd.choice(_DESTINATIONS)}",
+        f"Transport: {rnd.choice(_TRANSPORTS)}, Distance ~{rnd.randint(50, 3000)} km",
+        f"Labels: {', '.join(rnd.sample(_LABELS, rnd.randint(1, 3)))}",
+    ]
+
+
+def _label_en(rnd: random.Random) -> List[str]:
+    nom, base = rnd.choice(_EN_PRODUCTS)
+    return [
+        nom,
+        f"INGREDIENTS: {_ingredients(rnd, base, True)}.",
+        "ALLERGY ADVICE",
+        "May contain nuts.",
+        f"Nutrition per 100 g: Energy {rnd.randint(300, 2600)} kJ, Fat {rnd.randint(0, 50)} g, Salt {rnd.randint(1, 20) / 10} g",
+        f"Product of {rnd.choice(['USA', 'UK', 'Canada', 'Ireland'])}",
+        f"Net weight {rnd.choice(['340 g', '500 g', '1 kg'])}",
+        _gtin(rnd),
+    ]
+
+
+def _label_ar_fr(rnd: random.Random) -> List[str]:
+    nom_ar, nom_fr, ingr_ar, base = rnd.choice(_AR_PRODUCTS)
+    return [
+        nom_ar,
+        nom_fr,
+        f"المكونات: {ingr_ar} 100%",
+        f"Ingrédients : {_ingredients(rnd, base, True)}",
+        f"Made in : {rnd.choice(['Morocco', 'Tunisia', 'Algeria'])}",
+        f"Poids net: {rnd.choice(['1 l', '500 g', '1 kg'])}",
+        _gtin(rnd),
+        f"Emballage: {_emballage(rnd)}",
+    ]
+
+
+_BUILDERS = {
+    "fr_alimentaire": _label_fr_alimentaire,
+    "fr_cosmetique": _label_fr_cosmetique,
+    "en": _label_en,
+    "ar_fr": _label_ar_fr,
+}
+
+
+def ocr_noise(text: str, rnd: random.Random, rate: float = 0.04) -> str:
+    """Dégrade un texte comme le ferait un OCR moyen."""
+    out_lines = []
+    for line in text.split("\n"):
+        chars = []
+        for ch in line:
+            r = rnd.random()
+            if r < rate:
+                for src, dst in _OCR_CONFUSIONS:
+                    if ch == src:
+                        ch = dst
+                        break
+            elif r < rate * 1.3 and ch == " ":
+                ch = ""
+            chars.append(ch)
+        out_lines.append("".join(chars))
+        if rnd.random() < 0.15:
+            out_lines.append(rnd.choice(_OCR_GARBAGE))
+    if rnd.random() < 0.5:
+        out_lines.insert(0, "   " + rnd.choice(_OCR_GARBAGE))
+    return "\n".join(out_lines)
+
+
+# --- PDF ---------------------------------------------------------------------
+
+def _pdf_escape(line: str) -> bytes:
+    raw = line.encode("cp1252", errors="ignore")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """PDF texte minimal (Helvetica, WinAnsiEncoding), une liste de lignes par page."""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = font_id + 2 * len(pages) + 1
+    page_ids = []
+    for lines in pages:
+        ops = [b"BT /F1 11 Tf 14 TL 50 800 Td"]
+        ops.extend(b"(" + _pdf_escape(line) + b") Tj T*" for line in lines)
+        ops.append(b"ET")
+        stream = b"\n".join(ops)
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        ))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), len(page_ids)))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref)
+    return bytes(out)
+
+
+def _encodable(line: str) -> bool:
+    try:
+        line.encode("cp1252")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+def _pdf_lines(lines: List[str]) -> List[str]:
+    # lignes non encodables en WinAnsi (arabe) : omises
+    return [line for line in lines if _encodable(line)]
+
+
+def _filler_page(rnd: random.Random) -> List[str]:
+    words = ["Conditions", "de", "conservation", "à", "l'abri", "de", "la", "chaleur", "Service", "consommateurs", "recyclage"]
+    return [" ".join(rnd.choice(words) for _ in range(10)) for _ in range(40)]
+
+
+# --- Images ------------------------------------------------------------------
+
+def _load_font(size: int) -> ImageFont.ImageFont:
+    for path in _FONT_CANDIDATES:
+        if os.path.isfile(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size=size)
+
+
+def _has_arabic_font() -> bool:
+    return any(os.path.isfile(p) for p in _FONT_CANDIDATES[:2])
+
+
+def render_label(lines: List[str], dpi: int = 300, font_px: int = 42) -> Image.Image:
+    font = _load_font(font_px)
+    if not _has_arabic_font():
+        lines = _pdf_lines(lines)
+    width = int(dpi * 6.5)
+    line_h = int(font_px * 1.5)
+    height = line_h * (len(lines) + 2)
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((font_px, line_h * (i + 1)), line, fill=0, font=font)
+    return image
+
+
+def degrade(image: Image.Image, rnd: random.Random) -> Image.Image:
+    """Photo de téléphone : inclinaison, flou, faible contraste, grain."""
+    angle = rnd.uniform(-4, 4)
+    image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    image = image.filter(ImageFilter.GaussianBlur(rnd.uniform(0.6, 1.4)))
+    low, high = rnd.randint(50, 90), rnd.randint(180, 220)
+    image = image.point(lambda v: low + v * (high - low) // 255)
+    noise = Image.effect_noise(image.size, rnd.uniform(12, 25))
+    return Image.blend(image, noise, 0.15)
+
+
+def _encode(image: Image.Image, fmt: str, dpi: int, quality: int = 90) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        image.convert("RGB").save(buf, "JPEG", quality=quality, dpi=(dpi, dpi))
+    else:
+        image.save(buf, "PNG", dpi=(dpi, dpi))
+    return buf.getvalue()
+
+
+# --- Corpus ------------------------------------------------------------------
+
+def build_corpus(n_labels: int = 40, seed: int = 1234, pdf_pages: int = 3, images: bool = True) -> List[Sample]:
+    """
+    n_labels étiquettes réparties sur les formats ; pour chacune : texte propre,
+    texte bruité, PDF (étiquette en page 1 + pages annexes) et image propre ou dégradée.
+    """
+    rnd = random.Random(seed)
+    samples: List[Sample] = []
+    for i in range(n_labels):
+        fmt = FORMATS[i % len(FORMATS)]
+        lines = _BUILDERS[fmt](rnd)
+        text = "\n".join(lines)
+        base = f"{i:03d}_{fmt}"
+
+        samples.append(Sample(name=f"{base}.txt", fmt=fmt, text=text))
+        samples.append(Sample(name=f"{base}_ocr.txt", fmt=fmt, text=ocr_noise(text, rnd), noisy=True))
+
+        pages = [_pdf_lines(lines)] + [_filler_page(rnd) for _ in range(pdf_pages - 1)]
+        samples.append(Sample(name=f"{base}.pdf", fmt=fmt, text=text, pdf=make_pdf(pages), meta={"pages": pdf_pages}))
+
+        if images:
+            noisy = i % 2 == 1
+            dpi = rnd.choice([150, 200, 300])
+            image = render_label(lines, dpi=300, font_px=42)
+            if dpi != 300:
+                image = image.resize((image.width * dpi // 300, image.height * dpi // 300), Image.LANCZOS)
+            if noisy:
+                image = degrade(image, rnd)
+                data, ext = _encode(image, "JPEG", dpi, quality=rnd.randint(55, 80)), ".jpg"
+            else:
+                data, ext = _encode(image, "PNG", dpi), ".png"
+            samples.append(Sample(
+                name=f"{base}{'_photo' if noisy else ''}{ext}", fmt=fmt, text=text, noisy=noisy,
+                image=data, image_ext=ext, meta={"dpi": dpi, "size": image.size},
+            ))
+    return samples
+
+
+def write_corpus(samples: List[Sample], out_dir: str) -> None:
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    for s in samples:
+        path = os.path.join(out_dir, s.name)
+        if s.pdf is not None:
+            data = s.pdf
+        elif s.image is not None:
+            data = s.image
+        else:
+            data = s.text.encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(data)
+        manifest.append({"name": s.name, "format": s.fmt, "noisy": s.noisy, "bytes": len(data), **s.meta})
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--labels", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--pdf-pages", type=int, default=3)
+    args = parser.parse_args()
+
+    samples = build_corpus(args.labels, args.seed, args.pdf_pages)
+    write_corpus(samples, args.out)
+    print(f"{len(samples)} fichiers écrits dans {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,14 @@ from fastapi import FastAPI, Depends
 from sqlalchemy.orm import Session
 from typing import List
 
+from ecolabel_common.telemetry import TraceMiddleware, annotate, setup_logging, stage, stage_stats
+
 from .db import SessionLocal, Base, engine
 from . import models, schemas
 from .scoring_service import compute_score
 
+setup_logging("scoring")
+
 # Créer les tables si elles n'existent pas
 Base.metadata.create_all(bind=engine)
 
@@ -14,6 +18,7 @@ app = FastAPI(
     version="1.0.0",
     description="Microservice de calcul d'éco-score (A–E) à partir des indicateurs ACV."
 )
+app.add_middleware(TraceMiddleware)
 
 # Dépendance DB
 def get_db():
@@ -28,19 +33,27 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics/stages", tags=["health"])
+def get_stage_metrics():
+    return stage_stats()
+
+
 @app.post("/score/compute", response_model=schemas.ScoreResponse, tags=["score"])
 def compute_product_score(
     payload: schemas.ScoreRequest,
     db: Session = Depends(get_db)
 ):
+    annotate(product_id=payload.product_id)
+
     # 1) Calcul du score
-    result = compute_score(
-        co2_kg=payload.co2_kg,
-        water_l=payload.water_l,
-        energy_mj=payload.energy_mj,
-        packaging_type=payload.packaging_type,
-        data_completeness=payload.data_completeness
-    )
+    with stage("score"):
+        result = compute_score(
+            co2_kg=payload.co2_kg,
+            water_l=payload.water_l,
+            energy_mj=payload.energy_mj,
+            packaging_type=payload.packaging_type,
+            data_completeness=payload.data_completeness
+        )
 
     # 2) Sauvegarde en base
     score_obj = models.Score(
@@ -0,0 +1,7 @@
+# ecolabel_common
+"""
+Modules partagés par les microservices EcoLabel (un seul exemplaire dans le dépôt).
+
+Copié dans chaque image sous /opt/ecolabel (PYTHONPATH=/opt/ecolabel) ; en local,
+lancer le service avec la racine du dépôt dans le PYTHONPATH (voir README).
+"""
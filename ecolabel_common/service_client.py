@@ -0,0 +1,392 @@
+# service_client.py
+"""
+Client HTTP inter-services (httpx) partagé par les microservices EcoLabel
+(ParserProduit, NLPIngrédients, LCALite : `from ecolabel_common.service_client import ...`).
+
+- un pool de connexions keep-alive par client, créé à la première requête et
+  gardé pendant toute la vie de l'application (fermé au shutdown)
+- concurrence bornée (max_concurrency requêtes en vol par client)
+- nouvelles tentatives avec backoff aléatoire ("full jitter") :
+    * erreur de connexion : toujours (la requête n'est pas partie)
+    * timeout de lecture, 502/503/504 : seulement si la requête est idempotente
+- disjoncteur par cible (scheme://hôte:port) : après N pannes consécutives
+  (erreur réseau, timeout, 502/503/504), les appels échouent immédiatement
+  (CircuitOpenError) pendant reset_s secondes ; un essai half_open abandonné
+  (annulation, exception inattendue) est libéré, et réarmé au bout de reset_s
+  s'il n'a jamais rendu de verdict
+- métriques de latence par cible (p50/p95/p99, erreurs, tentatives)
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+SERVICE_CLIENT_TIMEOUT_S = float(os.getenv("SERVICE_CLIENT_TIMEOUT_S", "10"))
+SERVICE_CLIENT_MAX_CONNECTIONS = int(os.getenv("SERVICE_CLIENT_MAX_CONNECTIONS", "100"))
+SERVICE_CLIENT_MAX_KEEPALIVE = int(os.getenv("SERVICE_CLIENT_MAX_KEEPALIVE", "20"))
+SERVICE_CLIENT_MAX_CONCURRENCY = int(os.getenv("SERVICE_CLIENT_MAX_CONCURRENCY", "50"))
+SERVICE_CLIENT_RETRIES = int(os.getenv("SERVICE_CLIENT_RETRIES", "2"))
+SERVICE_CLIENT_BACKOFF_S = float(os.getenv("SERVICE_CLIENT_BACKOFF_S", "0.1"))
+SERVICE_CLIENT_BACKOFF_MAX_S = float(os.getenv("SERVICE_CLIENT_BACKOFF_MAX_S", "2"))
+SERVICE_CLIENT_BREAKER_FAILURES = int(os.getenv("SERVICE_CLIENT_BREAKER_FAILURES", "5"))
+SERVICE_CLIENT_BREAKER_RESET_S = float(os.getenv("SERVICE_CLIENT_BREAKER_RESET_S", "30"))
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUS = frozenset({502, 503, 504})
+
+# Erreurs où la requête n'a pas pu partir : on peut toujours réessayer
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Erreurs où la requête a pu être traitée : on ne réessaie que si idempotente
+_MAYBE_SENT_ERRORS = (httpx.ReadTimeout, httpx.WriteTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+
+
+class CircuitOpenError(RuntimeError):
+    """La cible a échoué trop souvent : appel refusé sans la contacter."""
+
+
+class CircuitBreaker:
+    """closed -> open (après `failures` pannes consécutives) -> half_open (1 essai) -> closed."""
+
+    def __init__(self, failures: int, reset_s: float):
+        self.failures = failures
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.open_count = 0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.reset_s:
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self.state == "half_open" and self._trial_in_flight and now - self._trial_started >= self.reset_s:
+                # essai perdu sans verdict (tâche tuée...) : on en autorise un autre
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_started = now
+                return True
+            return False
+
+    def release_trial(self) -> None:
+        """Essai interrompu sans verdict sur la cible : un autre appel pourra sonder."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failures:
+                if self.state != "open":
+                    self.open_count += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "open_count": self.open_count,
+            }
+
+
+class _TargetStats:
+    """Latences (ms) sur une fenêtre glissante + compteurs, pour une cible."""
+
+    def __init__(self, window: int = 1000):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, ms: float, ok: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            self._recent.append(ms)
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            counters = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "rejected": self.rejected,
+            }
+
+        def pct(p: float) -> float:
+            if not recent:
+                return 0.0
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))], 2)
+
+        return {**counters, "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+def _target_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class ServiceClient:
+    """
+    Client d'un service appelant. Utilisable en async (request / post_json)
+    ou depuis du code synchrone (request_sync / post_json_sync) : chaque mode
+    a son propre pool (un client httpx async est lié à sa boucle asyncio).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float = SERVICE_CLIENT_TIMEOUT_S,
+        max_concurrency: int = SERVICE_CLIENT_MAX_CONCURRENCY,
+        retries: int = SERVICE_CLIENT_RETRIES,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self._limits = httpx.Limits(
+            max_connections=SERVICE_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=SERVICE_CLIENT_MAX_KEEPALIVE,
+        )
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_semaphore: Optional[asyncio.Semaphore] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, _TargetStats] = {}
+        self._lock = threading.Lock()
+
+    # ---------- état par cible ----------
+
+    def _target(self, url: str):
+        target = _target_of(url)
+        with self._lock:
+            if target not in self._breakers:
+                self._breakers[target] = CircuitBreaker(SERVICE_CLIENT_BREAKER_FAILURES, SERVICE_CLIENT_BREAKER_RESET_S)
+                self._stats[target] = _TargetStats()
+            return target, self._breakers[target], self._stats[target]
+
+    def _retry_decision(self, method: str, idempotent: Optional[bool], error: Optional[Exception], status: Optional[int]) -> bool:
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        if error is not None:
+            return isinstance(error, _NOT_SENT_ERRORS) or (idempotent and isinstance(error, _MAYBE_SENT_ERRORS))
+        return idempotent and status in RETRY_STATUS
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return random.uniform(0, min(SERVICE_CLIENT_BACKOFF_MAX_S, SERVICE_CLIENT_BACKOFF_S * (2 ** attempt)))
+
+    # ---------- boucle de tentatives (commune async / sync) ----------
+
+    def _admit(self, url: str):
+        _, breaker, stats = self._target(url)
+        if not breaker.allow():
+            stats.incr("rejected")
+            raise CircuitOpenError(f"{self.name} : circuit ouvert vers {_target_of(url)}")
+        return breaker, stats
+
+    def _settle(
+        self,
+        method: str,
+        idempotent: Optional[bool],
+        breaker: CircuitBreaker,
+        stats: _TargetStats,
+        attempt: int,
+        started: float,
+        error: Optional[Exception],
+        response: Optional[httpx.Response],
+    ) -> Optional[float]:
+        """Bilan d'une tentative (métriques, disjoncteur) ; délai avant la suivante, None pour s'arrêter."""
+        status = response.status_code if response is not None else None
+        stats.record((time.perf_counter() - started) * 1000, error is None and status < 500)
+        # seules les pannes de la cible comptent (pas une 500 due aux données envoyées)
+        healthy = error is None and status not in RETRY_STATUS
+        if healthy:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+        if healthy or attempt >= self.retries or not self._retry_decision(method, idempotent, error, status):
+            return None
+        stats.incr("retries")
+        return self._backoff(attempt + 1)
+
+    # ---------- async ----------
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=self._limits)
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._async_client
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        idempotent: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        client = self._get_async_client()
+        breaker, stats = self._admit(url)
+
+        attempt = 0
+        while True:
+            error: Optional[Exception] = None
+            response: Optional[httpx.Response] = None
+            started = time.perf_counter()
+            try:
+                async with self._async_semaphore:
+                    response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                # annulation ou erreur hors transport : ni succès ni panne de la cible
+                breaker.release_trial()
+                raise
+            delay = self._settle(method, idempotent, breaker, stats, attempt, started, error, response)
+            if delay is None:
+                break
+            attempt += 1
+            await asyncio.sleep(delay)
+            if not breaker.allow():
+                # le disjoncteur vient de s'ouvrir : on renvoie le dernier résultat
+                break
+
+        if error is not None:
+            raise error
+        return response
+
+    async def post_json(self, url: str, payload: Any, idempotent: bool = False) -> Any:
+        response = await self.request("POST", url, idempotent=idempotent, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    # ---------- sync ----------
+
+    def _get_sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(timeout=self.timeout, limits=self._limits)
+            return self._sync_client
+
+    def request_sync(
+        self,
+        method: str,
+        url: str,
+        idempotent: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        client = self._get_sync_client()
+        breaker, stats = self._admit(url)
+
+        attempt = 0
+        while True:
+            error: Optional[Exception] = None
+            response: Optional[httpx.Response] = None
+            started = time.perf_counter()
+            try:
+                with self._sync_semaphore:
+                    response = client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            except BaseException:
+                # erreur hors transport : ni succès ni panne de la cible
+                breaker.release_trial()
+                raise
+            delay = self._settle(method, idempotent, breaker, stats, attempt, started, error, response)
+            if delay is None:
+                break
+            attempt += 1
+            time.sleep(delay)
+            if not breaker.allow():
+                # le disjoncteur vient de s'ouvrir : on renvoie le dernier résultat
+                break
+
+        if error is not None:
+            raise error
+        return response
+
+    def post_json_sync(self, url: str, payload: Any, idempotent: bool = False) -> Any:
+        response = self.request_sync("POST", url, idempotent=idempotent, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    # ---------- cycle de vie / métriques ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            targets = list(self._breakers)
+        return {
+            "timeout_s": self.timeout,
+            "max_concurrency": self.max_concurrency,
+            "retries": self.retries,
+            "targets": {
+                t: {**self._stats[t].snapshot(), "circuit": self._breakers[t].snapshot()}
+                for t in targets
+            },
+        }
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        with self._lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+
+_clients: Dict[str, ServiceClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str, **kwargs: Any) -> ServiceClient:
+    """Client partagé (un par nom) ; les paramètres ne comptent qu'à la création."""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = ServiceClient(name, **kwargs)
+        return _clients[name]
+
+
+def clients_stats() -> Dict[str, Any]:
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: client.stats() for name, client in clients.items()}
+
+
+async def close_clients() -> None:
+    with _clients_lock:
+        clients = list(_clients.values())
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,288 @@
+# telemetry.py
+"""
+Journalisation structurée et durées par étape, partagées par les microservices EcoLabel
+(ParserProduit, NLPIngrédients, LCALite, Scoring : `from ecolabel_common.telemetry import ...`).
+
+- une ligne par événement, JSON (LOG_FORMAT=json) ou texte (LOG_FORMAT=text),
+  champs libres : log.info("...", extra=fields(produit_id=12))
+- écriture asynchrone : le chemin de requête dépose l'événement dans une file
+  bornée (LOG_QUEUE_SIZE), un thread (QueueListener) écrit sur stdout ; file
+  pleine -> événement abandonné et compté, jamais d'attente sur les I/O
+- niveau LOG_LEVEL (INFO) : un log.debug désactivé ne coûte qu'un test de niveau
+- requêtes HTTP (TraceMiddleware) : une trace par requête, résumé journalisé
+  ("request", durées par étape) pour une fraction LOG_SAMPLE_RATE des requêtes,
+  et toujours si erreur (5xx, exception) ou plus lente que LOG_SLOW_MS
+- étapes : `with stage("parse"):` mesure la durée, l'ajoute à la trace en cours
+  (contextvars : suit les await et le pool de threads de Starlette) et aux
+  statistiques du service (GET /metrics/stages) ; record_stage pour une durée
+  mesurée ailleurs (autre thread / processus)
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.05"))
+LOG_SLOW_MS = float(os.getenv("LOG_SLOW_MS", "1000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+ROOT_LOGGER = "ecolabel"
+
+_service = "unknown"
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+_counters = {"dropped": 0, "sampled": 0, "forced": 0}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger "ecolabel.<name>" (handlers posés par setup_logging)."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def fields(**values: Any) -> Dict[str, Any]:
+    """extra= d'un appel de log : champs ajoutés tels quels à la ligne JSON."""
+    return {"fields": values}
+
+
+# ---------- formatage / écriture ----------
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "service": _service,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        out.update(getattr(record, "fields", None) or {})
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extra = getattr(record, "fields", None)
+        if extra:
+            line += " " + " ".join(f"{k}={v}" for k, v in extra.items())
+        return line
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Dépose l'événement sans attendre ; file pleine -> abandon compté."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # message et trace d'exception figés ici (les arguments peuvent changer ensuite) ;
+        # le formatage JSON / texte se fait dans le thread d'écriture
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _counters["dropped"] += 1
+
+
+def _start_listener(log_queue: "queue.Queue") -> None:
+    global _listener
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def setup_logging(service: str) -> None:
+    """À appeler une fois par service (import de main) ; les appels suivants ne font rien."""
+    global _service
+    with _setup_lock:
+        root = logging.getLogger(ROOT_LOGGER)
+        if any(isinstance(h, _NonBlockingQueueHandler) for h in root.handlers):
+            return
+        _service = service
+        log_queue: "queue.Queue" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        root.addHandler(_NonBlockingQueueHandler(log_queue))
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+        _start_listener(log_queue)
+        atexit.register(_stop_listener)
+        # gunicorn --preload : le thread d'écriture ne survit pas au fork
+        os.register_at_fork(after_in_child=lambda: _start_listener(log_queue))
+
+
+# ---------- durées par étape ----------
+
+class _StageStats:
+    """Compteurs de durées (ms) + fenêtre glissante pour les percentiles."""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self._recent.append(ms)
+
+    def snapshot(self) -> Dict[str, float]:
+        recent = sorted(self._recent)
+
+        def pct(p: float) -> float:
+            if not recent:
+                return 0.0
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))], 2)
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+_stages: Dict[str, _StageStats] = {}
+_stages_lock = threading.Lock()
+
+
+class Trace:
+    """Durées par étape et champs d'une requête ; un seul résumé journalisé à la fin."""
+
+    __slots__ = ("name", "fields", "stages_ms", "started", "sampled")
+
+    def __init__(self, name: str, **values: Any):
+        self.name = name
+        self.fields: Dict[str, Any] = dict(values)
+        self.stages_ms: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        self.sampled = random.random() < LOG_SAMPLE_RATE
+
+    def add(self, stage_name: str, ms: float) -> None:
+        self.stages_ms[stage_name] = round(self.stages_ms.get(stage_name, 0.0) + ms, 2)
+
+
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("ecolabel_trace", default=None)
+_trace_log = get_logger("trace")
+
+
+def record_stage(name: str, ms: float) -> None:
+    with _stages_lock:
+        stats = _stages.get(name)
+        if stats is None:
+            stats = _stages[name] = _StageStats()
+        stats.record(ms)
+    current = _current.get()
+    if current is not None:
+        current.add(name, ms)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, (time.perf_counter() - t0) * 1000)
+
+
+def annotate(**values: Any) -> None:
+    """Ajoute des champs au résumé de la requête en cours (sans effet hors requête)."""
+    current = _current.get()
+    if current is not None:
+        current.fields.update(values)
+
+
+@contextmanager
+def trace(name: str, **values: Any) -> Iterator[Trace]:
+    """Trace d'une unité de travail (requête HTTP, job) : résumé échantillonné à la sortie."""
+    current = Trace(name, **values)
+    token = _current.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e.__class__.__name__
+        raise
+    finally:
+        _current.reset(token)
+        _finish(current, error)
+
+
+def _finish(current: Trace, error: Optional[str]) -> None:
+    total_ms = round((time.perf_counter() - current.started) * 1000, 2)
+    status = current.fields.get("status")
+    failed = error is not None or (isinstance(status, int) and status >= 500)
+    forced = failed or total_ms >= LOG_SLOW_MS
+    if not (forced or current.sampled):
+        return
+    _counters["forced" if forced else "sampled"] += 1
+    values = {"trace": current.name, **current.fields, "total_ms": total_ms, "stages_ms": current.stages_ms}
+    if error is not None:
+        values["error"] = error
+    _trace_log.log(logging.WARNING if failed else logging.INFO, "request", extra={"fields": values})
+
+
+class TraceMiddleware:
+    """Middleware ASGI : une trace par requête HTTP (méthode, chemin, statut)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with trace("http", method=scope["method"], path=scope["path"]) as current:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    current.fields["status"] = message["status"]
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+
+
+def stage_stats() -> Dict[str, Any]:
+    with _stages_lock:
+        stages = {name: stats.snapshot() for name, stats in _stages.items()}
+    return {
+        "stages": stages,
+        "log": {
+            "level": LOG_LEVEL,
+            "sample_rate": LOG_SAMPLE_RATE,
+            "slow_ms": LOG_SLOW_MS,
+            "queued": _listener.queue.qsize() if _listener is not None else 0,
+            **_counters,
+        },
+    }